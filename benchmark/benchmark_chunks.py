@@ -0,0 +1,144 @@
+# benchmark_chunks.py --- 
+# 
+# Filename: benchmark_chunks.py
+# Description: 
+# Author:
+# Maintainer: 
+# Created:
+# Version: 
+# Last-Updated: 
+#           By: 
+#     Update #: 0
+# URL: 
+# Keywords: 
+# Compatibility: 
+# 
+# 
+
+# Commentary: 
+# 
+# 
+# 
+# 
+
+# Change log:
+# 
+# 
+# 
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street, Fifth
+# Floor, Boston, MA 02110-1301, USA.
+# 
+# 
+
+# Code:
+"""This script compares the write and read throughput of uniformly
+sampled data with chunk shapes chosen by h5py from the first block
+(`autochunk=False`, the earlier behaviour) and those planned by
+NSDFWriter for the SNAPSHOT and TRACE access patterns.
+
+`-n` sources are recorded for `-t` time points, which are written in
+blocks of `-s` time points. Reading is timed for the traces of `-r`
+sources and for `-r` snapshots of all the sources.
+
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+import numpy as np
+import h5py as h5
+
+sys.path.append('..')
+import nsdf
+
+
+def write_data(filename, args, **writer_args):
+    """Write the data and return the time taken in seconds"""
+    writer = nsdf.NSDFWriter(filename, mode='w', compression=args.compression,
+                             **writer_args)
+    source_ds = writer.add_uniform_ds('pop', [str(ii) for ii in
+                                              range(args.sources)])
+    data_object = nsdf.UniformData('Vm', unit='mV', dt=args.dt, tunit='ms')
+    block = np.random.uniform(-65, -55, size=(args.sources, args.steps))
+    start = datetime.now()
+    for ii in range(args.time // args.steps):
+        writer.add_uniform_block(source_ds, data_object, block)
+    writer.close()
+    return (datetime.now() - start).total_seconds()
+
+
+def read_data(filename, args):
+    """Read traces and snapshots and return the time taken for each in
+    seconds"""
+    rows = np.random.randint(0, args.sources, size=args.reads)
+    cols = np.random.randint(0, args.time, size=args.reads)
+    with h5.File(filename, 'r') as fd:
+        dataset = fd['/data/uniform/pop/Vm']
+        chunks = dataset.chunks
+        start = datetime.now()
+        for row in rows:
+            trace = dataset[row, :]
+        trace_time = (datetime.now() - start).total_seconds()
+        start = datetime.now()
+        for col in cols:
+            snapshot = dataset[:, col]
+        snapshot_time = (datetime.now() - start).total_seconds()
+    return chunks, trace_time, snapshot_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark chunk shapes'
+                                     ' for uniformly sampled data.')
+    parser.add_argument('-n', '--sources', type=int, default=1000,
+                        help='number of sources')
+    parser.add_argument('-t', '--time', type=int, default=10000,
+                        help='number of time points')
+    parser.add_argument('-s', '--steps', type=int, default=10,
+                        help='number of time points written in each call')
+    parser.add_argument('-r', '--reads', type=int, default=20,
+                        help='number of traces and snapshots read')
+    parser.add_argument('-c', '--compression', default=None,
+                        help='compression filter (gzip/lzf)')
+    parser.add_argument('-o', '--out', default='benchmark_chunks.h5',
+                        help='output data file')
+    args = parser.parse_args()
+    args.dt = 0.1
+    print args
+    mbytes = args.sources * args.time * 8.0 / (1 << 20)
+    # Small blocks rewrite partially filled chunks, which is costly
+    # with compression. The write buffer collects the blocks to fill
+    # whole chunks. The TRACE chunks span many time points, so the
+    # buffer must hold a row of chunks.
+    runs = [('h5py guess', {'autochunk': False}),
+            ('snapshot', {'access': nsdf.access.SNAPSHOT}),
+            ('snapshot+buffer', {'access': nsdf.access.SNAPSHOT,
+                                 'buffersize': 1 << 24}),
+            ('trace+buffer', {'access': nsdf.access.TRACE,
+                              'runtime': args.time * args.dt,
+                              'buffersize': 1 << 30})]
+    print '{:>18} {:>14} {:>10} {:>10} {:>10}'.format(
+        'run', 'chunks', 'write MB/s', 'trace/s', 'snapshot/s')
+    for label, writer_args in runs:
+        write_time = write_data(args.out, args, **writer_args)
+        chunks, trace_time, snapshot_time = read_data(args.out, args)
+        print '{:>18} {:>14} {:>10.1f} {:>10.1f} {:>10.1f}'.format(
+            label, chunks, mbytes / write_time, args.reads / trace_time,
+            args.reads / snapshot_time)
+        os.remove(args.out)
+
+# 
+# benchmark_chunks.py ends here
@@ -0,0 +1,152 @@
+# benchmark_modeltree.py --- 
+# 
+# Filename: benchmark_modeltree.py
+# Description: 
+# Author:
+# Maintainer: 
+# Created:
+# Version: 
+# Last-Updated: 
+#           By: 
+#     Update #: 0
+# URL: 
+# Keywords: 
+# Compatibility: 
+# 
+# 
+
+# Commentary: 
+# 
+# 
+# 
+# 
+
+# Change log:
+# 
+# 
+# 
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street, Fifth
+# Floor, Boston, MA 02110-1301, USA.
+# 
+# 
+
+# Code:
+"""This script compares the time for writing a large model tree with
+`NSDFWriter.add_modeltree` against writing it by visiting every
+component and looking up the group of its parent by path, which is
+what `add_modeltree` did earlier.
+
+The model has `-c` cells with `-m` compartments each, added to the
+file in `-b` batches of cells, as when a model is built piece by
+piece.
+
+Time for adding models in 10 batches (h5py 2.10, HDF5 1.10):
+
+    components    add_modeltree    by path
+    10^4          1.3 s            154 s
+    10^5          12 s             -
+    10^6          112 s            -
+
+The time grows linearly with the number of components. The old
+implementation was not run beyond 10^4 components because it is
+quadratic.
+
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+
+sys.path.append('..')
+import nsdf
+
+
+def create_cells(start, count, ncomp):
+    """Create `count` cells each with `ncomp` compartments in a linear
+    chain."""
+    cells = []
+    for ii in range(start, start + count):
+        cell = nsdf.ModelComponent('cell_{}'.format(ii),
+                                   uid='cell_{}'.format(ii))
+        parent = cell
+        for jj in range(ncomp):
+            parent = nsdf.ModelComponent('comp_{}'.format(jj),
+                                         uid='cell_{}_{}'.format(ii, jj),
+                                         parent=parent)
+        cells.append(cell)
+    return cells
+
+
+def add_modeltree_by_path(writer, root, target='/'):
+    """Old implementation of NSDFWriter.add_modeltree"""
+    def write_absolute(node, rootgroup):
+        if node.parent is None:
+            parentgroup = rootgroup
+        else:
+            parentpath = node.parent.path[1:]
+            parentgroup = rootgroup[parentpath]
+        nsdf.add_model_component(node, parentgroup)
+    node = writer.modelroot.get_node(target)
+    node.add_child(root)
+    writer.modelroot.visit(write_absolute, writer.model)
+
+
+def write_model(filename, args, add):
+    """Write the model using function `add` and return the time taken
+    in seconds"""
+    ncells = args.cells // args.batches
+    writer = nsdf.NSDFWriter(filename, mode='w')
+    start = datetime.now()
+    add(writer, nsdf.ModelComponent('model', uid='model'))
+    for ii in range(args.batches):
+        cells = create_cells(ii * ncells, ncells, args.compartments)
+        for cell in cells:
+            add(writer, cell, 'model')
+    writer.close()
+    return (datetime.now() - start).total_seconds()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark writing of'
+                                     ' model tree.')
+    parser.add_argument('-c', '--cells', type=int, default=1000,
+                        help='number of cells')
+    parser.add_argument('-m', '--compartments', type=int, default=100,
+                        help='number of compartments in each cell')
+    parser.add_argument('-b', '--batches', type=int, default=10,
+                        help='number of batches in which the cells'
+                        ' are added')
+    parser.add_argument('-o', '--out', default='benchmark_modeltree.h5',
+                        help='output data file')
+    parser.add_argument('--compare', action='store_true',
+                        help='also time the old implementation. This'
+                        ' scales quadratically, use a smaller model.')
+    args = parser.parse_args()
+    print args
+    print 'Components:', args.cells * (args.compartments + 1)
+    new = write_model(args.out, args,
+                      lambda writer, root, target='/':
+                      writer.add_modeltree(root, target))
+    print 'add_modeltree: {:.2f} s'.format(new)
+    if args.compare:
+        old = write_model(args.out, args, add_modeltree_by_path)
+        print 'by path: {:.2f} s'.format(old)
+        print 'speedup: {:.1f}x'.format(old / new)
+    os.remove(args.out)
+
+# 
+# benchmark_modeltree.py ends here
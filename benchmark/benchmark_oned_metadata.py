@@ -0,0 +1,137 @@
+# benchmark_oned_metadata.py --- 
+# 
+# Filename: benchmark_oned_metadata.py
+# Description: 
+# Author:
+# Maintainer: 
+# Created:
+# Version: 
+# Last-Updated: 
+#           By: 
+#     Update #: 0
+# URL: 
+# Keywords: 
+# Compatibility: 
+# 
+# 
+
+# Commentary: 
+# 
+# 
+# 
+# 
+
+# Change log:
+# 
+# 
+# 
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street, Fifth
+# Floor, Boston, MA 02110-1301, USA.
+# 
+# 
+
+# Code:
+"""This script measures the time for creating and opening ONED files
+with many sources, where each source gets its own data and time
+datasets, with the HDF5 settings that NSDFWriter exposes for files
+with many objects.
+
+`-n` sources of nonuniformly sampled data with `-s` samples each are
+written in `-w` calls of `add_nonuniform_1d`. Opening is timed for
+opening the file and reading the data of all sources with
+NSDFReader. Settings not supported by the installed h5py are
+reported and skipped.
+
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+import numpy as np
+
+sys.path.append('..')
+import nsdf
+
+
+def write_data(filename, args, **writer_args):
+    """Write the data and return the time taken in seconds, including
+    closing the file"""
+    sources = [str(ii) for ii in range(args.sources)]
+    times = np.cumsum(np.random.uniform(size=args.samples))
+    start = datetime.now()
+    writer = nsdf.NSDFWriter(filename, mode='w', dialect=nsdf.dialect.ONED,
+                             **writer_args)
+    source_ds = writer.add_nonuniform_ds_1d('pop', 'Vm', sources)
+    data_object = nsdf.NonuniformData('Vm', unit='mV', tunit='ms')
+    for ii in range(args.writes):
+        for src in sources:
+            data_object.put_data(src, (np.random.uniform(size=args.samples),
+                                       times + ii * times[-1]))
+        writer.add_nonuniform_1d(source_ds, data_object)
+    writer.close()
+    return (datetime.now() - start).total_seconds()
+
+
+def read_data(filename):
+    """Open the file and read all the data, returning the time taken
+    in seconds for each"""
+    start = datetime.now()
+    reader = nsdf.NSDFReader(filename)
+    open_time = (datetime.now() - start).total_seconds()
+    start = datetime.now()
+    reader.get_nonuniform_data('pop', 'Vm')
+    read_time = (datetime.now() - start).total_seconds()
+    del reader
+    return open_time, read_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark HDF5 metadata'
+                                     ' settings for ONED files.')
+    parser.add_argument('-n', '--sources', type=int, default=10000,
+                        help='number of sources')
+    parser.add_argument('-s', '--samples', type=int, default=10,
+                        help='number of samples per source in each write')
+    parser.add_argument('-w', '--writes', type=int, default=2,
+                        help='number of writes')
+    parser.add_argument('-o', '--out', default='benchmark_oned_metadata.h5',
+                        help='output data file')
+    args = parser.parse_args()
+    print args
+    runs = [('default', {}),
+            ('latest', {'libver': 'latest'}),
+            ('latest+notimes', {'libver': 'latest', 'track_times': False}),
+            ('latest+metablock', {'libver': 'latest',
+                                  'meta_block_size': 1 << 20}),
+            ('latest+paged', {'libver': 'latest', 'fs_strategy': 'page',
+                              'fs_page_size': 1 << 16})]
+    print '{:>18} {:>10} {:>10} {:>10} {:>10}'.format(
+        'run', 'create s', 'open s', 'read s', 'size MB')
+    for label, writer_args in runs:
+        try:
+            create_time = write_data(args.out, args, **writer_args)
+        except ValueError as error:
+            print '{:>18} unsupported: {}'.format(label, error)
+            continue
+        open_time, read_time = read_data(args.out)
+        print '{:>18} {:>10.2f} {:>10.3f} {:>10.2f} {:>10.1f}'.format(
+            label, create_time, open_time, read_time,
+            os.path.getsize(args.out) / float(1 << 20))
+        os.remove(args.out)
+
+# 
+# benchmark_oned_metadata.py ends here
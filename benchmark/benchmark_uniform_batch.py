@@ -0,0 +1,121 @@
+# benchmark_uniform_batch.py --- 
+# 
+# Filename: benchmark_uniform_batch.py
+# Description: 
+# Author:
+# Maintainer: 
+# Created:
+# Version: 
+# Last-Updated: 
+#           By: 
+#     Update #: 0
+# URL: 
+# Keywords: 
+# Compatibility: 
+# 
+# 
+
+# Commentary: 
+# 
+# 
+# 
+# 
+
+# Change log:
+# 
+# 
+# 
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street, Fifth
+# Floor, Boston, MA 02110-1301, USA.
+# 
+# 
+"""This script compares the time for appending several uniformly
+sampled variables of a population with one `add_uniform_batch` call
+per time step and with one `add_uniform_data` call per variable.
+
+`-v` variables of `-n` sources are appended `-s` samples at a time
+in `-w` writes. The data are set as blocks, so that the time measured
+is that of the writer.
+
+Time for 100 sources and 20 variables (h5py 2.10, HDF5 1.10):
+
+    samples x writes    add_uniform_data    add_uniform_batch
+    1 x 1000            6.2 s               0.9 s
+    100 x 200           1.6 s               0.4 s
+
+Before add_uniform_batch wrote through the same path as
+add_uniform_data it took 5.3 s for 1 x 1000.
+
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+import numpy as np
+
+sys.path.append('..')
+import nsdf
+
+
+def write_data(filename, args, batch):
+    """Write the data and return the time taken in seconds, including
+    closing the file"""
+    sources = [str(ii) for ii in range(args.sources)]
+    blocks = [np.random.uniform(size=(args.sources, args.samples))
+              for ii in range(args.variables)]
+    writer = nsdf.NSDFWriter(filename, mode='w')
+    source_ds = writer.add_uniform_ds('pop', sources)
+    data_objects = [nsdf.UniformData('var_{}'.format(ii), unit='mV',
+                                     dt=0.1, tunit='ms')
+                    for ii in range(args.variables)]
+    for data_object, block in zip(data_objects, blocks):
+        data_object.put_block(block)
+    start = datetime.now()
+    for ii in range(args.writes):
+        if batch:
+            writer.add_uniform_batch(source_ds, data_objects)
+        else:
+            for data_object in data_objects:
+                writer.add_uniform_data(source_ds, data_object)
+    writer.close()
+    return (datetime.now() - start).total_seconds()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark appending'
+                                     ' several uniform variables at once.')
+    parser.add_argument('-n', '--sources', type=int, default=100,
+                        help='number of sources')
+    parser.add_argument('-v', '--variables', type=int, default=20,
+                        help='number of variables')
+    parser.add_argument('-s', '--samples', type=int, default=1,
+                        help='number of samples per source in each write')
+    parser.add_argument('-w', '--writes', type=int, default=1000,
+                        help='number of writes')
+    parser.add_argument('-o', '--out', default='benchmark_uniform_batch.h5',
+                        help='output data file')
+    args = parser.parse_args()
+    print args
+    print '{:>18} {:>10}'.format('run', 'write s')
+    for label, batch in [('add_uniform_data', False),
+                         ('add_uniform_batch', True)]:
+        print '{:>18} {:>10.2f}'.format(label,
+                                         write_data(args.out, args, batch))
+        os.remove(args.out)
+
+# 
+# benchmark_uniform_batch.py ends here
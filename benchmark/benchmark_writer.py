@@ -256,10 +256,12 @@ def write_data(args, var_dict):
         writer = nsdf.NSDFWriter(filepath, dialect=dialect, mode='w',
                                  compression='gzip',
                                  compression_opts=6, fletcher32=True,
-                                 shuffle=True)
+                                 shuffle=True, buffersize=args.buffersize,
+                                 nsamples=args.preallocate)
     else:
         writer = nsdf.NSDFWriter(filepath, dialect=dialect,
-                                 mode='w')
+                                 mode='w', buffersize=args.buffersize,
+                                 nsamples=args.preallocate)
 
     uvar_list = var_dict.get('uniform', [])                                 
     for uvar in uvar_list:
@@ -334,6 +336,13 @@ if __name__ == '__main__':
     parser.add_argument('-c', '--compress', 
                         help='enable gzip compression with level=6',
                         action='store_true')
+    parser.add_argument('-b', '--buffersize', type=int, default=0,
+                        help='size in bytes of the per dataset write'
+                        ' buffer for incremental writing. 0 means'
+                        ' unbuffered.')
+    parser.add_argument('-p', '--preallocate', type=int, default=None,
+                        help='preallocate uniform datasets for this'
+                        ' many samples in incremental writing.')
     parser.add_argument('-o', '--out', 
                         help='output data file')
     args = parser.parse_args()
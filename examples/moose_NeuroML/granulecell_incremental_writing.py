@@ -84,7 +84,8 @@ def example():
     ca = moose.element('{}/Gran_CaPool_98/data/somaCa'.format(soma_path))
     vm = moose.element('{}/data[0]/somaVm[0]'.format(soma_path))
     os.chdir(current)
-    writer = nsdf.NSDFWriter('granulecell_incremental.h5', mode='w', compression='gzip')
+    writer = nsdf.NSDFWriter('granulecell_incremental.h5', mode='w',
+                             compression='gzip', buffersize=1 << 20)
     writer.add_model_filecontents([directory])
     ca_data = nsdf.UniformData('Ca', unit='mM', dt=granule.plotdt, tunit='s')
     ca_data.put_data(soma_path, ca.vector)
@@ -118,6 +119,7 @@ def example():
         writer.add_uniform_data(source_ds, ca_data)
     end_time = datetime.now()
     writer.tend = end_time
+    writer.close()
     print 'Finished writing example NSDF file for GranuleCell demo'
     
 
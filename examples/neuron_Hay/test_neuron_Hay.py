@@ -392,13 +392,10 @@ if dump_hdf5:
         data_obj_8.set_dt(0.25, unit='ms')
         data_obj_9.set_dt(0.25, unit='ms')
 
-        writer.add_uniform_data(curr_source_ds, data_obj_1)
-        writer.add_uniform_data(curr_source_ds, data_obj_2)
-        writer.add_uniform_data(curr_source_ds, data_obj_3)
-        writer.add_uniform_data(curr_source_ds, data_obj_4)
-        writer.add_uniform_data(curr_source_ds, data_obj_5)
-        writer.add_uniform_data(curr_source_ds, data_obj_6)
-        writer.add_uniform_data(curr_source_ds, data_obj_7)
+        writer.add_uniform_batch(curr_source_ds,
+                                 [data_obj_1, data_obj_2, data_obj_3,
+                                  data_obj_4, data_obj_5, data_obj_6,
+                                  data_obj_7])
 
         writer.add_uniform_data(v_source_ds, data_obj_8)
         writer.add_uniform_data(ele_source_ds, data_obj_9)
@@ -78,10 +78,17 @@ nonuniform: Time series data that has been sampled with irregular
 
                  This is represented by nsdf.dialect.NANPADDED.
 
+              d) 1D datasets of the data and the sampling times of
+                 all sources stored back to back, along with an
+                 index of offsets where the data from each source
+                 starts.
+
+                 This is represented by nsdf.dialect.CSR.
+
 event: Data points represent event times. Spike time data is the most
     common example in neuroscience. Similar to nonunform data, event
     times data from different sources are of different length. Thus
-    they, too, can be stored in three different ways.
+    they, too, can be stored in four different ways.
 
               a) individual 1D datasets under a common group.
 
@@ -98,6 +105,12 @@ event: Data points represent event times. Spike time data is the most
 
                  This is represented by nsdf.dialect.NANPADDED.
 
+              d) 1D dataset with the event times of all sources
+                 stored back to back, along with an index of offsets
+                 where the data from each source starts.
+
+                 This is represented by nsdf.dialect.CSR.
+
 static: In addition to time series or temporal data, components in a
     model can have static data associated with them. These are stored
     under the `static` group.
@@ -141,6 +154,17 @@ modeltree: This group stores a tree structure representing
     attributes added by the user. One special attribute is `ontology`
     meant for storing the ontological term for this component.
 
+modeltable: This group stores model components in tabular form,
+    which is more compact than `modeltree` for models with a very
+    large number of components. Row `i` of the 1D datasets `name`,
+    `uid` and `parent` stores the name and unique identifier of a
+    component and the row index of its parent (-1 for components
+    without a parent). The group `attrs` contains one dataset for
+    each attribute, with the value of that attribute for each
+    component. For an attribute that not all components have, a
+    boolean dataset of the same name in the group `present` is True
+    for the components that have it.
+
 .. _map-label:
 
 Map
@@ -157,21 +181,62 @@ under the corresponding group and linked to the datasets recorded from
 these as a HDF5 DimensionScale (DS). Multiple variables recorded from
 the same source population share this dimension scale. The rows in the
 population DS have one to one correspondence with the rows in the
-datasets.
+datasets. Uniformly sampled data in TIMEMAJOR layout (`layout`
+attribute set to `nsdf.layout.TIMEMAJOR`) is stored transposed, with
+one row per time point, and the population DS is attached to its
+columns.
 
 For 1D datasets, a 2 column dataset is created for each population for
 each recorded variable. The first column is `source` and stores the
 uid of the source component and the second column is `data` which
 stores the reference to the 1D dataset collected from this source.
 
+The sampling times of nonuniform data in 1D datasets and in the
+NUREGULAR dialect are stored in datasets under `/map/time` attached
+to the data as the `time` dimension scale. Datasets written with
+identical sampling times share one such scale.
+
+Files written with `nsdf.linkage.REFATTR` (recorded in the `linkage`
+attribute of the file) do not attach the population and time
+datasets as dimension scales. Instead each data dataset lists them
+in its `dimension_scales` attribute as (label, axis, object
+reference) entries. `nsdf.convert_to_dimension_scales` turns such a
+file into one with dimension scales.
+
+For NaN padded datasets (nsdf.dialect.NANPADDED) the number of valid
+entries in each row is stored in a 1D dataset under
+`/map/length/{nonuniform or event}` which is referenced by the
+`length` attribute of the data.
+
+For the CSR dialect, the uids of the sources are stored in a 1D
+dataset like the other 2D layouts, referenced by the `source`
+attribute of the data. The offsets are stored in a 2D dataset under
+`/map/offset/{nonuniform or event}` which is referenced by the
+`offset` attribute of the data. Each incremental write appends one
+row to it: entry `i` of a row is the index in the data where the
+data from the i-th source in that write starts and the last entry is
+where that write ends.
+
+A file may also have an index of all the sources in the 1D dataset
+`/map/sourceindex` (written when NSDFWriter is created with
+`sourceindex=True`). Its entries are (source, sampling, population,
+row) sorted by source, where `row` is the index of the source in the
+dataset `/map/{sampling}/{population}`.
+
+Similarly `/map/catalog` (written when NSDFWriter is created with
+`catalog=True`) lists the recorded variables with their path,
+sampling type, population, shape, dtype, unit, time parameters and
+source dataset, so that NSDFReader can answer listing and metadata
+queries without walking the file.
+
 
 Note on namespace
 -----------------
 
 The nsdf package is organized into :ref:`constants`, :ref:`nsdfdata`,
-:ref:`model`, :ref:`nsdfwriter` and :ref:`util` submodules. However
-all their contents are directly accessible under the `nsdf`
-namespace. Thus, instead of `nsdf.nsdfwriter.NSDFWriter` you should
+:ref:`model`, :ref:`nsdfwriter`, :ref:`nsdfreader`,
+:ref:`nsdfservice`, :ref:`nsdftools` and :ref:`util` submodules. However all their contents are directly accessible under
+the `nsdf` namespace. Thus, instead of `nsdf.nsdfwriter.NSDFWriter` you should
 use `nsdf.NSDFWriter`.
 
 """
@@ -184,5 +249,7 @@ from .model import *
 from .nsdfdata import *
 from .nsdfwriter import *
 from .nsdfreader import *
+from .nsdfservice import *
+from .nsdftools import *
 
 # from .NSDFWriter import NSDFWriter as writer
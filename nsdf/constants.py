@@ -56,6 +56,18 @@ VLENSTR = h5.special_dtype(vlen=str)
 REFTYPE = h5.special_dtype(ref=h5.Reference)
 VLENBYTE = h5.special_dtype(vlen=bytes)
 SRCDATAMAPTYPE = np.dtype([('source', VLENSTR), ('data', REFTYPE)])
+SCALEREFTYPE = np.dtype([('label', VLENSTR), ('axis', np.int32),
+                         ('scale', REFTYPE)])
+SOURCEINDEXTYPE = np.dtype([('source', VLENSTR), ('sampling', VLENSTR),
+                            ('population', VLENSTR), ('row', np.int64)])
+CATALOGTYPE = np.dtype([('path', VLENSTR), ('sampling', VLENSTR),
+                        ('population', VLENSTR), ('variable', VLENSTR),
+                        ('field', VLENSTR), ('unit', VLENSTR),
+                        ('dtype', VLENSTR), ('shape', np.int64, (2,)),
+                        ('layout', VLENSTR), ('tstart', np.float64),
+                        ('dt', np.float64), ('tunit', VLENSTR),
+                        ('t0', np.float64), ('t1', np.float64),
+                        ('source', VLENSTR)])
 
 # NonuniformRec = namedtuple('NonuniformRec', ['sid', 'data', 'time'])
 
@@ -86,11 +98,87 @@ class dialect(object):
             nonuniform data goes into regular 2D datasets. In this case
             the events are stored in 1D datasets.
 
+        CSR:
+            nonuniform and event data from all sources in a
+            population stored back to back in a single 1D dataset
+            along with an index of the offsets where the data from
+            each source starts (compressed sparse row layout).
+
     """
     VLEN = 'VLEN'
     ONED = 'ONED'   
     NANPADDED = 'NANPADDED'      
     NUREGULAR = 'NUREGULAR'
+    CSR = 'CSR'
+
+
+class layout(object):
+    """Enumeration of dataset layouts that can be chosen independently
+    of the dialect. The layout of a dataset is stored in its `layout`
+    attribute.
+
+    The following constants are defined:
+
+        RASTER:
+            event data from all sources in a population stored in a
+            single table of (time, source index) pairs sorted by
+            time.
+
+        TIMEMAJOR:
+            uniformly sampled data stored with one row per time point
+            and one column per source, the transpose of the default
+            layout.
+
+    """
+    RASTER = 'RASTER'
+    TIMEMAJOR = 'TIMEMAJOR'
+
+
+class access(object):
+    """Enumeration of the dominant access patterns of uniformly
+    sampled data, used for choosing the chunk shape of datasets.
+
+    The following constants are defined:
+
+        TRACE:
+            the data of individual sources are read over long
+            periods of time. Chunks span many time points of few
+            sources.
+
+        SNAPSHOT:
+            the data of all sources are read for short periods of
+            time. Chunks span many sources for fewer time
+            points. This also suits writing the data in small steps.
+
+    """
+    TRACE = 'TRACE'
+    SNAPSHOT = 'SNAPSHOT'
+
+
+class linkage(object):
+    """Enumeration of the ways of linking data to their source and
+    time datasets. The linkage used by a file is stored in its
+    `linkage` attribute.
+
+    The following constants are defined:
+
+        DIMSCALE:
+            the source and time datasets are HDF5 dimension scales
+            attached to the data. Attaching a scale updates a list of
+            back references in the scale, which gets slow when many
+            datasets share a scale.
+
+        REFATTR:
+            each data dataset stores object references to its source
+            and time datasets in its `dimension_scales` attribute, a
+            table of (label, axis, scale) entries of SCALEREFTYPE.
+            The dimension labels are set as with DIMSCALE. Use
+            `nsdf.convert_to_dimension_scales` to convert the file to
+            DIMSCALE linkage.
+
+    """
+    DIMSCALE = 'DIMSCALE'
+    REFATTR = 'REFATTR'
 
     
 SAMPLING_TYPES = [UNIFORM, NONUNIFORM, EVENT, STATIC]
@@ -50,6 +50,8 @@
 __author__ = 'Subhasis Ray'
 __version__ = '0.1'
 
+import numpy as np
+
 
 class ModelComponent(object):
     """Tree node for model tree.
@@ -66,6 +68,14 @@ class ModelComponent(object):
         hdfgroup (hdf5 Group): the group that this component corresponds
             to in NSDF file.
 
+    Note:
+        The root of a tree keeps an index of uid -> path and path ->
+        component for the whole tree once `get_id_path_dict` or
+        `get_path_node_dict` has been called. This is kept up to date
+        by `add_child`, `add_children` and the `parent` argument of
+        the constructor. If `children` is modified directly,
+        `update_id_path_dict` must be called on the root.
+
     """
     def __init__(self, name, uid=None, parent=None, attrs=None,
                  hdfgroup=None):
@@ -78,9 +88,12 @@ class ModelComponent(object):
         self.attrs = attrs if attrs is not None else {}
         self.hdfgroup = hdfgroup
         self._id_path_dict = None
+        self._path_node_dict = None
         if parent is not None:
+            parent._unindex_subtree(parent.children.get(name))
             parent.children[name] = self
-        
+            parent._index_subtree(self)
+
     def add_child(self, child):
         """Add a child component under this model component.
 
@@ -96,8 +109,10 @@ class ModelComponent(object):
         """
         if not isinstance(child, ModelComponent):
             raise TypeError('require a ModelComponent instance.')
+        self._unindex_subtree(self.children.get(child.name))
         self.children[child.name] = child
         child.parent = self
+        self._index_subtree(child)
 
     def add_children(self, children):
         """Add a list of children to current component.
@@ -115,8 +130,54 @@ class ModelComponent(object):
         for child in children:
             if not isinstance(child, ModelComponent):
                 raise TypeError('require a ModelComponent instance.')
+            self._unindex_subtree(self.children.get(child.name))
             self.children[child.name] = child
             child.parent = self
+            self._index_subtree(child)
+
+    def _get_root(self):
+        """Return the root of the tree containing this component."""
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        return node
+
+    def _iter_subtree(self, path):
+        """Iterate over (path, component) for all the components in the
+        subtree rooted at this component, where `path` is the path of
+        this component."""
+        stack = [(path, self)]
+        while stack:
+            path, node = stack.pop()
+            yield path, node
+            stack.extend(('{}/{}'.format(path, child.name), child)
+                         for child in node.children.values())
+
+    def _index_subtree(self, child):
+        """Insert the subtree rooted at `child`, which has just been
+        added under this component, into the index of the root."""
+        # `child` is not a root any more and its own index is stale.
+        child._id_path_dict = None
+        child._path_node_dict = None
+        root = self._get_root()
+        if root._path_node_dict is None:
+            return
+        for path, node in child._iter_subtree(child.path):
+            root._id_path_dict[node.uid] = path
+            root._path_node_dict[path] = node
+
+    def _unindex_subtree(self, child):
+        """Remove the subtree rooted at `child`, which is being replaced
+        under this component, from the index of the root."""
+        if child is None:
+            return
+        root = self._get_root()
+        if root._path_node_dict is None:
+            return
+        for path, node in child._iter_subtree(child.path):
+            root._path_node_dict.pop(path, None)
+            if root._id_path_dict.get(node.uid) == path:
+                del root._id_path_dict[node.uid]
 
     def get_node(self, path):
         """Get node at `path` relative to this node.
@@ -138,6 +199,7 @@ class ModelComponent(object):
             if name == '':
                 continue
             node = node.children[name]
+        return node
 
     def visit(self, function, *args, **kwargs):
         """Visit the subtree starting with `node` recursively, applying
@@ -210,20 +272,22 @@ class ModelComponent(object):
         return '/' + pth
 
     def update_id_path_dict(self):
-        """Update the id->path mapping.
+        """Rebuild the id->path and path->component mappings for the
+        subtree rooted at this component.
 
-        This must be called before using get_id_path_dict whenever the
-        model tree is been modified
+        On the root of a tree these mappings are updated by
+        `add_child` and `add_children`. This needs to be called only
+        if the tree was modified otherwise, or for getting the
+        mappings of a subtree after it has been modified.
 
         .. seealso:: get_id_path_dict
 
         """
-        if self._id_path_dict is None:
-            self._id_path_dict = {}
-        def update_dict(node, dictobj):
-            """Insert the (uid, path) of `node` into `dictobj`."""
-            dictobj[node.uid] = node.path
-        self.visit(update_dict, self._id_path_dict)
+        self._id_path_dict = {}
+        self._path_node_dict = {}
+        for path, node in self._iter_subtree(self.path):
+            self._id_path_dict[node.uid] = path
+            self._path_node_dict[path] = node
 
     def get_id_path_dict(self):
         """Return a dictionary mapping the unique id of the model components
@@ -232,10 +296,135 @@ class ModelComponent(object):
         .. seealso:: update_id_path_dict
 
         """
-        if (self._id_path_dict is None) or (len(self._id_path_dict) == 0):
+        if self._id_path_dict is None:
             self.update_id_path_dict()
         return self._id_path_dict
 
+    def get_path_node_dict(self):
+        """Return a dictionary mapping the path of the model components
+        in modeltree to the components.
+
+        .. seealso:: update_id_path_dict
+
+        """
+        if self._path_node_dict is None:
+            self.update_id_path_dict()
+        return self._path_node_dict
+
+class ModelTable(object):
+    """Model tree stored as columns, one row per component.
+
+    Attributes:
+        names (array): names of the components.
+
+        uids (array): unique ids of the components.
+
+        parents (array): row index of the parent of each
+            component. -1 for components at the top level.
+
+        attrs (dict): attribute name -> array with the value of that
+            attribute for each component. The arrays can be HDF5
+            datasets, they are read on first access.
+
+        present (dict): attribute name -> boolean array that is True
+            for the components having that attribute, for attributes
+            that not all components have. Like `attrs`, read on first
+            access.
+
+    """
+    def __init__(self, names, uids, parents, attrs=None, present=None):
+        self.names = names
+        self.uids = uids
+        self.parents = np.asarray(parents)
+        self.attrs = attrs if attrs is not None else {}
+        self.present = present if present is not None else {}
+        self._attr_cache = {}
+        self._present_cache = {}
+        self._order = None
+        self._starts = None
+
+    def get_children(self, index):
+        """Return the row indices of the children of row `index` (-1 for
+        the top level)."""
+        if self._order is None:
+            self._order = np.argsort(self.parents, kind='mergesort')
+            self._starts = np.searchsorted(self.parents[self._order],
+                                           np.arange(-1, len(self.parents)
+                                                     + 1))
+        return self._order[self._starts[index + 1]:
+                           self._starts[index + 2]]
+
+    def get_attrs(self, index):
+        """Return the attributes of the component in row `index` as a
+        dict. Attributes the component does not have are left out."""
+        attrs = {}
+        for key in self.attrs:
+            if key in self.present:
+                try:
+                    mask = self._present_cache[key]
+                except KeyError:
+                    mask = np.asarray(self.present[key])
+                    self._present_cache[key] = mask
+                if not mask[index]:
+                    continue
+            try:
+                values = self._attr_cache[key]
+            except KeyError:
+                values = np.asarray(self.attrs[key])
+                self._attr_cache[key] = values
+            attrs[key] = values[index]
+        return attrs
+
+
+class TableModelComponent(ModelComponent):
+    """ModelComponent for a row of a ModelTable.
+
+    The children and attributes of the component are created from the
+    table when they are first accessed, so that only the parts of a
+    large tree that are actually visited are built.
+
+    """
+    def __init__(self, table, index=-1, name='modeltable', uid=None,
+                 parent=None):
+        if index >= 0:
+            name = table.names[index]
+            uid = table.uids[index]
+        super(TableModelComponent, self).__init__(name, uid=uid)
+        self.parent = parent
+        self.table = table
+        self.index = index
+        self._children = None
+        self._attrs = None
+
+    @property
+    def children(self):
+        """dict of child components, created on first access"""
+        if self._children is None:
+            self._children = {}
+            for index in self.table.get_children(self.index):
+                child = TableModelComponent(self.table, index, parent=self)
+                self._children[child.name] = child
+        return self._children
+
+    @children.setter
+    def children(self, value):
+        self._children = value
+
+    @property
+    def attrs(self):
+        """attributes of the component, read on first access"""
+        if self._attrs is None:
+            if self.index >= 0:
+                self._attrs = self.table.get_attrs(self.index)
+            else:
+                self._attrs = {}
+        return self._attrs
+
+    @attrs.setter
+    def attrs(self, value):
+        self._attrs = value
+
+
 def common_prefix(paths, sep='/'):
     """Find the common prefix of paths.
 
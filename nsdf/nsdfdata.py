@@ -109,6 +109,23 @@ class NSDFData(object):
         """
         self._src_data_dict.update(src_data)
 
+    def set_source_data_dict(self, src_data):
+        """Replace the mapping from source->data with `src_data`.
+
+        Unlike `update_source_data_dict` this keeps `src_data` itself
+        instead of copying its contents, so that it can be a mapping
+        that reads the data on access, like the `nsdf.DatasetView`
+        objects used by `NSDFReader` in lazy mode.
+
+        Args:
+            src_data (mapping): mapping from source id to data.
+
+        Returns:
+            None
+
+        """
+        self._src_data_dict = src_data
+
     def get_sources(self):
         """Return the source ids as a list"""
         return self._src_data_dict.keys()
@@ -136,19 +153,123 @@ class UniformData(TimeSeriesData):
     
         tunit (float): unit of time.
 
+        tstart (float): time of the first data point. Default: 0.0
+
     """
     def __init__(self, *args, **kwargs):
         dt = kwargs.pop('dt', 1.0)
         tunit = kwargs.pop('tunit', 's')
+        tstart = kwargs.pop('tstart', 0.0)
         super(UniformData, self).__init__(*args, **kwargs)
         self.dt = dt
         self.tunit = tunit
+        self.tstart = tstart
+        self._block = None
+        self._block_sources = None
+        # source -> row of `_block`
+        self._block_rows = None
         
     def set_dt(self, value, unit):
         """Set the timestep used for data recording."""
         self.dt = value
         self.tunit = unit
 
+    def put_block(self, block, sources=None):
+        """Set the data for all the sources at once.
+
+        The writer passes `block` to h5py as it is, without creating
+        per-source arrays or copying it into a new array. This
+        replaces any data set earlier with `put_data`.
+
+        Args:
+            block (2D array): data with one row per source in the
+                order of the source dimension scale (`source_ds`)
+                and one column per time point.
+
+            sources (sequence of str): uids of the sources in the
+                order of the rows. If specified, the writer checks
+                that these are the same as the entries of
+                `source_ds`, and `get_data` can be used for
+                individual sources. Default: None.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError if `block` is not 2D or its number of rows is
+            not same as the number of `sources`.
+
+        """
+        block = np.asarray(block, dtype=self.dtype)
+        if block.ndim != 2:
+            raise ValueError('`block` must be a 2D array.')
+        if sources is not None:
+            sources = getattr(sources, 'uids', sources)
+            if len(sources) != block.shape[0]:
+                raise ValueError('number of rows in `block` must be same'
+                                 ' as the number of sources.')
+        self._src_data_dict = {}
+        self._block = block
+        self._block_sources = sources
+        if sources is not None:
+            self._block_rows = dict((source, row) for row, source
+                                    in enumerate(sources))
+        else:
+            self._block_rows = None
+
+    def get_block(self):
+        """Return the 2D array set by `put_block` and the list of
+        sources corresponding to its rows (None if unspecified).
+        Returns (None, None) if data was set per source."""
+        return self._block, self._block_sources
+
+    def _clear_block(self):
+        if self._block is not None:
+            if self._block_rows is not None:
+                self._src_data_dict = dict(
+                    (source, self._block[row])
+                    for source, row in self._block_rows.items())
+            self._block = None
+            self._block_sources = None
+            self._block_rows = None
+
+    def put_data(self, source, data):
+        """Set the data array for source. See `NSDFData.put_data`."""
+        self._clear_block()
+        super(UniformData, self).put_data(source, data)
+
+    def update_source_data_dict(self, src_data):
+        """Insert a bunch of source, data pairs. See
+        `NSDFData.update_source_data_dict`."""
+        self._clear_block()
+        super(UniformData, self).update_source_data_dict(src_data)
+
+    def set_source_data_dict(self, src_data):
+        """Replace the mapping from source->data. See
+        `NSDFData.set_source_data_dict`."""
+        self._block = None
+        self._block_sources = None
+        self._block_rows = None
+        super(UniformData, self).set_source_data_dict(src_data)
+
+    def get_sources(self):
+        """Return the source ids as a list"""
+        if self._block_sources is not None:
+            return list(self._block_sources)
+        return super(UniformData, self).get_sources()
+
+    def get_all_data(self):
+        """Return the data for all the sources as a list."""
+        if self._block_sources is not None:
+            return list(self._block)
+        return super(UniformData, self).get_all_data()
+
+    def get_data(self, source):
+        """Return the data for specified source"""
+        if self._block_sources is not None:
+            return self._block[self._block_rows[source]]
+        return super(UniformData, self).get_data(source)
+
         
 class NonuniformData(TimeSeriesData):
     """Stores nonuniformly sampled data.
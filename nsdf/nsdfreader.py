@@ -47,16 +47,168 @@
 
 """Reader for NSDF format"""
 
+from collections import Mapping
 import h5py as h5
 import numpy as np
 
-from .model import ModelComponent, common_prefix
+from .model import ModelComponent, ModelTable, TableModelComponent, \
+    common_prefix
 from .constants import *
 from .util import *
 from .nsdfdata import *
 from datetime import datetime
 
 
+class TransposedDataset(object):
+    """Read-only view of a 2D HDF5 dataset with its axes swapped.
+
+    Uniformly sampled data stored in TIMEMAJOR layout is presented
+    through this so that, like in the default layout, the i-th row is
+    the data from the i-th source. Indexing reads only the selected
+    part of the dataset.
+
+    Attributes:
+        dataset (h5py.Dataset): the underlying dataset.
+
+    """
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    @property
+    def shape(self):
+        return self.dataset.shape[::-1]
+
+    @property
+    def dtype(self):
+        return self.dataset.dtype
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def name(self):
+        return self.dataset.name
+
+    @property
+    def attrs(self):
+        return self.dataset.attrs
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        if not isinstance(index, tuple):
+            index = (index,)
+        index = index + (slice(None),) * (2 - len(index))
+        return np.asarray(self.dataset[index[::-1]]).T
+
+    def __iter__(self):
+        for ii in range(len(self)):
+            yield self[ii]
+
+    def __array__(self, dtype=None):
+        return np.asarray(self.dataset[()], dtype=dtype).T
+
+
+class DatasetRow(object):
+    """Read-only view of one row of a 2D HDF5 dataset.
+
+    Indexing with an integer or a slice reads only the selected
+    elements of the row. Converting to a numpy array reads the whole
+    row.
+
+    Attributes:
+        dataset (h5py.Dataset or TransposedDataset): the underlying
+            dataset.
+
+        index (int): index of the row.
+
+    """
+    def __init__(self, dataset, index, length=None):
+        """Initialize the view of row `index` of `dataset`, limited to
+        its first `length` entries if specified (e.g. to leave out
+        the NaN padding)."""
+        self.dataset = dataset
+        self.index = index
+        self._length = dataset.shape[1] if length is None else int(length)
+
+    @property
+    def shape(self):
+        return (self._length,)
+
+    @property
+    def dtype(self):
+        return self.dataset.dtype
+
+    @property
+    def ndim(self):
+        return 1
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step > 0:
+                if stop <= start:
+                    return np.zeros(0, dtype=self.dtype)
+                return np.asarray(self.dataset[self.index,
+                                               start:stop:step])
+        elif isinstance(index, (int, long, np.integer)):
+            if index < 0:
+                index += self._length
+            if not 0 <= index < self._length:
+                raise IndexError('index out of range')
+            return self.dataset[self.index, index]
+        return np.asarray(self)[index]
+
+    def __iter__(self):
+        return iter(np.asarray(self))
+
+    def __array__(self, dtype=None):
+        return np.asarray(self.dataset[self.index, :self._length],
+                          dtype=dtype)
+
+
+class DatasetView(Mapping):
+    """Read-only mapping from source ids to their data in an open NSDF
+    file. The data of a source is read, or a lazy view of it created,
+    only when the source is looked up.
+
+    The reader that created it must be open while it is used.
+
+    """
+    def __init__(self, sources, getter):
+        """Initialize the view.
+
+        Args:
+            sources (sequence of str): ids of the sources in the
+                order of their index in the file.
+
+            getter (callable): function that takes the index of a
+                source and returns its data.
+
+        """
+        self._sources = list(sources)
+        self._index = dict((source, iii) for iii, source in
+                           enumerate(self._sources))
+        self._getter = getter
+
+    def __getitem__(self, source):
+        return self._getter(self._index[source])
+
+    def __iter__(self):
+        return iter(self._sources)
+
+    def __len__(self):
+        return len(self._sources)
+
+    def __contains__(self, source):
+        return source in self._index
+
+
 class NSDFReader(object):
     """Reader for NSDF files.
     
@@ -72,6 +224,11 @@ class NSDFReader(object):
         self.model = self._fd['model']
         self.mapping = self._fd['map']
         self.dialect = str(self._fd.attrs['dialect'])
+        self.linkage = str(self._fd.attrs.get('linkage', linkage.DIMSCALE))
+        self._source_index = None
+        self._catalog = None
+        # (sampling, population, variable) -> stored catalog entry
+        self._catalog_entries = None
 
     def __del__(self):
         self._fd.close()
@@ -139,7 +296,7 @@ class NSDFReader(object):
         with uniform sampling.
 
         """
-        return self.data[UNIFORM].keys()
+        return self._get_populations(UNIFORM)
     
     @property
     def nonuniform_populations(self):
@@ -147,7 +304,7 @@ class NSDFReader(object):
         with nonuniform sampling.
 
         """
-        return self.data['nonuniform'].keys()
+        return self._get_populations(NONUNIFORM)
 
     @property
     def event_populations(self):
@@ -155,7 +312,123 @@ class NSDFReader(object):
         recorded.
 
         """
-        return self.data['event'].keys()
+        return self._get_populations(EVENT)
+
+    def get_catalog(self):
+        """Returns the catalog of the recorded variables.
+
+        The catalog stored in `/map/catalog` is used if the file has
+        one (see the `catalog` argument of NSDFWriter), otherwise it
+        is built by walking the `/data` group. The catalog is kept for
+        later calls.
+
+        Returns:
+            numpy.ndarray of CATALOGTYPE entries, one for each
+            recorded variable (see `nsdf.build_catalog`).
+
+        """
+        if self._catalog is None:
+            if 'catalog' in self.mapping:
+                self._catalog = self.mapping['catalog'][:]
+            else:
+                self._catalog = build_catalog(self.data)
+        return self._catalog
+
+    def _get_catalog_entries(self):
+        """Entries of the stored catalog by (sampling, population,
+        variable), or None if the file has no catalog."""
+        if self._catalog_entries is None and 'catalog' in self.mapping:
+            self._catalog_entries = dict(
+                ((str(entry['sampling']), str(entry['population']),
+                  str(entry['variable'])), entry)
+                for entry in self.get_catalog())
+        return self._catalog_entries
+
+    def _get_populations(self, sampling):
+        """Names of the populations with data of `sampling` type"""
+        entries = self._get_catalog_entries()
+        if entries is None:
+            return self.data[sampling].keys()
+        return sorted(set(population for stype, population, variable
+                          in entries if stype == sampling))
+
+    def _get_variables(self, sampling, population):
+        """Names of the variables of `sampling` type recorded for
+        `population`"""
+        entries = self._get_catalog_entries()
+        if entries is None:
+            return self.data[sampling][population].keys()
+        keys = [key for key in entries
+                if key[:2] == (sampling, population)]
+        if len(keys) == 0:
+            raise KeyError('no population {} with {} data'.format(
+                population, sampling))
+        return sorted(variable for stype, popname, variable in keys
+                      if variable)
+
+    def get_variable_info(self, sampling, population, variable):
+        """Returns the metadata of `variable` recorded from
+        `population`.
+
+        This is the entry of the catalog stored in the file, or read
+        from the attributes of the data if there is none.
+
+        Args:
+            sampling (str): sampling type (nsdf.UNIFORM,
+                nsdf.NONUNIFORM, nsdf.EVENT or nsdf.STATIC).
+
+            population (str): name of the population.
+
+            variable (str): name of the variable.
+
+        Returns:
+            dict with the fields of CATALOGTYPE as keys (see
+            `nsdf.build_catalog`), except that `shape` is a tuple of
+            the used dimensions.
+
+        Raises:
+            KeyError if the variable is not recorded.
+
+        """
+        entries = self._get_catalog_entries()
+        if entries is None:
+            entry = np.array([catalog_entry(
+                sampling, population, variable,
+                self.data[sampling][population][variable])],
+                             dtype=CATALOGTYPE)[0]
+        else:
+            try:
+                entry = entries[(sampling, population, variable)]
+            except KeyError:
+                raise KeyError('no {} variable {} recorded from {}'.format(
+                    sampling, variable, population))
+        info = dict((name, entry[name]) for name in CATALOGTYPE.names)
+        info['shape'] = tuple(int(size) for size in entry['shape']
+                              if size >= 0)
+        return info
+
+    def get_modeltable(self):
+        """Returns the model components stored in tabular form by
+        `NSDFWriter.add_modeltable`.
+
+        The columns `name`, `uid` and `parent` are read at once, the
+        attributes are read when first accessed. The components are
+        created as the tree is traversed.
+
+        Returns:
+            TableModelComponent: root of the tree. The components
+            without a parent are its children.
+
+        Raises:
+            KeyError if there is no `/model/modeltable` in the file.
+
+        """
+        grp = self.model['modeltable']
+        attrs = dict(grp['attrs'].items()) if 'attrs' in grp else {}
+        present = dict(grp['present'].items()) if 'present' in grp else {}
+        table = ModelTable(grp['name'][:], grp['uid'][:], grp['parent'][:],
+                           attrs, present)
+        return TableModelComponent(table)
 
     def get_uniform_vars(self, population):
         """Returns the names of uniform variables recorded for `population`.
@@ -167,7 +440,7 @@ class NSDFReader(object):
             list of str: names of the datasets storing uniform variables.
 
         """
-        return self.data[UNIFORM][population].keys()
+        return self._get_variables(UNIFORM, population)
 
     def get_nonuniform_vars(self, population):
         """Returns the names of nonuniform variables recorded for `population`.
@@ -179,7 +452,7 @@ class NSDFReader(object):
             list of str: names of the groups storing nonuniform variables.
 
         """
-        return self.data['nonuniform'][population].keys()
+        return self._get_variables(NONUNIFORM, population)
 
     
     def get_event_vars(self, population):
@@ -192,7 +465,7 @@ class NSDFReader(object):
             list of str: names of the groups storing event variables.
 
         """
-        return self.data['event'][population].keys()
+        return self._get_variables(EVENT, population)
 
     def get_uniform_dataset(self, population, varname):
         """Returns the data sources and data contents for recorded variable
@@ -205,22 +478,45 @@ class NSDFReader(object):
 
         Returns:
 
-            (sources, data): `sources` is an dataset containing the
-                source identifiers and data is a 2D dataset whose i-th
-                row is the data from the i-th entry in `sources`.
+            (sources, data): `sources` is the dataset under
+                `/map/uniform` containing the source identifiers of
+                `population` and data is a 2D dataset whose i-th
+                row is the data from the i-th entry in `sources`. For
+                data in TIMEMAJOR layout `data` is a
+                TransposedDataset.
 
         """
-        return (self.mapping[UNIFORM][population][varname],
-                self.data[UNIFORM][population][varname])
+        return (self.mapping[UNIFORM][population],
+                self._get_source_major(
+                    self.data[UNIFORM][population][varname]))
+
+    def _get_time_axis(self, dataset):
+        """Index of the time axis of uniformly sampled `dataset`"""
+        return 0 if dataset.attrs.get('layout') == layout.TIMEMAJOR else 1
+
+    def _get_source_major(self, dataset):
+        """Return uniformly sampled `dataset` with one row per source,
+        as a TransposedDataset if it is in TIMEMAJOR layout."""
+        if self._get_time_axis(dataset) == 0:
+            return TransposedDataset(dataset)
+        return dataset
+
+    def _get_scale(self, dataset, axis, label):
+        """Return the dataset labelled `label` that is linked to
+        `dataset` along `axis`, either as a dimension scale or through
+        the `dimension_scales` reference attribute."""
+        return find_scale(dataset, axis, label)
 
     def _get_or_create_uniform_ts(self, dataset):
+        taxis = self._get_time_axis(dataset)
         try:
             tstart = dataset.attrs['tstart']
             dt = dataset.attrs['dt']
             tunit = dataset.attrs['tunit']
-            ts = np.arange(dataset.shape[1], dtype=np.double) * dt + tstart
+            ts = np.arange(dataset.shape[taxis], dtype=np.double) * dt + \
+                 tstart
         except KeyError:
-            ts = dataset.dims[1]['time']
+            ts = self._get_scale(dataset, taxis, 'time')
             tunit = ts.attrs['unit']
         return (ts, tunit)
         
@@ -257,16 +553,93 @@ class NSDFReader(object):
                 unit is a string representing the unit of time.
 
         """
+        entries = self._get_catalog_entries()
+        if entries is not None:
+            entry = entries[(UNIFORM, population, varname)]
+            if not np.isnan(entry['dt']):
+                return (entry['dt'], entry['tunit'])
         data = self.data[UNIFORM][population][varname]
         try:
             dt = data.attrs['dt']
             tunit = data.attrs['tunit']
             return (dt, tunit)
         except KeyError:
-            ts = data.dims[1]['time']
+            ts = self._get_scale(data, self._get_time_axis(data), 'time')
             tunit = ts.attrs['unit']
         return (ts[1]-ts[0], tunit)
 
+    def get_source_index(self):
+        """Returns the index of all sources in the file.
+
+        The index stored in `/map/sourceindex` is used if the file has
+        one (see the `sourceindex` argument of NSDFWriter), otherwise
+        it is built by reading every source dataset once. The index
+        is kept for later calls.
+
+        Returns:
+            dict mapping each source id to a list of (sampling,
+            population, row) tuples, where `row` is the index of the
+            source in the source dataset
+            `/map/{sampling}/{population}`. For ONED nonuniform and
+            event data `population` is `{population}/{variable}`.
+
+        """
+        if self._source_index is None:
+            if 'sourceindex' in self.mapping:
+                entries = self.mapping['sourceindex'][:]
+            else:
+                entries = scan_source_maps(self.mapping)
+            index = {}
+            for source, sampling, population, row in entries:
+                index.setdefault(str(source), []).append(
+                    (str(sampling), str(population), int(row)))
+            self._source_index = index
+        return self._source_index
+
+    def get_source_datasets(self, srcid):
+        """Returns the datasets recorded from source with unique id
+        `srcid`.
+
+        Args:
+            srcid (str): unique id of the source.
+
+        Returns:
+            list of (sampling, population, variable, dataset, row)
+            tuples. `dataset` is source-major (see
+            TransposedDataset) and `row` is the index of the source
+            in it. For ONED nonuniform and event data `dataset` is
+            the dataset of this source alone and `row` is None. For
+            CSR data `row` indexes the offset dataset and for RASTER
+            event tables it is the value of the `source` field in
+            the entries of this source.
+
+        Raises:
+            KeyError if there is no source `srcid` in the file.
+
+        """
+        ret = []
+        for sampling, population, row in self.get_source_index()[srcid]:
+            srcmap = self.mapping[sampling][population]
+            popname = population.partition('/')[0]
+            if popname not in self.data[sampling]:
+                continue
+            for name, item in self.data[sampling][popname].items():
+                if 'source' in item.attrs:
+                    if self._fd[item.attrs['source']] != srcmap:
+                        continue
+                elif isinstance(item, h5.Group) or \
+                     srcmap.dtype.fields is not None:
+                    continue
+                if isinstance(item, h5.Group):
+                    ref = srcmap['data', row]
+                    if ref:
+                        ret.append((sampling, popname, str(name),
+                                    self._fd[ref], None))
+                else:
+                    ret.append((sampling, popname, str(name),
+                                self._get_source_major(item), row))
+        return ret
+
     def get_uniform_row(self, srcid, field):
         """Get the data for `field` variable recorded from source with
         unique id `srcid`.
@@ -280,21 +653,68 @@ class NSDFReader(object):
             (data, unit, times, timeunit)
 
         """
-        for srcmap in self.mapping[UNIFORM]:
-            sources = np.asarray(srcmap, dtype=str)
-            indices = np.where(sources == srcid)[0]
-            if indices:
-                index = indices[0]
-                for refinfo, dtype in sources.attrs['REFERENCE_LIST']:
-                    ref = refinfo[0]
-                    dataset = self._fd[ref]
-                    if dataset.attrs['field'] == field:
-                        data = np.asarray(dataset[index])
-                        unit =  dataset.attrs['unit']
-                        ts, tunit = self._get_or_create_uniform_ts(dataset)
-                        return (data, unit, ts, tunit)
-
-    def get_uniform_data(self, population, variable):
+        for sampling, popname, index in self.get_source_index().get(
+                srcid, ()):
+            if sampling != UNIFORM or popname not in self.data[UNIFORM]:
+                continue
+            for dataset in self.data[UNIFORM][popname].values():
+                if dataset.attrs['field'] == field:
+                    data = np.asarray(
+                        self._get_source_major(dataset)[index])
+                    unit =  dataset.attrs['unit']
+                    ts, tunit = self._get_or_create_uniform_ts(dataset)
+                    return (data, unit, ts, tunit)
+
+    def get_uniform_rows(self, population, variable, uids):
+        """Returns the data of recorded `variable` from the sources with
+        ids `uids` in `population`.
+
+        The rows are sorted and merged into runs (see
+        `coalesce_indices`) that are each read with a single hyperslab
+        selection, and each chunk of the dataset is read at most
+        once.
+
+        Args:
+            population (str): name of the population.
+
+            variable (str): name of the variable.
+
+            uids (sequence of str): ids of the sources, in any order
+                and possibly repeated.
+
+        Returns:
+            2D array whose i-th row is the data of the source
+            `uids[i]`.
+
+        Raises:
+            KeyError if a source is not in the population.
+
+        """
+        data = self.data[UNIFORM][population][variable]
+        index = dict((source, iii) for iii, source in
+                     enumerate(self.mapping[UNIFORM][population][:]))
+        try:
+            rows = np.array([index[uid] for uid in uids], dtype=np.int64)
+        except KeyError as error:
+            raise KeyError('no source {} in population {}'.format(
+                error.args[0], population))
+        saxis = 1 - self._get_time_axis(data)
+        blocksize = 1 if data.chunks is None else data.chunks[saxis]
+        unique, inverse = np.unique(rows, return_inverse=True)
+        ret = np.empty((len(unique), data.shape[1 - saxis]),
+                       dtype=data.dtype)
+        pos = 0
+        for start, stop in coalesce_indices(unique, blocksize):
+            if saxis == 0:
+                block = data[start:stop]
+            else:
+                block = data[:, start:stop].T
+            end = np.searchsorted(unique, stop)
+            ret[pos:end] = block[unique[pos:end] - start]
+            pos = end
+        return ret[inverse]
+
+    def get_uniform_data(self, population, variable, lazy=False):
         """Returns a UniformData object contents for recorded `variable`
         from `population`.
 
@@ -303,6 +723,12 @@ class NSDFReader(object):
 
             variable (str): name of the variable.
 
+            lazy (bool): if True, the data is not read here. The data
+                object is backed by a DatasetView and `get_data`
+                returns a DatasetRow, so that only the rows, or parts
+                of rows, that are used get read. The reader must stay
+                open while the data object is used. Default: False.
+
         Returns:
 
             dataobject (nsdf.UniformData): data container filled with
@@ -316,68 +742,267 @@ class NSDFReader(object):
                           field=data.attrs['field'],
                           dt=data.attrs['dt'],
                           tunit=data.attrs['tunit'],
+                          tstart=data.attrs.get('tstart', 0.0),
                           dtype=data.dtype)
+        data = self._get_source_major(data)
+        if lazy:
+            ret.set_source_data_dict(DatasetView(
+                mapping[:], lambda iii: DatasetRow(data, iii)))
+            return ret
         for src, row in izip(mapping, data):
             ret.put_data(src, row)
         return ret
 
-    def _get_nonuniform_1d_data(self, data):
+    def _get_uniform_columns(self, dataset, t0, t1):
+        """Return the range (start, stop) of the columns (time points) of
+        uniformly sampled `dataset` in the time window [`t0`, `t1`)
+        and the time of column `start`.
+
+        With `tstart` and `dt` attributes the range is computed
+        without reading the dataset, otherwise the time scale is
+        searched on disk. A None for `t0` or `t1` leaves the window
+        open on that side.
+
+        """
+        taxis = self._get_time_axis(dataset)
+        ncols = dataset.shape[taxis]
+        try:
+            tstart = dataset.attrs['tstart']
+            dt = dataset.attrs['dt']
+        except KeyError:
+            times = self._get_scale(dataset, taxis, 'time')
+            start = 0 if t0 is None else bisect_dataset(times, t0)
+            stop = ncols if t1 is None else \
+                   max(start, bisect_dataset(times, t1, lo=start))
+            return start, stop, times[start] if start < ncols else None
+
+        def index(t):
+            # First column at or after `t`, computed as in
+            # `get_uniform_ts` to avoid rounding errors at the edges.
+            if t is None:
+                return None
+            col = int(min(max(np.ceil((t - tstart) / dt), 0), ncols))
+            while (col > 0) and (tstart + (col - 1) * dt >= t):
+                col -= 1
+            while (col < ncols) and (tstart + col * dt < t):
+                col += 1
+            return col
+
+        start = index(t0) or 0
+        stop = ncols if t1 is None else max(start, index(t1))
+        return start, stop, tstart + start * dt
+
+    def get_uniform_window(self, population, variable, t0=None, t1=None):
+        """Returns a UniformData object with the data of recorded
+        `variable` from `population` in the time window [`t0`, `t1`).
+
+        Only the columns in the window are read, in a single
+        hyperslab selection.
+
+        Args:
+            population (str): name of the population.
+
+            variable (str): name of the variable.
+
+            t0 (float): start of the time window in the time unit of
+                the data. If None, start from the first sample.
+
+            t1 (float): end of the time window (excluded). If None,
+                continue till the last sample.
+
+        Returns:
+
+            dataobject (nsdf.UniformData): data container with the
+                data in the window as a block with one row per
+                source, and `tstart` set to the time of its first
+                column.
+
+        """
+        data = self.data[UNIFORM][population][variable]
+        mapping = self.mapping[UNIFORM][population]
+        start, stop, tstart = self._get_uniform_columns(data, t0, t1)
+        ret = UniformData(data.name.rpartition('/')[-1],
+                          unit=data.attrs['unit'],
+                          field=data.attrs['field'],
+                          dt=data.attrs.get('dt', 1.0),
+                          tunit=data.attrs.get('tunit', 's'),
+                          tstart=tstart,
+                          dtype=data.dtype)
+        block = self._get_source_major(data)[:, start:stop]
+        ret.put_block(block, mapping[:])
+        return ret
+
+    def _get_1d_view(self, datagroup, getter):
+        """DatasetView of ONED `datagroup` that passes the dataset of a
+        source to `getter` on lookup."""
+        srcmap = self._fd[datagroup.attrs['source']][:]
+        return DatasetView(srcmap['source'],
+                           lambda iii: getter(self._fd[srcmap['data'][iii]]))
+
+    def _get_nonuniform_1d_data(self, data, lazy=False):
         ret = NonuniformData(data.name.rpartition('/')[-1],
                              unit=data.attrs['unit'],
                              field=data.attrs['field'])
+        if lazy:
+            view = self._get_1d_view(
+                data, lambda dset: (dset, self._get_scale(dset, 0, 'time')))
+            ret.set_source_data_dict(view)
+            if len(view) > 0:
+                dset, times = view[next(iter(view))]
+                ret.tunit = times.attrs['unit']
+                ret.dtype = dset.dtype
+            return ret
         for name, dset in data.items():
-            times = dset.dims[0]['time']
+            times = self._get_scale(dset, 0, 'time')
             ret.put_data(dset.attrs['source'], (np.asarray(dset),
                                                 np.asarray(times)))
         ret.tunit = times.attrs['unit']
         ret.dtype = dset.dtype
         return ret
 
-    def _get_nonuniform_regular_data(self, data):
-        mapping = data.dims[0]['source']
-        times = data.dims[1]['time']
+    def _get_nonuniform_regular_data(self, data, lazy=False):
+        mapping = self._get_scale(data, 0, 'source')
+        times = self._get_scale(data, 1, 'time')
         ret = NonuniformRegularData(data.name.rpartition('/')[-1],
                                     unit=data.attrs['unit'],
                                     field=data.attrs['field'],
                                     tunit=times.attrs['unit'],
                                     dtype=data.dtype)
         ret.set_times(times)
+        if lazy:
+            ret.set_source_data_dict(DatasetView(
+                mapping[:], lambda iii: DatasetRow(data, iii)))
+            return ret
         for ii in range(data.shape[0]):
             ret.put_data(mapping[ii], data[ii])
         ret.set_times(np.asarray(times), tunit=times.attrs['unit'])
         return ret
 
-    def _get_nonuniform_vlen_data(self, data):
-        mapping = data.dims[0]['source']
-        times = data.dims[0]['time']
+    def _get_nonuniform_vlen_data(self, data, lazy=False):
+        mapping = self._get_scale(data, 0, 'source')
+        times = self._get_scale(data, 0, 'time')
         ret = NonuniformData(data.name.rpartition('/')[-1],
                              unit=data.attrs['unit'],
                              field=data.attrs['field'],
                              tunit=times.attrs['unit'],
                              dtype=np.float64) # h5 only supports vlen with 32 bit float, we convert it to float64
+        if lazy:
+            # A row of a VLEN dataset can only be read as a whole
+            ret.set_source_data_dict(DatasetView(
+                mapping[:], lambda iii: (np.asarray(data[iii], ret.dtype),
+                                         np.asarray(times[iii]))))
+            return ret
         for ii in range(data.shape[0]):
             ret.put_data(mapping[ii], (np.asarray(data[ii]),
                                        np.asarray(times[ii])))
         return ret
         
-    def _get_nonuniform_nan_data(self, data):
-        mapping = data.dims[0]['source']
-        times = data.dims[1]['time']
+    def _get_row_lengths(self, data):
+        """Return the number of valid entries in each row of NaN padded
+        dataset `data`.
+
+        The lengths are read from the dataset referenced by the
+        `length` attribute of `data`. For files without it, each row
+        is scanned for the start of the NaN padding.
+
+        """
+        try:
+            return np.asarray(self._fd[data.attrs['length']])
+        except KeyError:
+            lengths = np.zeros(data.shape[0], dtype=np.int64)
+            for iii in range(data.shape[0]):
+                try:
+                    lengths[iii] = next(find(data[iii], np.isnan))[0][0]
+                except StopIteration:
+                    lengths[iii] = data.shape[1]
+            return lengths
+
+    def _get_nonuniform_nan_data(self, data, lazy=False):
+        mapping = self._get_scale(data, 0, 'source')
+        times = self._get_scale(data, 1, 'time')
         ret = NonuniformData(data.name.rpartition('/')[-1],
                              unit=data.attrs['unit'],
                              field=data.attrs['field'],
                              tunit=times.attrs['unit'])
+        lengths = self._get_row_lengths(data)
+        if lazy:
+            ret.set_source_data_dict(DatasetView(
+                mapping[:],
+                lambda iii: (DatasetRow(data, iii, lengths[iii]),
+                             DatasetRow(times, iii, lengths[iii]))))
+            return ret
         for iii in range(data.shape[0]):
-            try:
-                starts = next(find(data[iii], np.isnan))[0][0]
-            except StopIteration:
-                starts = len(data[iii])                
-            cleaned_data = np.asarray(data[iii,:starts])
-            cleaned_times = np.asarray(times[iii,:starts])
+            cleaned_data = np.asarray(data[iii, :lengths[iii]])
+            cleaned_times = np.asarray(times[iii, :lengths[iii]])
             ret.put_data(mapping[iii], (cleaned_data, cleaned_times))
         return ret
 
-    def get_nonuniform_data(self, population, variable):
+    def _get_csr_rows(self, datasets, offset_ds, start, stop):
+        """Read the data for the sources with index `start` to `stop` - 1
+        from 1D `datasets` in CSR layout.
+
+        The data from the contiguous range of sources in each block
+        written to the file forms one hyperslab, and the hyperslabs of
+        all blocks are read together with a single read of each
+        dataset (see `read_ranges`).
+
+        Args:
+            datasets (list of h5py.Dataset): 1D datasets sharing the
+                offsets in `offset_ds` (e.g. data and sampling times).
+
+            offset_ds (h5py.Dataset): 2D dataset of offsets, one row
+                per block.
+
+            start (int): index of the first source.
+
+            stop (int): index one past the last source.
+
+        Returns:
+            list containing a list of arrays for each entry in
+            `datasets`. The arrays contain the data for each source.
+
+        """
+        offsets = offset_ds[:, start:stop+1]
+        # Position of each block in the values read
+        positions = np.cumsum(np.r_[0, offsets[:, -1] - offsets[:, 0]])
+        ret = []
+        for dataset in datasets:
+            rows = [[] for iii in range(stop - start)]
+            values = read_ranges(dataset, offsets[:, [0, -1]])
+            for block, pos in izip(offsets, positions):
+                bvalues = values[pos: pos + block[-1] - block[0]]
+                for iii, row in enumerate(np.split(bvalues,
+                                                   block[1:-1] - block[0])):
+                    rows[iii].append(row)
+            ret.append([np.concatenate(row) if len(row) > 0
+                        else np.zeros(0, dtype=dataset.dtype)
+                        for row in rows])
+        return ret
+
+    def _get_nonuniform_csr_data(self, data, lazy=False):
+        mapping = self._fd[data.attrs['source']]
+        offset_ds = self._fd[data.attrs['offset']]
+        times = self._get_scale(data, 0, 'time')
+        ret = NonuniformData(data.name.rpartition('/')[-1],
+                             unit=data.attrs['unit'],
+                             field=data.attrs['field'],
+                             tunit=times.attrs['unit'],
+                             dtype=data.dtype,
+                             ttype=times.dtype)
+        if lazy:
+            def getter(iii):
+                (row,), (trow,) = self._get_csr_rows([data, times],
+                                                     offset_ds, iii, iii + 1)
+                return (row, trow)
+            ret.set_source_data_dict(DatasetView(mapping[:], getter))
+            return ret
+        rows, trows = self._get_csr_rows([data, times], offset_ds,
+                                         0, mapping.shape[0])
+        for source, row, trow in izip(mapping, rows, trows):
+            ret.put_data(source, (row, trow))
+        return ret
+
+    def get_nonuniform_data(self, population, variable, lazy=False):
         """Get nonuniform data `variable` under `population`.
 
         In NSDF a variable is recorded from a population of sources
@@ -395,6 +1020,14 @@ class NSDFReader(object):
 
             variable (str): name of the variable this data represents.
 
+            lazy (bool): if True, the data of a source is read only
+                when it is looked up, as a DatasetRow for 2D datasets
+                (the h5py datasets themselves for ONED), so that
+                slicing reads only the selected part. VLEN rows and
+                CSR data of a source are read in full on lookup. The
+                reader must stay open while the data object is
+                used. Default: False.
+
         Returns:
             nsdf.NonuniformRegularData if dialect of the file is NUREGULAR.
             nsdf.NonuniformData otherwise.
@@ -405,51 +1038,284 @@ class NSDFReader(object):
         data = self.data[NONUNIFORM][population][variable]
         mapping = self.mapping[NONUNIFORM][population]
         if self.dialect == dialect.NUREGULAR:
-            return self._get_nonuniform_regular_data(data)
+            return self._get_nonuniform_regular_data(data, lazy)
         elif self.dialect == dialect.VLEN:
-            return self._get_nonuniform_vlen_data(data)
+            return self._get_nonuniform_vlen_data(data, lazy)
         elif self.dialect == dialect.NANPADDED:
-            return self._get_nonuniform_nan_data(data)
+            return self._get_nonuniform_nan_data(data, lazy)
+        elif self.dialect == dialect.CSR:
+            return self._get_nonuniform_csr_data(data, lazy)
+        else:
+            return self._get_nonuniform_1d_data(data, lazy)
+
+    def get_nonuniform_window(self, population, variable, t0=None,
+                              t1=None):
+        """Get nonuniform data `variable` under `population` in the time
+        window [`t0`, `t1`).
+
+        The window is located with a binary search over the sampling
+        times on disk and only the data inside it is read. VLEN rows
+        cannot be read partially, so for the VLEN dialect the rows
+        are read in full and cut to the window in memory. In the CSR
+        dialect the first and last sampling times of each source in
+        each block are read at once, the binary search is done only
+        in the blocks where they straddle `t0` or `t1`, and the data
+        and times in all the windows are read with a single read
+        each.
+
+        Args:
+            population (str): name of the population from which this
+                data was recorded.
+
+            variable (str): name of the variable this data represents.
+
+            t0 (float): start of the time window in the time unit of
+                the data. If None, start from the first sample.
+
+            t1 (float): end of the time window (excluded). If None,
+                continue till the last sample.
+
+        Returns:
+            nsdf.NonuniformRegularData if dialect of the file is NUREGULAR.
+            nsdf.NonuniformData otherwise.
+
+        """
+        data = self.data[NONUNIFORM][population][variable]
+
+        def window(times, lo=0, hi=None):
+            if hi is None:
+                hi = times.shape[0]
+            start = lo if t0 is None else bisect_dataset(times, t0, lo, hi)
+            stop = hi if t1 is None else \
+                   bisect_dataset(times, t1, start, hi)
+            return start, stop
+
+        if self.dialect == dialect.NUREGULAR:
+            mapping = self._get_scale(data, 0, 'source')
+            times = self._get_scale(data, 1, 'time')
+            start, stop = window(times)
+            ret = NonuniformRegularData(data.name.rpartition('/')[-1],
+                                        unit=data.attrs['unit'],
+                                        field=data.attrs['field'],
+                                        tunit=times.attrs['unit'],
+                                        dtype=data.dtype)
+            ret.set_times(times[start:stop])
+            for src, row in izip(mapping[:], data[:, start:stop]):
+                ret.put_data(src, row)
+            return ret
+        if isinstance(data, h5.Group):
+            ret = NonuniformData(data.name.rpartition('/')[-1],
+                                 unit=data.attrs['unit'],
+                                 field=data.attrs['field'])
+            # Sources sharing a time scale share the window too
+            windows = {}
+            for name, dset in data.items():
+                times = self._get_scale(dset, 0, 'time')
+                key = (times.name, dset.shape[0])
+                if key not in windows:
+                    windows[key] = window(times, 0, dset.shape[0])
+                start, stop = windows[key]
+                ret.put_data(dset.attrs['source'], (dset[start:stop],
+                                                    times[start:stop]))
+                ret.tunit = times.attrs['unit']
+                ret.dtype = dset.dtype
+            return ret
+        if self.dialect == dialect.CSR:
+            mapping = self._fd[data.attrs['source']]
+            times = self._get_scale(data, 0, 'time')
+        else:
+            mapping = self._get_scale(data, 0, 'source')
+            times = self._get_scale(data, 0 if self.dialect == dialect.VLEN
+                                    else 1, 'time')
+        if self.dialect == dialect.VLEN:
+            # h5 only supports vlen with 32 bit float, we convert it to
+            # float64
+            dtype = ttype = np.float64
         else:
-            return self._get_nonuniform_1d_data(data)
+            dtype, ttype = data.dtype, times.dtype
+        ret = NonuniformData(data.name.rpartition('/')[-1],
+                             unit=data.attrs['unit'],
+                             field=data.attrs['field'],
+                             tunit=times.attrs['unit'],
+                             dtype=dtype, ttype=ttype)
+        sources = mapping[:]
+        if self.dialect == dialect.VLEN:
+            for iii, src in enumerate(sources):
+                trow = np.asarray(times[iii])
+                start, stop = window(trow)
+                ret.put_data(src, (np.asarray(data[iii])[start:stop],
+                                   trow[start:stop]))
+        elif self.dialect == dialect.NANPADDED:
+            lengths = self._get_row_lengths(data)
+            for iii, src in enumerate(sources):
+                start, stop = window(DatasetRow(times, iii, lengths[iii]))
+                ret.put_data(src, (data[iii, start:stop],
+                                   times[iii, start:stop]))
+        elif self.dialect == dialect.CSR:
+            offsets = self._fd[data.attrs['offset']][:]
+            # Segment of each source in each block, in file order
+            lo, hi = offsets[:, :-1], offsets[:, 1:]
+            start, stop = lo.copy(), hi.copy()
+            nonempty = hi > lo
+            ends = np.unique(np.r_[lo[nonempty], hi[nonempty] - 1])
+            tends = read_ranges(times, izip(ends, ends + 1))
+            first = tends[np.searchsorted(ends, lo[nonempty])]
+            last = tends[np.searchsorted(ends, hi[nonempty] - 1)]
+            # Segments entirely inside or outside the window are
+            # taken or skipped whole, the others are searched on disk
+            segs = np.transpose(np.nonzero(nonempty))
+            for (blk, iii), tfirst, tlast in izip(segs, first, last):
+                if (t0 is not None) and (tfirst < t0):
+                    start[blk, iii] = hi[blk, iii] if tlast < t0 else \
+                        bisect_dataset(times, t0, lo[blk, iii],
+                                       hi[blk, iii])
+                if (t1 is not None) and (tlast >= t1):
+                    stop[blk, iii] = start[blk, iii] if tfirst >= t1 else \
+                        bisect_dataset(times, t1, start[blk, iii],
+                                       hi[blk, iii])
+            stop = np.maximum(start, stop)
+            ranges = zip(start.ravel(), stop.ravel())
+            dvalues = read_ranges(data, ranges)
+            tvalues = read_ranges(times, ranges)
+            # Gather the windows of each source over all blocks
+            lengths = stop - start
+            splits = np.cumsum(lengths.sum(axis=0))[:-1]
+            dstart = np.cumsum(np.r_[0, lengths.ravel()])[:-1]
+            dstart = dstart.reshape(lengths.shape).T.ravel()
+            lengths = lengths.T.ravel()
+            index = np.repeat(dstart, lengths) + np.arange(lengths.sum()) - \
+                    np.repeat(np.cumsum(np.r_[0, lengths])[:-1], lengths)
+            rows = dvalues[index]
+            trows = tvalues[index]
+            for src, row, trow in izip(sources, np.split(rows, splits),
+                                       np.split(trows, splits)):
+                ret.put_data(src, (row, trow))
+        return ret
 
-    def _get_event_1d_data(self, datagroup):
+    def _get_event_1d_data(self, datagroup, lazy=False):
         ret = EventData(datagroup.name.rpartition('/')[-1],
                         unit=datagroup.attrs['unit'],
                         field=datagroup.attrs['field'])
+        if lazy:
+            view = self._get_1d_view(datagroup, lambda dset: dset)
+            ret.set_source_data_dict(view)
+            if len(view) > 0:
+                ret.dtype = view[next(iter(view))].dtype
+            return ret
         for name, dataset in datagroup.items():
             ret.put_data(dataset.attrs['source'],
                          np.asarray(dataset))
         ret.dtype = dataset.dtype
         return ret
 
-    def _get_event_vlen_data(self, data):
+    def _get_event_vlen_data(self, data, lazy=False):
         ret = EventData(data.name.rpartition('/')[-1],
                         unit=data.attrs['unit'],
                         field=data.attrs['field'],
                         dtype=np.float64) # h5 only supports vlen with 32 bit float, we convert it to float64
-        mapping = data.dims[0]['source']
+        mapping = self._get_scale(data, 0, 'source')
+        if lazy:
+            ret.set_source_data_dict(DatasetView(
+                mapping[:], lambda iii: np.asarray(data[iii], ret.dtype)))
+            return ret
         for iii in range(data.shape[0]):
             row = np.asarray(data[iii])
             ret.put_data(mapping[iii], row)
         return ret
 
-    def _get_event_nan_data(self, data):
+    def _get_event_nan_data(self, data, lazy=False):
         ret = EventData(data.name.rpartition('/')[-1],
                         unit=data.attrs['unit'],
                         field=data.attrs['field'],
                         dtype=data.dtype)
-        mapping = data.dims[0]['source']
+        mapping = self._get_scale(data, 0, 'source')
+        lengths = self._get_row_lengths(data)
+        if lazy:
+            ret.set_source_data_dict(DatasetView(
+                mapping[:],
+                lambda iii: DatasetRow(data, iii, lengths[iii])))
+            return ret
         for iii in range(data.shape[0]):
-            try:
-                starts = next(find(data[iii], np.isnan))[0][0]
-            except StopIteration:
-                starts = len(data[iii])                
-            cleaned_data = np.asarray(data[iii,:starts])
+            cleaned_data = np.asarray(data[iii, :lengths[iii]])
             ret.put_data(mapping[iii], cleaned_data)
         return ret
 
-    def get_event_data(self, population, variable):
+    def _get_event_csr_data(self, data, lazy=False):
+        ret = EventData(data.name.rpartition('/')[-1],
+                        unit=data.attrs['unit'],
+                        field=data.attrs['field'],
+                        dtype=data.dtype)
+        mapping = self._fd[data.attrs['source']]
+        offset_ds = self._fd[data.attrs['offset']]
+        if lazy:
+            ret.set_source_data_dict(DatasetView(
+                mapping[:],
+                lambda iii: self._get_csr_rows([data], offset_ds,
+                                               iii, iii + 1)[0][0]))
+            return ret
+        rows, = self._get_csr_rows([data], offset_ds, 0, mapping.shape[0])
+        for source, row in izip(mapping, rows):
+            ret.put_data(source, row)
+        return ret
+
+    def _get_event_raster_data(self, data):
+        ret = EventData(data.name.rpartition('/')[-1],
+                        unit=data.attrs['unit'],
+                        field=data.attrs['field'],
+                        dtype=data.dtype['time'])
+        mapping = self._fd[data.attrs['source']]
+        if mapping.dtype.fields is not None:
+            mapping = mapping['source']
+        table = np.asarray(data)
+        order = np.argsort(table['source'], kind='mergesort')
+        counts = np.bincount(table['source'], minlength=len(mapping))
+        rows = np.split(table['time'][order], np.cumsum(counts)[:-1])
+        for source, row in izip(mapping, rows):
+            ret.put_data(source, row)
+        return ret
+
+    def get_event_raster(self, population, variable, t0=None, t1=None):
+        """Get the events recorded from `population` in the time window
+        [`t0`, `t1`) from a dataset in RASTER layout.
+
+        The window is located with a binary search over the time
+        column on disk and only the events inside it are read.
+
+        Args:
+            population (str): name of the population from which this
+                data was recorded.
+
+            variable (str): name of the variable this data represents.
+
+            t0 (float): start of the time window. If None, start from
+                the first event.
+
+            t1 (float): end of the time window (excluded). If None,
+                continue till the last event.
+
+        Returns: 
+            (times, sources) arrays containing the time of each event
+            in the window in increasing order and the uid of the
+            source of each event.
+
+        Raises:
+            ValueError if the dataset is not in RASTER layout.
+
+        """
+        data = self.data[EVENT][population][variable]
+        if data.attrs.get('layout') != layout.RASTER:
+            raise ValueError('{} is not in RASTER layout'.format(data.name))
+        start = 0 if t0 is None else bisect_dataset(data, t0, field='time')
+        stop = data.shape[0] if t1 is None else \
+               bisect_dataset(data, t1, lo=start, field='time')
+        table = data[start:stop]
+        mapping = self._fd[data.attrs['source']]
+        if mapping.dtype.fields is not None:
+            mapping = mapping['source']
+        sources = np.asarray(mapping)[table['source']]
+        return (table['time'], sources)
+
+    def get_event_data(self, population, variable, lazy=False):
         """Get event variable recorded from population.
 
         In NSDF a variable is recorded from a population of sources
@@ -463,18 +1329,28 @@ class NSDFReader(object):
 
             variable (str): name of the variable this data represents.
 
+            lazy (bool): if True, the data of a source is read only
+                when it is looked up (see `get_nonuniform_data`).
+                Data in RASTER layout is always read in full.
+                Default: False.
+
         Returns: nsdf.EventData
 
-        Note: Data is converted to float64 for VLEN dialect.
+        Note: Data is converted to float64 for VLEN dialect. Data in
+            RASTER layout is split into the event times of each source.
 
         """
         data = self.data[EVENT][population][variable]
-        if self.dialect == dialect.VLEN:
-            return self._get_event_vlen_data(data)
+        if data.attrs.get('layout') == layout.RASTER:
+            return self._get_event_raster_data(data)
+        elif self.dialect == dialect.VLEN:
+            return self._get_event_vlen_data(data, lazy)
         elif self.dialect == dialect.NANPADDED:
-            return self._get_event_nan_data(data)
+            return self._get_event_nan_data(data, lazy)
+        elif self.dialect == dialect.CSR:
+            return self._get_event_csr_data(data, lazy)
         else:
-            return self._get_event_1d_data(data)
+            return self._get_event_1d_data(data, lazy)
             
         
 # 
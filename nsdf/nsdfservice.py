@@ -0,0 +1,349 @@
+# nsdfservice.py ---
+#
+# Filename: nsdfservice.py
+# Description:
+# Author:
+# Maintainer:
+# Created:
+# Version:
+# Last-Updated:
+#           By:
+#     Update #: 0
+# URL:
+# Keywords:
+# Compatibility:
+#
+#
+
+# Commentary:
+#
+#
+#
+#
+
+# Change log:
+#
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street, Fifth
+# Floor, Boston, MA 02110-1301, USA.
+#
+#
+
+# Code:
+"""
+Writer service running NSDFWriter in a separate process.
+
+The simulation process declares the recorded variables as streams,
+starts the service and then pushes the values of each step into the
+stream. A stream is a ring buffer in shared memory, so pushing data
+involves no pickling or copying through pipes. The service process
+moves the data from the rings into an NSDFWriter.
+
+Example::
+
+    service = nsdf.NSDFWriterService('out.h5', mode='w')
+    vm = service.add_uniform_stream('soma', ['c0', 'c1'], 'Vm',
+                                    unit='mV', dt=0.1, tunit='ms')
+    service.start()
+    for step in range(nsteps):
+        ...
+        vm.push([c0_vm, c1_vm])
+    service.close()
+
+"""
+
+import time
+import ctypes
+import traceback
+import multiprocessing as mp
+from multiprocessing import sharedctypes
+import numpy as np
+
+from .constants import *
+from .nsdfdata import UniformData
+from .nsdfwriter import NSDFWriter
+
+
+class UniformStream(object):
+    """Ring buffer in shared memory for uniformly sampled data from a
+    population of sources.
+
+    Only one process may push data into a stream and the stream is
+    drained by the service process.
+
+    Attributes:
+        popname (str): name of the source population.
+
+        idlist (list of str): unique identifiers of the sources.
+
+        data_object (nsdf.UniformData): data object with the
+            properties (name, unit, field, dt, tunit) of the recorded
+            variable.
+
+        capacity (int): number of time steps the ring can hold.
+
+    """
+    def __init__(self, service, popname, idlist, data_object, capacity):
+        self.service = service
+        self.popname = popname
+        self.idlist = list(idlist)
+        self.data_object = data_object
+        self.capacity = capacity
+        nbytes = capacity * len(self.idlist) * \
+                 np.dtype(data_object.dtype).itemsize
+        self._buffer = sharedctypes.RawArray(ctypes.c_char, nbytes)
+        # Total number of steps pushed and drained so far. Each is
+        # updated by only one side.
+        self._head = sharedctypes.RawValue(ctypes.c_ulonglong, 0)
+        self._tail = sharedctypes.RawValue(ctypes.c_ulonglong, 0)
+        self._ring = None
+
+    def _get_ring(self):
+        """Numpy view of the ring buffer, one row per time step."""
+        if self._ring is None:
+            self._ring = np.frombuffer(self._buffer,
+                                       dtype=self.data_object.dtype)
+            self._ring = self._ring.reshape(self.capacity,
+                                            len(self.idlist))
+        return self._ring
+
+    def push(self, values):
+        """Push data into the stream.
+
+        This blocks while the ring is full.
+
+        Args:
+            values (array): values of all the sources in the order of
+                `idlist` for one time step, or a 2D array with one row
+                for each of several consecutive time steps.
+
+        Raises:
+            ValueError if the number of values does not match the
+            number of sources.
+
+            IOError if the service is not running.
+
+        """
+        block = np.asarray(values, dtype=self.data_object.dtype)
+        if block.ndim == 1:
+            block = block[np.newaxis, :]
+        if block.shape[1] != len(self.idlist):
+            raise ValueError('number of values must be same as the'
+                             ' number of sources.')
+        ring = self._get_ring()
+        written = 0
+        while written < len(block):
+            head = self._head.value
+            free = self.capacity - (head - self._tail.value)
+            if free == 0:
+                if not self.service.is_alive():
+                    raise IOError('writer service is not running.')
+                time.sleep(self.service.polltime)
+                continue
+            start = head % self.capacity
+            count = min(free, len(block) - written, self.capacity - start)
+            ring[start: start + count] = block[written: written + count]
+            self._head.value = head + count
+            written += count
+
+    def _drain(self, writer, source_ds):
+        """Write the data available in the ring to `writer`. Returns the
+        number of time steps written."""
+        tail = self._tail.value
+        count = self._head.value - tail
+        if count == 0:
+            return 0
+        start = tail % self.capacity
+        count = min(count, self.capacity - start)
+        block = self._get_ring()[start: start + count]
+        writer.add_uniform_block(source_ds, self.data_object, block.T)
+        self._tail.value = tail + count
+        return count
+
+
+def _serve(filename, streams, stop, errpipe, polltime, writer_args):
+    """Main loop of the service process: drain `streams` into an
+    NSDFWriter for `filename` until `stop` is set and all rings are
+    empty."""
+    writer = None
+    try:
+        writer = NSDFWriter(filename, **writer_args)
+        source_ds = {}
+        for stream in streams:
+            if stream.popname in source_ds:
+                continue
+            try:
+                source_ds[stream.popname] = \
+                        writer.mapping[UNIFORM][stream.popname]
+            except KeyError:
+                source_ds[stream.popname] = writer.add_uniform_ds(
+                    stream.popname, stream.idlist)
+        while True:
+            stopping = stop.is_set()
+            count = 0
+            for stream in streams:
+                count += stream._drain(writer, source_ds[stream.popname])
+            if count == 0:
+                if stopping:
+                    break
+                time.sleep(polltime)
+        writer.close()
+    except Exception:
+        errpipe.send(traceback.format_exc())
+        if writer is not None:
+            writer.close()
+    finally:
+        errpipe.close()
+
+
+class NSDFWriterService(object):
+    """NSDF writer running in a separate process and fed through ring
+    buffers in shared memory.
+
+    All streams must be added before calling `start`. Call `close` at
+    the end to write out the remaining data and close the file.
+
+    Attributes:
+        filename (str): path of the file to be written.
+
+        polltime (float): time in seconds that the service process
+            waits when there is no data and the simulation process
+            waits when a ring is full.
+
+        streams (list): the streams added to this service.
+
+    """
+    def __init__(self, filename, polltime=1e-3, **writer_args):
+        """Initialize the service.
+
+        Args:
+            filename (str): path of the file to be written.
+
+            polltime (float): polling interval in seconds. Default:
+                1e-3.
+
+            **writer_args: keyword arguments passed to the
+                NSDFWriter, like `dialect`, `mode`, `buffersize`,
+                `compression`, etc.
+
+        """
+        self.filename = filename
+        self.polltime = polltime
+        self.writer_args = writer_args
+        self.streams = []
+        self._process = None
+        self._stop = mp.Event()
+        self._errpipe = None
+
+    def add_uniform_stream(self, popname, idlist, name, unit=None,
+                           dt=1.0, tunit='s', field=None,
+                           dtype=np.float64, capacity=1024):
+        """Add a stream for a uniformly sampled variable.
+
+        Args:
+            popname (str): name of the source population. Streams of
+                different variables of the same population must have
+                the same `idlist`.
+
+            idlist (list of str): unique identifiers of the sources.
+
+            name (str): name of the variable.
+
+            unit (str): unit of the variable.
+
+            dt (float): sampling interval.
+
+            tunit (str): unit of time.
+
+            field (str): recorded field. Defaults to `name`.
+
+            dtype (numpy.dtype): data type. Default: numpy.float64.
+
+            capacity (int): number of time steps the ring buffer can
+                hold. Default: 1024.
+
+        Returns:
+            UniformStream
+
+        Raises:
+            ValueError if the service has already been started or
+            `idlist` is empty.
+
+        """
+        if self._process is not None:
+            raise ValueError('streams must be added before starting'
+                             ' the service.')
+        if len(idlist) == 0:
+            raise ValueError('idlist must be nonempty')
+        data_object = UniformData(name, unit=unit, field=field,
+                                  dtype=dtype, dt=dt, tunit=tunit)
+        stream = UniformStream(self, popname, idlist, data_object,
+                               capacity)
+        self.streams.append(stream)
+        return stream
+
+    def start(self):
+        """Start the service process.
+
+        A service can be started again after `close`. Pass
+        `mode='a'` to the service so that the new writer appends to
+        the file instead of overwriting it.
+
+        """
+        self._stop.clear()
+        recv, self._errpipe = mp.Pipe(duplex=False)
+        self._process = mp.Process(target=_serve,
+                                   args=(self.filename, self.streams,
+                                         self._stop, self._errpipe,
+                                         self.polltime,
+                                         self.writer_args))
+        self._process.daemon = True
+        self._process.start()
+        self._errpipe.close()
+        self._errpipe = recv
+
+    def is_alive(self):
+        """Return True if the service process is running."""
+        return (self._process is not None) and self._process.is_alive()
+
+    def close(self):
+        """Wait for the service to write out the data in all the
+        streams and close the file. Calling this on a service that is
+        not running is a no-op.
+
+        Raises:
+            IOError if the service process failed.
+
+        """
+        if self._process is None:
+            return
+        self._stop.set()
+        self._process.join()
+        self._process = None
+        error = None
+        try:
+            if self._errpipe.poll():
+                error = self._errpipe.recv()
+        except EOFError:
+            pass
+        self._errpipe.close()
+        if error is not None:
+            raise IOError('writer service failed:\n{}'.format(error))
+
+
+#
+# nsdfservice.py ends here
@@ -0,0 +1,542 @@
+# nsdftools.py ---
+#
+# Filename: nsdftools.py
+# Description:
+# Author:
+# Maintainer:
+# Created:
+# Version:
+# Last-Updated:
+#           By:
+#     Update #: 0
+# URL:
+# Keywords:
+# Compatibility:
+#
+#
+
+# Commentary:
+#
+#
+#
+#
+
+# Change log:
+#
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street, Fifth
+# Floor, Boston, MA 02110-1301, USA.
+#
+#
+
+# Code:
+"""
+Tools for postprocessing NSDF files.
+"""
+
+import os
+import h5py as h5
+import numpy as np
+
+from .constants import *
+
+# Attributes maintained by HDF5 dimension scale API and their
+# REFATTR counterpart
+_DIMSCALE_ATTRS = ('CLASS', 'NAME', 'REFERENCE_LIST', 'DIMENSION_LIST',
+                   'dimension_scales')
+
+
+def _linked_scale(dataset, axis, label):
+    """Return the dataset labelled `label` linked to `dataset` along
+    `axis` with either linkage, or None if there is none."""
+    if len(dataset.dims[axis]) > 0:
+        try:
+            return dataset.dims[axis][label]
+        except KeyError:
+            return None
+    for entry in dataset.attrs.get('dimension_scales', []):
+        if (entry['label'], entry['axis']) == (label, axis):
+            return dataset.file[entry['scale']]
+    return None
+
+
+def _merge_ref_attrs(dst, key, srcs):
+    """Set the attribute `key` of `dst` to an array of references
+    (REFTYPE) to the objects referenced by the attributes `key` of
+    all `srcs`, translated to the objects with the same path in the
+    file of `dst`. References with no such object are dropped, and
+    so is the attribute if none is left."""
+    paths = []
+    for src in srcs:
+        for ref in np.ravel(src.attrs.get(key, [])):
+            if not ref:
+                continue
+            path = src.file[ref].name
+            if (path in dst.file) and (path not in paths):
+                paths.append(path)
+    if len(paths) == 0:
+        if key in dst.attrs:
+            del dst.attrs[key]
+        return
+    attr = np.zeros((len(paths),), dtype=REFTYPE)
+    attr[:] = [dst.file[path].ref for path in paths]
+    dst.attrs[key] = attr
+
+
+def _copy_attrs(src, dst):
+    """Copy the attributes of `src` to `dst`.
+
+    Object references, single or in arrays, are translated to the
+    object with the same path in the file of `dst`, and dropped if
+    there is none. Attributes of dimension scales are skipped.
+
+    """
+    for key, value in src.attrs.items():
+        if key in _DIMSCALE_ATTRS:
+            continue
+        if isinstance(value, np.ndarray) and \
+           (h5.check_dtype(ref=value.dtype) is not None):
+            _merge_ref_attrs(dst, key, [src])
+            continue
+        if isinstance(value, h5.Reference):
+            if not value:
+                continue
+            path = src.file[value].name
+            if path not in dst.file:
+                continue
+            value = dst.file[path].ref
+        dst.attrs[key] = value
+
+
+def _check_attrs(datasets, keys):
+    """Raise ValueError if the attributes `keys` of the first of
+    `datasets` are not the same in all of them. The combined dataset
+    gets the attributes of the first one."""
+    for key in keys:
+        if key not in datasets[0].attrs:
+            continue
+        value = datasets[0].attrs[key]
+        for dataset in datasets[1:]:
+            if (key not in dataset.attrs) or \
+               np.any(dataset.attrs[key] != value):
+                raise ValueError('shards of {} have different `{}`'.format(
+                    datasets[0].name, key))
+
+
+def _virtual_source(dataset, outdir):
+    """Virtual source for `dataset` with the path of its file relative
+    to `outdir`."""
+    return h5.VirtualSource(os.path.relpath(dataset.file.filename, outdir),
+                            dataset.name, shape=dataset.shape)
+
+
+def _stack_rows(group, name, datasets, outdir):
+    """Create a virtual dataset `name` in `group` with the rows of the
+    2D `datasets` one after another.
+
+    Rows shorter than the longest one are padded with the fill value
+    of the first dataset.
+
+    """
+    nrows = sum(dataset.shape[0] for dataset in datasets)
+    ncols = max(dataset.shape[1] for dataset in datasets)
+    layout = h5.VirtualLayout(shape=(nrows, ncols), dtype=datasets[0].dtype)
+    start = 0
+    for dataset in datasets:
+        if dataset.size > 0:
+            layout[start: start + dataset.shape[0], :dataset.shape[1]] = \
+                _virtual_source(dataset, outdir)
+        start += dataset.shape[0]
+    return group.create_virtual_dataset(name, layout,
+                                        fillvalue=datasets[0].fillvalue)
+
+
+def _merge_sources(group, name, shard_sources):
+    """Create the dataset `name` in `group` with the concatenated ids in
+    `shard_sources`, unless a previous variable of the population has
+    done it. Returns the dataset."""
+    uids = np.concatenate([source[:] for source in shard_sources])
+    if name in group:
+        source_ds = group[name]
+        if list(source_ds[:]) != list(uids):
+            raise ValueError('sources of variables in population {} are'
+                             ' not the same in all shards'.format(name))
+        return source_ds
+    source_ds = group.create_dataset(name, shape=uids.shape,
+                                     dtype=VLENSTR, data=uids)
+    _copy_attrs(shard_sources[0], source_ds)
+    _merge_ref_attrs(source_ds, 'model', shard_sources)
+    return source_ds
+
+
+def _link_model(fd, shards):
+    """Point the `map` attributes of the model components in `fd`,
+    copied from the first shard, at the map datasets in `fd`. The
+    entries of the same component in all shards are merged."""
+    if 'model' not in fd:
+        return
+    paths = []
+
+    def collect(name, obj):
+        if 'map' in obj.attrs:
+            paths.append(obj.name)
+
+    for shard in shards:
+        if 'model' in shard:
+            shard['/model'].visititems(collect)
+    for path in sorted(set(paths)):
+        if path in fd:
+            _merge_ref_attrs(fd[path], 'map', [shard[path] for shard in
+                                               shards if path in shard])
+
+
+def _assemble_2d(fd, sampling, popname, varname, datasets, outdir,
+                 tscales):
+    """Assemble 2D datasets with one row per source (uniform, static,
+    NUREGULAR and NANPADDED data) by stacking the rows of the shards.
+
+    `tscales` maps (file name, path) of the time scales in the shards
+    to those already created in `fd`, so that a scale shared by
+    several variables is shared in the combined file too.
+
+    """
+    if h5.check_dtype(vlen=datasets[0].dtype) is not None:
+        raise NotImplementedError('assembling VLEN datasets is not'
+                                  ' supported')
+    fillvalue = datasets[0].fillvalue
+    padded = datasets[0].dtype.kind == 'f' and np.isnan(fillvalue)
+    if (not padded) and \
+       len(set(dataset.shape[1] for dataset in datasets)) > 1:
+        raise ValueError('shards of {} have different number of'
+                         ' columns'.format(datasets[0].name))
+    _check_attrs(datasets, ('field', 'unit', 'dt', 'tstart', 'tunit'))
+    scales = [_linked_scale(data, 1, 'time') for data in datasets]
+    if scales[0] is not None and scales[0].ndim == 1:
+        times = scales[0][:]
+        for scale in scales[1:]:
+            if scale is None or scale.shape != times.shape or \
+               not np.array_equal(scale[:], times):
+                raise ValueError('shards of {} have different sampling'
+                                 ' times'.format(datasets[0].name))
+        _check_attrs(scales, ('unit',))
+    source_ds = _merge_sources(fd['/map'][sampling], popname,
+                               [_linked_scale(dataset, 0, 'source')
+                                for dataset in datasets])
+    if 'length' in datasets[0].attrs:
+        lengths = np.concatenate([dataset.file[dataset.attrs['length']][:]
+                                  for dataset in datasets])
+        grp = fd['/map'].require_group('length').require_group(sampling)
+        grp.create_dataset('{}_{}'.format(popname, varname), data=lengths)
+    dataset = _stack_rows(fd['/data'][sampling].require_group(popname),
+                          varname, datasets, outdir)
+    _copy_attrs(datasets[0], dataset)
+    dataset.dims.create_scale(source_ds, 'source')
+    dataset.dims[0].attach_scale(source_ds)
+    dataset.dims[0].label = 'source'
+    if scales[0] is not None:
+        tsname = scales[0].name.rpartition('/')[-1]
+        if scales[0].ndim == 2:
+            tscale = _stack_rows(fd['/map/time'], tsname, scales, outdir)
+            _copy_attrs(scales[0], tscale)
+        else:
+            key = (scales[0].file.filename, scales[0].name)
+            try:
+                tscale = tscales[key]
+            except KeyError:
+                tscale = fd['/map/time'].create_dataset(tsname,
+                                                        data=times)
+                _copy_attrs(scales[0], tscale)
+                tscales[key] = tscale
+        dataset.dims.create_scale(tscale, 'time')
+        dataset.dims[1].attach_scale(tscale)
+        dataset.dims[1].label = 'time'
+    return dataset
+
+
+def _assemble_timemajor(fd, sampling, popname, varname, datasets, outdir):
+    """Assemble uniformly sampled datasets in TIMEMAJOR layout, with
+    one column per source, by putting the columns of the shards side
+    by side."""
+    if len(set(dataset.shape[0] for dataset in datasets)) > 1:
+        raise ValueError('shards of {} have different number of'
+                         ' rows'.format(datasets[0].name))
+    _check_attrs(datasets, ('field', 'unit', 'dt', 'tstart', 'tunit'))
+    source_ds = _merge_sources(fd['/map'][sampling], popname,
+                               [_linked_scale(dataset, 1, 'source')
+                                for dataset in datasets])
+    vlayout = h5.VirtualLayout(shape=(datasets[0].shape[0],
+                                      len(source_ds)),
+                               dtype=datasets[0].dtype)
+    start = 0
+    for dataset in datasets:
+        if dataset.size > 0:
+            vlayout[:, start: start + dataset.shape[1]] = \
+                _virtual_source(dataset, outdir)
+        start += dataset.shape[1]
+    group = fd['/data'][sampling].require_group(popname)
+    dataset = group.create_virtual_dataset(varname, vlayout,
+                                           fillvalue=datasets[0].fillvalue)
+    _copy_attrs(datasets[0], dataset)
+    dataset.dims.create_scale(source_ds, 'source')
+    dataset.dims[1].attach_scale(source_ds)
+    dataset.dims[1].label = 'source'
+    return dataset
+
+
+def _interleave_blocks(group, name, datasets, offsets, outdir):
+    """Create a 1D virtual dataset `name` in `group` from the 1D CSR
+    `datasets` by putting the i-th blocks of all of them one after
+    another, in the order of the list, for each i."""
+    layout = h5.VirtualLayout(shape=(sum(len(dataset) for dataset in
+                                         datasets),),
+                              dtype=datasets[0].dtype)
+    start = 0
+    for iii in range(len(offsets[0])):
+        for dataset, offset in zip(datasets, offsets):
+            count = offset[iii, -1] - offset[iii, 0]
+            if count > 0:
+                vsource = _virtual_source(dataset, outdir)
+                layout[start: start + count] = \
+                    vsource[offset[iii, 0]: offset[iii, -1]]
+            start += count
+    return group.create_virtual_dataset(name, layout)
+
+
+def _assemble_csr(fd, sampling, popname, varname, datasets, outdir):
+    """Assemble CSR datasets. The blocks written by each call to
+    `add_*_csr` in the shards are merged into a single block with the
+    offsets of the sources recomputed."""
+    offsets = [dataset.file[dataset.attrs['offset']][:] for dataset in
+               datasets]
+    if len(set(len(offset) for offset in offsets)) > 1:
+        raise ValueError('shards of {} have different number of'
+                         ' blocks'.format(datasets[0].name))
+    _check_attrs(datasets, ('field', 'unit'))
+    source_ds = _merge_sources(fd['/map'][sampling], popname,
+                               [dataset.file[dataset.attrs['source']]
+                                for dataset in datasets])
+    merged = np.zeros((len(offsets[0]), len(source_ds) + 1),
+                      dtype=np.int64)
+    end = 0
+    for iii in range(len(offsets[0])):
+        col = 0
+        for offset in offsets:
+            merged[iii, col: col + offset.shape[1]] = \
+                offset[iii] - offset[iii, 0] + end
+            col += offset.shape[1] - 1
+            end = merged[iii, col]
+    grp = fd['/map'].require_group('offset').require_group(sampling)
+    grp.create_dataset('{}_{}'.format(popname, varname), data=merged)
+    dataset = _interleave_blocks(fd['/data'][sampling].require_group(popname),
+                                 varname, datasets, offsets, outdir)
+    _copy_attrs(datasets[0], dataset)
+    scales = [_linked_scale(data, 0, 'time') for data in datasets]
+    if scales[0] is not None:
+        tscale = _interleave_blocks(fd['/map/time'],
+                                    scales[0].name.rpartition('/')[-1],
+                                    scales, offsets, outdir)
+        _copy_attrs(scales[0], tscale)
+        dataset.dims.create_scale(tscale, 'time')
+        dataset.dims[0].attach_scale(tscale)
+        dataset.dims[0].label = 'time'
+    return dataset
+
+
+def _assemble_1d(fd, sampling, popname, varname, groups, outdir, tscales):
+    """Assemble ONED data where each source has its own dataset in
+    `/data/{sampling}/{popname}/{varname}`. Each of these becomes a
+    virtual dataset mapping the whole dataset in the shard. Time
+    scales are looked up in and added to `tscales` (see
+    `_assemble_2d`)."""
+    datagrp = fd['/data'][sampling].require_group(popname).create_group(
+        varname)
+    srcdata = []
+    for group in groups:
+        for source, ref in group.file[group.attrs['source']][:]:
+            if not ref:
+                continue
+            shard_ds = group.file[ref]
+            dsname = shard_ds.name.rpartition('/')[-1]
+            if dsname in datagrp:
+                raise ValueError('dataset {} exists in more than one'
+                                 ' shard'.format(shard_ds.name))
+            layout = h5.VirtualLayout(shape=shard_ds.shape,
+                                      dtype=shard_ds.dtype)
+            if shard_ds.size > 0:
+                layout[:] = _virtual_source(shard_ds, outdir)
+            dataset = datagrp.create_virtual_dataset(dsname, layout)
+            _copy_attrs(shard_ds, dataset)
+            scale = _linked_scale(shard_ds, 0, 'time')
+            if scale is not None:
+                key = (scale.file.filename, scale.name)
+                try:
+                    tscale = tscales[key]
+                except KeyError:
+                    layout = h5.VirtualLayout(shape=scale.shape,
+                                              dtype=scale.dtype)
+                    if scale.size > 0:
+                        layout[:] = _virtual_source(scale, outdir)
+                    name = tsname = scale.name.rpartition('/')[-1]
+                    ii = 0
+                    while tsname in fd['/map/time']:
+                        ii += 1
+                        tsname = '{}_{}'.format(name, ii)
+                    tscale = fd['/map/time'].create_virtual_dataset(
+                        tsname, layout)
+                    _copy_attrs(scale, tscale)
+                    tscales[key] = tscale
+                dataset.dims.create_scale(tscale, 'time')
+                dataset.dims[0].attach_scale(tscale)
+                dataset.dims[0].label = 'time'
+            srcdata.append((source, dataset.ref))
+    mapgrp = fd['/map'][sampling].require_group(popname)
+    source_ds = mapgrp.create_dataset(varname, shape=(len(srcdata),),
+                                      dtype=SRCDATAMAPTYPE)
+    for iii, entry in enumerate(srcdata):
+        source_ds[iii] = entry
+    _copy_attrs(groups[0].file[groups[0].attrs['source']], source_ds)
+    _merge_ref_attrs(source_ds, 'model', [group.file[group.attrs['source']]
+                                          for group in groups])
+    _copy_attrs(groups[0], datagrp)
+    return datagrp
+
+
+def assemble_shards(filename, shardfiles):
+    """Create an NSDF file combining the data in shard files.
+
+    Each shard is an NSDF file written by a separate NSDFWriter,
+    usually in a separate process, with the data from a subset of the
+    sources of each population. All shards must have the same
+    dialect, populations and variables, with the same field, unit
+    and time unit, the same sampling interval and start time for
+    uniform data, the same number of writes for CSR data and the
+    same sampling times for NUREGULAR data.
+
+    The data in the combined file are HDF5 virtual datasets mapping
+    the datasets in the shards, so no data is copied and the shard
+    files must be kept along with it (at the same relative
+    path). Datasets with one row per source are stacked in the order
+    of `shardfiles`, and so are the source ids in `/map`; uniform
+    datasets in TIMEMAJOR layout, with one column per source, are
+    put side by side in the same order. The model
+    is copied from the first shard. The references between the model
+    and the map datasets (the `map` and `model` attributes) are
+    translated to the objects in the combined file and merged over
+    all shards.
+
+    Args:
+        filename (str): path of the combined file. It is overwritten
+            if it exists.
+
+        shardfiles (list of str): paths of the shard files.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError if the shards do not match.
+
+        NotImplementedError for data stored in VLEN datasets and
+        event data stored in the raster layout, which cannot be
+        mapped by virtual datasets.
+
+    """
+    outdir = os.path.dirname(os.path.abspath(filename))
+    shards = [h5.File(shardfile, 'r') for shardfile in shardfiles]
+    try:
+        with h5.File(filename, 'w') as fd:
+            _copy_attrs(shards[0], fd)
+            fd.attrs['linkage'] = linkage.DIMSCALE
+            if 'model' in shards[0]:
+                shards[0].copy('/model', fd)
+            for sampling in SAMPLING_TYPES:
+                fd.require_group('/data').require_group(sampling)
+                fd.require_group('/map').require_group(sampling)
+            fd['/map'].require_group('time')
+            data = shards[0]['/data']
+            tscales = {}
+            for sampling in SAMPLING_TYPES:
+                if sampling not in data:
+                    continue
+                for popname, pop in data[sampling].items():
+                    for varname, var in pop.items():
+                        parts = [shard['/data'][sampling][popname][varname]
+                                 for shard in shards]
+                        if isinstance(var, h5.Group):
+                            _assemble_1d(fd, sampling, popname, varname,
+                                         parts, outdir, tscales)
+                            continue
+                        if len(set(part.attrs.get('layout') for part
+                                   in parts)) > 1:
+                            raise ValueError('shards of {} have different'
+                                             ' layouts'.format(var.name))
+                        if var.attrs.get('layout') == layout.TIMEMAJOR:
+                            _assemble_timemajor(fd, sampling, popname,
+                                                varname, parts, outdir)
+                        elif 'layout' in var.attrs:
+                            raise NotImplementedError(
+                                'assembling {} layout is not'
+                                ' supported'.format(var.attrs['layout']))
+                        elif 'offset' in var.attrs:
+                            _assemble_csr(fd, sampling, popname, varname,
+                                          parts, outdir)
+                        else:
+                            _assemble_2d(fd, sampling, popname, varname,
+                                         parts, outdir, tscales)
+            _link_model(fd, shards)
+    finally:
+        for shard in shards:
+            shard.close()
+
+
+def convert_to_dimension_scales(filename):
+    """Convert an NSDF file written with REFATTR linkage to DIMSCALE
+    linkage in place.
+
+    The source and time datasets referenced by the `dimension_scales`
+    attribute of each dataset are attached to it as HDF5 dimension
+    scales and the attribute is removed. This is meant to be run
+    once, when the file is complete, e.g. before archiving it.
+
+    Args:
+        filename (str): path of the NSDF file.
+
+    Returns:
+        None
+
+    """
+    with h5.File(filename, 'r+') as fd:
+        linked = []
+
+        def collect(name, obj):
+            if isinstance(obj, h5.Dataset) and \
+               'dimension_scales' in obj.attrs:
+                linked.append(obj)
+
+        fd.visititems(collect)
+        for dataset in linked:
+            for label, axis, ref in dataset.attrs['dimension_scales']:
+                scale = fd[ref]
+                dataset.dims.create_scale(scale, label)
+                dataset.dims[axis].attach_scale(scale)
+                dataset.dims[axis].label = label
+            del dataset.attrs['dimension_scales']
+        fd.attrs['linkage'] = linkage.DIMSCALE
+
+
+#
+# nsdftools.py ends here
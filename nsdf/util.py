@@ -53,6 +53,8 @@ import numpy as np
 from itertools import chain, izip
 import h5py as h5
 
+from .constants import SAMPLING_TYPES, CATALOGTYPE, layout
+
 def node_finder(container_list, match_fn):
     """Return a function that can be passed to h5py.Group.visititem to
     collect all nodes satisfying `match_fn` collect in `container_list`"""
@@ -133,6 +135,333 @@ def find(a, predicate, chunk_size=1024):
             yield (inds[0] + i0, ), chunk[inds]
         i0 = i1
 
+
+def bisect_dataset(dataset, value, lo=0, hi=None, right=False, field=None):
+    """Find the index where `value` should be inserted in the sorted 1D
+    `dataset` to keep it sorted, reading only the probed entries.
+
+    This is the binary search of the `bisect` module applied to an
+    HDF5 dataset, so that a range of a large sorted dataset can be
+    located without loading it into memory.
+
+    Parameters
+    ----------
+    dataset : h5py.Dataset
+        sorted 1D dataset.
+
+    value : scalar
+        the value to be located.
+
+    lo : int
+        lower bound of the search range. Default: 0.
+
+    hi : int
+        upper bound of the search range. Default: length of
+        `dataset`.
+
+    right : bool
+        if True, return the index after any entries equal to `value`
+        (like `bisect.bisect_right`). Otherwise the index before them
+        (like `bisect.bisect_left`).
+
+    field : str
+        name of the field to compare with for datasets of compound
+        type.
+
+    Returns
+    -------
+    int : the insertion index.
+
+    """
+    if hi is None:
+        hi = dataset.shape[0]
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if field is None:
+            entry = dataset[mid]
+        else:
+            entry = dataset[field, mid]
+        if (entry <= value) if right else (entry < value):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+
+def read_ranges(dataset, ranges):
+    """Read several ranges of a 1D dataset with a single read.
+
+    The ranges are combined into one selection of the file dataspace,
+    so that HDF5 reads them in one call instead of one small read for
+    each range.
+
+    Parameters
+    ----------
+    dataset : h5py.Dataset
+        1D dataset of a fixed size data type.
+
+    ranges : sequence of (start, stop)
+        ranges of entries to be read, in increasing order and not
+        overlapping. Empty ranges are skipped.
+
+    Returns
+    -------
+    numpy.ndarray : the entries in all the ranges, concatenated.
+
+    """
+    ranges = [(int(start), int(stop)) for start, stop in ranges
+              if stop > start]
+    total = sum(stop - start for start, stop in ranges)
+    ret = np.empty(total, dtype=dataset.dtype)
+    if total == 0:
+        return ret
+    fspace = dataset.id.get_space()
+    fspace.select_none()
+    for start, stop in ranges:
+        fspace.select_hyperslab((start,), (stop - start,),
+                                op=h5.h5s.SELECT_OR)
+    mspace = h5.h5s.create_simple((total,))
+    dataset.id.read(mspace, fspace, ret)
+    return ret
+
+
+def coalesce_indices(indices, blocksize=1):
+    """Merge indices into runs of consecutive indices that can each be
+    read with a single hyperslab selection.
+
+    Runs separated by a gap are also merged when they touch the same
+    block of `blocksize` entries. With the chunk size of a dataset as
+    `blocksize`, reading each run once reads every chunk at most
+    once, at the cost of reading the skipped entries inside shared
+    chunks.
+
+    Parameters
+    ----------
+    indices : sequence of int
+        indices to be read, in any order and possibly repeated.
+
+    blocksize : int
+        number of entries in a block (chunk). Default: 1.
+
+    Returns
+    -------
+    list : (start, stop) tuples of the runs in increasing order,
+        `stop` being one past the last index of the run.
+
+    """
+    indices = np.unique(np.asarray(indices, dtype=np.int64))
+    if len(indices) == 0:
+        return []
+    breaks = np.nonzero((np.diff(indices) > 1) &
+                        (indices[1:] // blocksize !=
+                         indices[:-1] // blocksize))[0] + 1
+    starts = indices[np.r_[0, breaks]]
+    stops = indices[np.r_[breaks - 1, len(indices) - 1]] + 1
+    return zip(starts, stops)
+
+
+def scan_source_maps(mapgroup):
+    """List the position of every source in the source datasets under
+    the `/map` group of an NSDF file.
+
+    Each source dataset under `/map/{sampling}` is read once. For ONED
+    nonuniform and event data the source datasets are
+    `/map/{sampling}/{population}/{variable}`, and `population` in
+    the entries is the path `{population}/{variable}`.
+
+    Parameters
+    ----------
+    mapgroup : h5py.Group
+        the `/map` group.
+
+    Returns
+    -------
+    list : (source, sampling, population, row) tuples where `row` is
+        the index of `source` in the dataset
+        `/map/{sampling}/{population}`.
+
+    """
+    entries = []
+    for sampling in SAMPLING_TYPES:
+        if sampling not in mapgroup:
+            continue
+        def visit(name, obj):
+            if not isinstance(obj, h5.Dataset) or obj.ndim != 1:
+                return
+            if obj.dtype.fields is None:
+                sources = obj[:]
+            else:
+                sources = obj['source']
+            entries.extend((str(source), sampling, name, row)
+                           for row, source in enumerate(sources))
+        mapgroup[sampling].visititems(visit)
+    return entries
+
+
+def find_scale(dataset, axis, label):
+    """Find the dataset labelled `label` that is linked to `dataset`
+    along `axis`, either as a dimension scale or through the
+    `dimension_scales` reference attribute.
+
+    Parameters
+    ----------
+    dataset : h5py.Dataset
+        dataset whose scale is to be found.
+
+    axis : int
+        dimension of `dataset` the scale is linked to.
+
+    label : str
+        label of the scale, like 'source' or 'time'.
+
+    Returns
+    -------
+    h5py.Dataset : the scale.
+
+    Raises
+    ------
+    KeyError if there is no such scale.
+
+    """
+    try:
+        return dataset.dims[axis][label]
+    except (KeyError, RuntimeError):
+        for entry in dataset.attrs.get('dimension_scales', []):
+            if (entry['label'], entry['axis']) == (label, axis):
+                return dataset.file[entry['scale']]
+        raise KeyError('no {} scale on axis {} of {}'.format(
+            label, axis, dataset.name))
+
+
+def _dtype_name(dtype):
+    """Numpy type string of `dtype`, prefixed by `vlen:` for variable
+    length data."""
+    base = h5.check_dtype(vlen=dtype)
+    if base is not None and base not in (str, unicode, bytes):
+        return 'vlen:' + np.dtype(base).str
+    return dtype.str
+
+
+def catalog_entry(sampling, population, variable, item):
+    """Describe the data recorded for `variable` from `population` as
+    an entry of the catalog of an NSDF file (see `build_catalog`).
+
+    Parameters
+    ----------
+    sampling : str
+        sampling type (nsdf.UNIFORM, nsdf.NONUNIFORM, nsdf.EVENT or
+        nsdf.STATIC).
+
+    population : str
+        name of the population.
+
+    variable : str
+        name of the variable.
+
+    item : h5py.Dataset or h5py.Group
+        the dataset storing the data, or the group of per-source
+        datasets for ONED data.
+
+    Returns
+    -------
+    tuple : the fields of the entry in the order of CATALOGTYPE.
+
+    """
+    attrs = item.attrs
+    tstart = dt = t0 = t1 = np.nan
+    tunit = source = dtype = ''
+    layout_ = str(attrs.get('layout', ''))
+    if isinstance(item, h5.Group):
+        names = list(item)
+        shape = (len(names), -1)
+        if len(names) > 0:
+            first = item[names[0]]
+            dtype = _dtype_name(first.dtype)
+            try:
+                tunit = find_scale(first, 0, 'time').attrs['unit']
+            except KeyError:
+                pass
+        if 'source' in attrs:
+            source = item.file[attrs['source']].name
+        return (item.name, sampling, population, variable,
+                attrs.get('field', ''), attrs.get('unit', ''), dtype,
+                shape, layout_, tstart, dt, tunit, t0, t1, source)
+    dtype = _dtype_name(item.dtype)
+    shape = (tuple(item.shape) + (-1, -1))[:2]
+    saxis = 1 if layout_ == layout.TIMEMAJOR else 0
+    taxis = (1 - saxis) if item.ndim == 2 else 0
+    if 'source' in attrs:
+        source = item.file[attrs['source']].name
+    else:
+        try:
+            source = find_scale(item, saxis, 'source').name
+        except KeyError:
+            pass
+    if 'dt' in attrs:
+        tstart = attrs.get('tstart', 0.0)
+        dt = attrs['dt']
+        tunit = attrs.get('tunit', '')
+        if item.shape[taxis] > 0:
+            t0 = tstart
+            t1 = tstart + dt * (item.shape[taxis] - 1)
+    elif item.ndim > 0:
+        try:
+            scale = find_scale(item, taxis, 'time')
+            tunit = scale.attrs.get('unit', '')
+            # A single row of times shared by all sources
+            if item.ndim == 2 and scale.ndim == 1 and \
+               scale.shape[0] == item.shape[taxis] > 0:
+                t0 = scale[0]
+                t1 = scale[-1]
+        except KeyError:
+            pass
+    return (item.name, sampling, population, variable,
+            attrs.get('field', ''), attrs.get('unit', ''), dtype, shape,
+            layout_, tstart, dt, tunit, t0, t1, source)
+
+
+def build_catalog(datagroup):
+    """Build the catalog of the data in an NSDF file by walking the
+    `/data` group.
+
+    The catalog has one entry for each recorded variable of each
+    population, and an entry with empty `variable` for a population
+    without variables. For ONED data the entry describes the group of
+    per-source datasets: `shape` is (number of sources, -1) and
+    `dtype` that of the first dataset. Unused dimensions of `shape`
+    are -1. `tstart` and `dt` are NaN except for uniformly sampled
+    data, and the time range `t0`, `t1` is NaN when it is not known
+    without reading the data. `source` is the path of the source
+    dataset under `/map`.
+
+    Parameters
+    ----------
+    datagroup : h5py.Group
+        the `/data` group.
+
+    Returns
+    -------
+    numpy.ndarray : the entries with dtype CATALOGTYPE.
+
+    """
+    entries = []
+    for sampling in SAMPLING_TYPES:
+        if sampling not in datagroup:
+            continue
+        for popname, popgroup in datagroup[sampling].items():
+            if not isinstance(popgroup, h5.Group):
+                continue
+            variables = popgroup.items()
+            if len(variables) == 0:
+                entries.append((popgroup.name, sampling, popname, '', '',
+                                '', '', (-1, -1), '', np.nan, np.nan, '',
+                                np.nan, np.nan, ''))
+            for varname, item in variables:
+                entries.append(catalog_entry(sampling, popname, varname,
+                                             item))
+    return np.array(entries, dtype=CATALOGTYPE)
+
         
 def printtree(root, vchar='|', hchar='__', vcount=1, depth=0, prefix='', is_last=False):
     """Pretty-print an HDF5 tree.
@@ -97,6 +97,27 @@ class TestModel(unittest.TestCase):
         for ii in range(1, uid__):
             self.assertIn(str(ii), id_path_dict)
 
+    def test_id_path_dict_incremental(self):
+        """The index of the root must include components added after it
+        was built."""
+        id_path_dict = self.root.get_id_path_dict()
+        cell = model.ModelComponent('cell', 'c0')
+        soma = model.ModelComponent('soma', 'c0s', parent=cell)
+        self.root.add_child(cell)
+        dend = model.ModelComponent('dend', 'c0d', parent=cell)
+        self.assertIs(id_path_dict, self.root.get_id_path_dict())
+        self.assertEqual(id_path_dict['c0'], '/root/cell')
+        self.assertEqual(id_path_dict['c0s'], '/root/cell/soma')
+        self.assertEqual(id_path_dict['c0d'], '/root/cell/dend')
+        path_node_dict = self.root.get_path_node_dict()
+        self.assertIs(path_node_dict['/root/cell/soma'], soma)
+        self.assertIs(self.root.get_node('cell/dend'), dend)
+        # replacing a component removes its subtree from the index
+        self.root.add_child(model.ModelComponent('cell', 'c1'))
+        self.assertEqual(id_path_dict['c1'], '/root/cell')
+        self.assertNotIn('c0s', id_path_dict)
+        self.assertNotIn('/root/cell/soma', path_node_dict)
+
 class TestCommonPrefix(unittest.TestCase):
     def setUp(self):
         self.paths = [
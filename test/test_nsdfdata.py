@@ -91,6 +91,19 @@ class TestNSDFUniformData(unittest.TestCase):
             np.testing.assert_allclose(value,
                                self.data.get_data(key))
 
+    def test_put_block(self):
+        block = np.random.uniform(size=(3, 10))
+        self.data.put_block(block, ['a', 'b', 'c'])
+        self.assertIs(self.data.get_block()[0], block)
+        self.assertEqual(self.data.get_sources(), ['a', 'b', 'c'])
+        np.testing.assert_allclose(self.data.get_data('b'), block[1])
+        self.assertRaises(ValueError, self.data.put_block, block, ['a'])
+        self.assertRaises(ValueError, self.data.put_block, block[0])
+        self.data.put_data('d', [1.0, 2.0])
+        self.assertEqual(self.data.get_block(), (None, None))
+        self.assertEqual(set(self.data.get_sources()),
+                         set(['a', 'b', 'c', 'd']))
+
 if __name__ == '__main__':
     unittest.main()
 
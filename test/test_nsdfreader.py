@@ -62,8 +62,10 @@ import nsdf
 
 from util import *
 
-def create_test_data_file(filename, dialect):
-    """Create a datafile at path `filename` using dialect `dialect`. 
+def create_test_data_file(filename, dialect,
+                          linkage=nsdf.linkage.DIMSCALE):
+    """Create a datafile at path `filename` using dialect `dialect`
+    and `linkage`.
 
     """
     tstart = datetime.now()
@@ -94,7 +96,8 @@ def create_test_data_file(filename, dialect):
     for ii, cell in enumerate(mdict['cells']):
         times = np.cumsum(np.random.exponential(scale=0.01, size=sizes[ii]))
         event_data.put_data(cell.uid, times)
-    writer = nsdf.NSDFWriter(filename, dialect=dialect, mode='w')
+    writer = nsdf.NSDFWriter(filename, dialect=dialect, mode='w',
+                             linkage=linkage)
     writer.add_modeltree(mdict['model_tree'])
     uniform_ds = writer.add_uniform_ds('granule', uniform_data.get_sources())
     writer.add_uniform_data(uniform_ds, uniform_data)
@@ -123,6 +126,9 @@ def create_test_data_file(filename, dialect):
     elif dialect == nsdf.dialect.NANPADDED:
         writer.add_nonuniform_nan(nonuniform_ds, nonuniform_data)
         writer.add_event_nan(event_ds, event_data)
+    elif dialect == nsdf.dialect.CSR:
+        writer.add_nonuniform_csr(nonuniform_ds, nonuniform_data)
+        writer.add_event_csr(event_ds, event_data)
     else:
         raise Exception('unknown dialect: {}'.format(dialect))
     tend = datetime.now()
@@ -160,6 +166,76 @@ def create_test_data_file(filename, dialect):
     }
 
 
+def check_lazy_data(test, filename, data_dict):
+    """Check that the data objects read lazily from `filename` have the
+    same contents as those in `data_dict`."""
+    reader = nsdf.NSDFReader(filename)
+    data = data_dict['uniform_data']
+    file_data = reader.get_uniform_data('granule', 'Vm', lazy=True)
+    test.assertEqual(set(file_data.get_sources()),
+                     set(data.get_sources()))
+    for src in data.get_sources():
+        row = file_data.get_data(src)
+        test.assertIsInstance(row, nsdf.DatasetRow)
+        np.testing.assert_allclose(row[10:20], data.get_data(src)[10:20])
+        test.assertAlmostEqual(row[-1], data.get_data(src)[-1])
+        np.testing.assert_allclose(row, data.get_data(src))
+    for getter, key, population, variable in [
+            (reader.get_nonuniform_data, 'nonuniform_data', 'mitral', 'Im'),
+            (reader.get_event_data, 'event_data', 'cells', 'spike')]:
+        data = data_dict[key]
+        file_data = getter(population, variable, lazy=True)
+        test.assertEqual(set(file_data.get_sources()),
+                         set(data.get_sources()))
+        for src in data.get_sources():
+            var = data.get_data(src)
+            fvar = file_data.get_data(src)
+            if isinstance(var, tuple):
+                np.testing.assert_allclose(var[0], fvar[0])
+                np.testing.assert_allclose(var[1], fvar[1])
+            else:
+                np.testing.assert_allclose(var, fvar)
+
+
+def check_window_data(test, filename, data_dict, t0=20.0, t1=50.0):
+    """Check the data read from `filename` in time windows against
+    that in `data_dict`."""
+    reader = nsdf.NSDFReader(filename)
+    data = data_dict['uniform_data']
+    times, tunit = reader.get_uniform_ts('granule', 'Vm')
+    for u0, u1 in [(0.3, 0.52), (None, 0.1), (0.95, None), (5.0, 6.0)]:
+        selected = np.ones(len(times), dtype=bool)
+        if u0 is not None:
+            selected &= times >= u0
+        if u1 is not None:
+            selected &= times < u1
+        file_data = reader.get_uniform_window('granule', 'Vm', u0, u1)
+        test.assertEqual(set(file_data.get_sources()),
+                         set(data.get_sources()))
+        if selected.any():
+            test.assertAlmostEqual(file_data.tstart, times[selected][0])
+        for src in data.get_sources():
+            np.testing.assert_allclose(file_data.get_data(src),
+                                       data.get_data(src)[selected])
+    data = data_dict['nonuniform_data']
+    file_data = reader.get_nonuniform_window('mitral', 'Im', t0, t1)
+    test.assertEqual(set(file_data.get_sources()), set(data.get_sources()))
+    if isinstance(data, nsdf.NonuniformRegularData):
+        times = data.get_times()
+        selected = (times >= t0) & (times < t1)
+        np.testing.assert_allclose(file_data.get_times(), times[selected])
+        for src in data.get_sources():
+            np.testing.assert_allclose(file_data.get_data(src),
+                                       data.get_data(src)[selected])
+        return
+    for src in data.get_sources():
+        var, times = data.get_data(src)
+        fvar, ftimes = file_data.get_data(src)
+        selected = (times >= t0) & (times < t1)
+        np.testing.assert_allclose(fvar, var[selected])
+        np.testing.assert_allclose(ftimes, times[selected])
+
+
 class TestNSDFReaderOneD(unittest.TestCase):
     """Check that file written in ONED dialect is read correctly"""
     def setUp(self):
@@ -181,6 +257,14 @@ class TestNSDFReaderOneD(unittest.TestCase):
             np.testing.assert_allclose(data.get_data(src),
                                        file_data.get_data(src))
         
+    def test_get_uniform_dataset(self):
+        reader = nsdf.NSDFReader(self.filename)
+        sources, data = reader.get_uniform_dataset('granule', 'Vm')
+        self.assertEqual(sources.name, '/map/uniform/granule')
+        expected = self.data_dict['uniform_data']
+        for src, row in zip(sources, data):
+            np.testing.assert_allclose(row, expected.get_data(src))
+
     def test_get_uniform_ts(self):
         raise NotImplementedError('Fix me')
 
@@ -236,6 +320,12 @@ class TestNSDFReaderOneD(unittest.TestCase):
         self.assertEqual(reader.rights, self.data_dict['rights'])
             
 
+    def test_lazy(self):
+        check_lazy_data(self, self.filename, self.data_dict)
+
+    def test_window(self):
+        check_window_data(self, self.filename, self.data_dict)
+
 
 class TestNSDFReaderNAN(unittest.TestCase):
     """Check that file written in ONED dialect is read correctly"""
@@ -292,6 +382,13 @@ class TestNSDFReaderNAN(unittest.TestCase):
             fvar = file_data.get_data(src)
             np.testing.assert_allclose(var, fvar)
 
+    def test_lazy(self):
+        check_lazy_data(self, self.filename, self.data_dict)
+
+    def test_window(self):
+        check_window_data(self, self.filename, self.data_dict)
+
+
 class TestNSDFReaderVLEN(unittest.TestCase):
     """Check that file written in ONED dialect is read correctly"""
     def setUp(self):
@@ -347,6 +444,13 @@ class TestNSDFReaderVLEN(unittest.TestCase):
             fvar = file_data.get_data(src)
             np.testing.assert_allclose(var, fvar)
 
+    def test_lazy(self):
+        check_lazy_data(self, self.filename, self.data_dict)
+
+    def test_window(self):
+        check_window_data(self, self.filename, self.data_dict)
+
+
 class TestNSDFReaderNUREGULAR(unittest.TestCase):
     """Check that file written in NUREGULAR dialect is read correctly"""
     def setUp(self):
@@ -404,7 +508,477 @@ class TestNSDFReaderNUREGULAR(unittest.TestCase):
             var = data.get_data(src)
             fvar = file_data.get_data(src)
             np.testing.assert_allclose(var, fvar)
-            
+
+    def test_lazy(self):
+        check_lazy_data(self, self.filename, self.data_dict)
+
+    def test_window(self):
+        check_window_data(self, self.filename, self.data_dict)
+
+
+class TestNSDFReaderCSR(unittest.TestCase):
+    """Check that file written in CSR dialect is read correctly"""
+    def setUp(self):
+        self.filename = '{}.h5'.format(self.id())
+        self.data_dict = create_test_data_file(self.filename,
+                                               nsdf.dialect.CSR)
+
+    def test_get_nonuniform_data(self):
+        data = self.data_dict['nonuniform_data']
+        reader = nsdf.NSDFReader(self.filename)
+        file_data = reader.get_nonuniform_data('mitral', 'Im')
+        self.assertEqual(set(file_data.get_sources()),
+                         set(data.get_sources()))
+        self.assertEqual(data.unit, file_data.unit)
+        self.assertEqual(data.name, file_data.name)
+        self.assertEqual(data.tunit, file_data.tunit)
+        for src in data.get_sources():
+            var, times = data.get_data(src)
+            fvar, ftimes = file_data.get_data(src)
+            np.testing.assert_allclose(var, fvar)
+            np.testing.assert_allclose(times, ftimes)
+
+    def test_get_event_data(self):
+        data = self.data_dict['event_data']
+        reader = nsdf.NSDFReader(self.filename)
+        file_data = reader.get_event_data('cells', 'spike')
+        self.assertEqual(set(file_data.get_sources()),
+                         set(data.get_sources()))
+        self.assertEqual(data.unit, file_data.unit)
+        self.assertEqual(data.name, file_data.name)
+        for src in data.get_sources():
+            var = data.get_data(src)
+            fvar = file_data.get_data(src)
+            np.testing.assert_allclose(var, fvar)
+
+    def test_lazy(self):
+        check_lazy_data(self, self.filename, self.data_dict)
+
+    def test_window(self):
+        check_window_data(self, self.filename, self.data_dict)
+
+    def test_blocks(self):
+        """Data appended in several writes is read back in order."""
+        filename = '{}_blocks.h5'.format(self.id())
+        sources = ['c{}'.format(ii) for ii in range(5)]
+        expected = dict((src, ([], [])) for src in sources)
+        writer = nsdf.NSDFWriter(filename, mode='w',
+                                 dialect=nsdf.dialect.CSR)
+        source_ds = writer.add_nonuniform_ds('pop', sources)
+        for block in range(4):
+            data = nsdf.NonuniformData('Vm', unit='mV', tunit='ms')
+            for ii, src in enumerate(sources):
+                size = np.random.randint(0, 6)
+                values = np.random.rand(size)
+                times = block * 10.0 + np.sort(np.random.rand(size))
+                data.put_data(src, (values, times))
+                expected[src][0].append(values)
+                expected[src][1].append(times)
+            writer.add_nonuniform_csr(source_ds, data)
+        writer.close()
+        reader = nsdf.NSDFReader(filename)
+        for lazy in (False, True):
+            file_data = reader.get_nonuniform_data('pop', 'Vm', lazy=lazy)
+            for src in sources:
+                values, times = file_data.get_data(src)
+                nptest.assert_allclose(values,
+                                       np.concatenate(expected[src][0]))
+                nptest.assert_allclose(times,
+                                       np.concatenate(expected[src][1]))
+        for t0, t1 in [(None, None), (5.0, 25.0), (None, 10.5),
+                       (12.0, None), (50.0, 60.0), (10.5, 30.5),
+                       (20.3, 20.6), (30.5, 30.5)]:
+            file_data = reader.get_nonuniform_window('pop', 'Vm', t0, t1)
+            for src in sources:
+                values = np.concatenate(expected[src][0])
+                times = np.concatenate(expected[src][1])
+                selected = np.ones(len(times), dtype=bool)
+                if t0 is not None:
+                    selected &= times >= t0
+                if t1 is not None:
+                    selected &= times < t1
+                fvalues, ftimes = file_data.get_data(src)
+                nptest.assert_allclose(fvalues, values[selected])
+                nptest.assert_allclose(ftimes, times[selected])
+        del reader
+        os.remove(filename)
+
+
+class TestNSDFReaderRaster(unittest.TestCase):
+    """Check that event data in RASTER layout is read correctly"""
+    def setUp(self):
+        self.filename = '{}.h5'.format(self.id())
+        mdict = create_ob_model_tree()
+        self.data = nsdf.EventData('spike', unit='s')
+        sizes = 200 + np.random.randint(-50, 50, len(mdict['cells']))
+        for ii, cell in enumerate(mdict['cells']):
+            self.data.put_data(cell.uid, np.cumsum(
+                np.random.exponential(scale=0.01, size=sizes[ii])))
+        writer = nsdf.NSDFWriter(self.filename, mode='w',
+                                 dialect=nsdf.dialect.NANPADDED)
+        event_ds = writer.add_event_ds('cells', self.data.get_sources())
+        writer.add_event_raster(event_ds, self.data)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_get_event_data(self):
+        reader = nsdf.NSDFReader(self.filename)
+        file_data = reader.get_event_data('cells', 'spike')
+        self.assertEqual(set(file_data.get_sources()),
+                         set(self.data.get_sources()))
+        self.assertEqual(self.data.unit, file_data.unit)
+        for src in self.data.get_sources():
+            np.testing.assert_allclose(self.data.get_data(src),
+                                       file_data.get_data(src))
+
+    def test_get_event_raster(self):
+        reader = nsdf.NSDFReader(self.filename)
+        t0, t1 = 0.5, 1.0
+        times, sources = reader.get_event_raster('cells', 'spike', t0, t1)
+        self.assertTrue(np.all((times >= t0) & (times < t1)))
+        self.assertTrue(np.all(np.diff(times) >= 0))
+        for src in self.data.get_sources():
+            data = self.data.get_data(src)
+            np.testing.assert_allclose(data[(data >= t0) & (data < t1)],
+                                       times[sources == src])
+        times, sources = reader.get_event_raster('cells', 'spike')
+        self.assertEqual(len(times), sum([len(self.data.get_data(src))
+                                          for src in
+                                          self.data.get_sources()]))
+
+
+class TestNSDFReaderTimeMajor(unittest.TestCase):
+    """Check that uniform data in TIMEMAJOR layout is read in the same
+    orientation as the default layout"""
+    def setUp(self):
+        self.filename = '{}.h5'.format(self.id())
+        self.sources = ['c{}'.format(ii) for ii in range(7)]
+        self.block = np.random.uniform(-63, -57, size=(7, 30))
+        writer = nsdf.NSDFWriter(self.filename, mode='w')
+        uniform_ds = writer.add_uniform_ds('granule', self.sources)
+        data = nsdf.UniformData('Vm', unit='mV', dt=1e-2, tunit='ms')
+        writer.add_uniform_block(uniform_ds, data, self.block[:, :10],
+                                 timemajor=True)
+        writer.add_uniform_block(uniform_ds, data, self.block[:, 10:])
+        writer.close()
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_get_uniform_data(self):
+        reader = nsdf.NSDFReader(self.filename)
+        file_data = reader.get_uniform_data('granule', 'Vm')
+        self.assertEqual(file_data.unit, 'mV')
+        for ii, src in enumerate(self.sources):
+            np.testing.assert_allclose(file_data.get_data(src),
+                                       self.block[ii])
+        sources, data = reader.get_uniform_dataset('granule', 'Vm')
+        self.assertEqual(list(sources), self.sources)
+        self.assertEqual(data.shape, self.block.shape)
+        np.testing.assert_allclose(data[2], self.block[2])
+        np.testing.assert_allclose(data[:, 5], self.block[:, 5])
+        np.testing.assert_allclose(data[1:3, 4:8], self.block[1:3, 4:8])
+        np.testing.assert_allclose(np.asarray(data), self.block)
+        times, tunit = reader.get_uniform_ts('granule', 'Vm')
+        self.assertEqual(len(times), self.block.shape[1])
+        self.assertAlmostEqual(times[-1], 0.29)
+        self.assertEqual(tunit, 'ms')
+
+    def test_get_uniform_window(self):
+        reader = nsdf.NSDFReader(self.filename)
+        file_data = reader.get_uniform_window('granule', 'Vm', 0.05, 0.15)
+        self.assertAlmostEqual(file_data.tstart, 0.05)
+        for ii, src in enumerate(self.sources):
+            np.testing.assert_allclose(file_data.get_data(src),
+                                       self.block[ii, 5:15])
+
+
+class TestNSDFReaderRefAttr(unittest.TestCase):
+    """Check that a file written with REFATTR linkage is read
+    correctly"""
+    def setUp(self):
+        self.filename = '{}.h5'.format(self.id())
+        self.data_dict = create_test_data_file(self.filename,
+                                               nsdf.dialect.NANPADDED,
+                                               nsdf.linkage.REFATTR)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_linkage(self):
+        reader = nsdf.NSDFReader(self.filename)
+        self.assertEqual(reader.linkage, nsdf.linkage.REFATTR)
+
+    def test_get_uniform_row(self):
+        data = self.data_dict['uniform_data']
+        reader = nsdf.NSDFReader(self.filename)
+        for src in data.get_sources():
+            values, unit, times, tunit = reader.get_uniform_row(src, 'Vm')
+            np.testing.assert_allclose(values, data.get_data(src))
+            self.assertEqual(unit, data.unit)
+            self.assertEqual(len(times), len(values))
+
+    def test_get_nonuniform_data(self):
+        data = self.data_dict['nonuniform_data']
+        reader = nsdf.NSDFReader(self.filename)
+        file_data = reader.get_nonuniform_data('mitral', 'Im')
+        self.assertEqual(set(file_data.get_sources()),
+                         set(data.get_sources()))
+        self.assertEqual(data.tunit, file_data.tunit)
+        for src in data.get_sources():
+            var, times = data.get_data(src)
+            fvar, ftimes = file_data.get_data(src)
+            np.testing.assert_allclose(var, fvar)
+            np.testing.assert_allclose(times, ftimes)
+
+    def test_get_event_data(self):
+        data = self.data_dict['event_data']
+        reader = nsdf.NSDFReader(self.filename)
+        file_data = reader.get_event_data('cells', 'spike')
+        self.assertEqual(set(file_data.get_sources()),
+                         set(data.get_sources()))
+        for src in data.get_sources():
+            np.testing.assert_allclose(data.get_data(src),
+                                       file_data.get_data(src))
+
+
+class TestNSDFReaderRows(unittest.TestCase):
+    """Check reading the rows of selected sources"""
+    def setUp(self):
+        self.filename = '{}.h5'.format(self.id())
+        self.sources = ['c{}'.format(ii) for ii in range(50)]
+        self.block = np.random.uniform(-63, -57, size=(50, 30))
+        writer = nsdf.NSDFWriter(self.filename, mode='w')
+        uniform_ds = writer.add_uniform_ds('granule', self.sources)
+        writer.set_chunks('Vm', (8, 10))
+        writer.set_chunks('Im', (10, 8))
+        writer.add_uniform_block(uniform_ds,
+                                 nsdf.UniformData('Vm', unit='mV'),
+                                 self.block)
+        writer.add_uniform_block(uniform_ds,
+                                 nsdf.UniformData('Im', unit='pA'),
+                                 self.block, timemajor=True)
+        writer.close()
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_coalesce_indices(self):
+        self.assertEqual(nsdf.coalesce_indices([7, 3, 4, 3, 20, 9], 1),
+                         [(3, 5), (7, 8), (9, 10), (20, 21)])
+        self.assertEqual(nsdf.coalesce_indices([7, 3, 4, 3, 20, 9], 8),
+                         [(3, 8), (9, 10), (20, 21)])
+        self.assertEqual(nsdf.coalesce_indices([]), [])
+
+    def test_read_ranges(self):
+        with h5.File(self.filename, 'a') as fd:
+            dataset = fd.create_dataset('ranges', data=np.arange(100.0),
+                                        chunks=(8,))
+            ranges = [(3, 5), (5, 5), (9, 30), (90, 100)]
+            nptest.assert_allclose(
+                nsdf.read_ranges(dataset, ranges),
+                np.concatenate([np.arange(start, stop)
+                                for start, stop in ranges]))
+            self.assertEqual(len(nsdf.read_ranges(dataset, [(4, 4)])), 0)
+
+    def test_get_uniform_rows(self):
+        reader = nsdf.NSDFReader(self.filename)
+        rows = [17, 3, 40, 3, 41, 0, 49, 18]
+        uids = [self.sources[row] for row in rows]
+        for variable in ['Vm', 'Im']:
+            data = reader.get_uniform_rows('granule', variable, uids)
+            np.testing.assert_allclose(data, self.block[rows])
+        self.assertRaises(KeyError, reader.get_uniform_rows, 'granule',
+                          'Vm', ['c0', 'x'])
+
+
+class TestNSDFReaderSourceIndex(unittest.TestCase):
+    """Check looking up sources through the source index"""
+    def setUp(self):
+        self.filename = '{}.h5'.format(self.id())
+        create_test_data_file(self.filename, nsdf.dialect.ONED)
+        reader = nsdf.NSDFReader(self.filename)
+        self.uniform = reader.get_uniform_data('granule', 'Vm')
+        self.nonuniform = reader.get_nonuniform_data('mitral', 'Im')
+        del reader
+        self.static = nsdf.StaticData('area', unit='um^2')
+        for uid in self.uniform.get_sources():
+            self.static.put_data(uid, np.random.rand(2))
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def add_static_data(self, sourceindex):
+        writer = nsdf.NSDFWriter(self.filename, mode='a',
+                                 dialect=nsdf.dialect.ONED,
+                                 sourceindex=sourceindex)
+        static_ds = writer.add_static_ds('granule',
+                                         self.static.get_sources())
+        writer.add_static_data(static_ds, self.static)
+        writer.close()
+
+    def check_source_index(self, reader):
+        index = reader.get_source_index()
+        entries = nsdf.scan_source_maps(reader.mapping)
+        self.assertEqual(sum(len(value) for value in index.values()),
+                         len(entries))
+        for source, sampling, population, row in entries:
+            self.assertIn((sampling, population, row), index[source])
+            self.assertEqual(reader.mapping[sampling][population][row]
+                             if sampling in (nsdf.UNIFORM, nsdf.STATIC)
+                             else reader.mapping[sampling][population]
+                             ['source', row], source)
+        for uid in self.uniform.get_sources():
+            datasets = dict(((sampling, variable), (dataset, row))
+                            for sampling, population, variable, dataset, row
+                            in reader.get_source_datasets(uid))
+            self.assertEqual(set(datasets), set([(nsdf.UNIFORM, 'Vm'),
+                                                 (nsdf.STATIC, 'area')]))
+            dataset, row = datasets[(nsdf.UNIFORM, 'Vm')]
+            nptest.assert_allclose(dataset[row],
+                                   self.uniform.get_data(uid))
+            dataset, row = datasets[(nsdf.STATIC, 'area')]
+            nptest.assert_allclose(dataset[row], self.static.get_data(uid))
+            data, unit, times, tunit = reader.get_uniform_row(uid, 'Vm')
+            nptest.assert_allclose(data, self.uniform.get_data(uid))
+        for uid in self.nonuniform.get_sources():
+            (sampling, population, variable, dataset, row), = \
+                reader.get_source_datasets(uid)
+            self.assertEqual((sampling, population, variable, row),
+                             (nsdf.NONUNIFORM, 'mitral', 'Im', None))
+            nptest.assert_allclose(dataset,
+                                   self.nonuniform.get_data(uid)[0])
+        self.assertRaises(KeyError, reader.get_source_datasets, 'x')
+
+    def test_scanned_index(self):
+        self.add_static_data(False)
+        reader = nsdf.NSDFReader(self.filename)
+        self.assertNotIn('sourceindex', reader.mapping)
+        self.check_source_index(reader)
+
+    def test_stored_index(self):
+        self.add_static_data(True)
+        reader = nsdf.NSDFReader(self.filename)
+        self.assertIn('sourceindex', reader.mapping)
+        self.check_source_index(reader)
+
+
+class TestNSDFReaderCatalog(unittest.TestCase):
+    """Check that the listing and metadata queries give the same
+    results with and without the catalog"""
+    def setUp(self):
+        self.filename = '{}.h5'.format(self.id())
+        self.variables = [(nsdf.UNIFORM, 'granule', 'Vm'),
+                          (nsdf.NONUNIFORM, 'mitral', 'Im'),
+                          (nsdf.EVENT, 'cells', 'spike')]
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def get_listing(self, reader):
+        return (reader.uniform_populations,
+                reader.nonuniform_populations,
+                reader.event_populations,
+                reader.get_uniform_vars('granule'),
+                reader.get_nonuniform_vars('mitral'),
+                reader.get_event_vars('cells'),
+                reader.get_uniform_dt('granule', 'Vm'))
+
+    def test_catalog(self):
+        for dialect in [nsdf.dialect.ONED, nsdf.dialect.VLEN,
+                        nsdf.dialect.NANPADDED, nsdf.dialect.NUREGULAR,
+                        nsdf.dialect.CSR]:
+            create_test_data_file(self.filename, dialect)
+            reader = nsdf.NSDFReader(self.filename)
+            self.assertNotIn('catalog', reader.mapping)
+            listing = self.get_listing(reader)
+            info = [reader.get_variable_info(*variable)
+                    for variable in self.variables]
+            self.assertEqual(len(reader.get_catalog()), 3)
+            del reader
+            writer = nsdf.NSDFWriter(self.filename, mode='a',
+                                     dialect=dialect, catalog=True)
+            writer.close()
+            reader = nsdf.NSDFReader(self.filename)
+            self.assertIn('catalog', reader.mapping)
+            self.assertEqual(self.get_listing(reader), listing)
+            for variable, expected in zip(self.variables, info):
+                found = reader.get_variable_info(*variable)
+                self.assertEqual(sorted(found), sorted(expected))
+                for key, value in expected.items():
+                    if isinstance(value, float) and np.isnan(value):
+                        self.assertTrue(np.isnan(found[key]))
+                    else:
+                        self.assertEqual(found[key], value)
+            self.assertEqual(info[0]['shape'], (10, 100))
+            self.assertAlmostEqual(info[0]['t1'], 0.99)
+            self.assertEqual(info[1]['source'],
+                             reader.mapping[nsdf.NONUNIFORM]['mitral'].name
+                             if dialect != nsdf.dialect.ONED else
+                             '/map/nonuniform/mitral/Im')
+            self.assertRaises(KeyError, reader.get_uniform_vars, 'mitral')
+            self.assertRaises(KeyError, reader.get_variable_info,
+                              nsdf.UNIFORM, 'granule', 'Im')
+            del reader
+
+
+class TestNSDFReaderModelTable(unittest.TestCase):
+    """Check that the model tree stored in tabular form is rebuilt
+    correctly"""
+    def setUp(self):
+        self.filename = '{}.h5'.format(self.id())
+        writer = nsdf.NSDFWriter(self.filename, mode='w')
+        # two cells: soma with two dendrite branches each
+        self.parents = [-1, 0, 1, 1]
+        for ii in range(2):
+            names = ['cell_{}'.format(ii), 'soma', 'dend_0', 'dend_1']
+            writer.add_modeltable(
+                names, self.parents,
+                uids=['c{}_{}'.format(ii, name) for name in names],
+                attrs={'length': np.arange(4.0) + ii,
+                       'kind': ['cell', 'soma', 'dend', 'dend']})
+        writer.close()
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_get_modeltable(self):
+        reader = nsdf.NSDFReader(self.filename)
+        root = reader.get_modeltable()
+        self.assertEqual(set(root.children.keys()),
+                         set(['cell_0', 'cell_1']))
+        cell = root.children['cell_1']
+        self.assertEqual(cell.uid, 'c1_cell_1')
+        self.assertEqual(cell.path, '/modeltable/cell_1')
+        soma = cell.children['soma']
+        self.assertEqual(soma.uid, 'c1_soma')
+        self.assertEqual(soma.parent, cell)
+        self.assertEqual(set(soma.children.keys()), set(['dend_0', 'dend_1']))
+        dend = soma.children['dend_1']
+        self.assertEqual(dend.attrs['kind'], 'dend')
+        self.assertAlmostEqual(dend.attrs['length'], 4.0)
+        self.assertEqual(len(dend.children), 0)
+
+    def test_missing_attrs(self):
+        """Components added without an attribute do not get it."""
+        writer = nsdf.NSDFWriter(self.filename, mode='a')
+        writer.add_modeltable(['cell_2', 'soma'], [-1, 0],
+                              uids=['c2_cell_2', 'c2_soma'],
+                              attrs={'kind': ['cell', 'soma'],
+                                     'diam': [0.0, 20.0]})
+        writer.add_modeltable(['cell_3'], [-1], uids=['c3_cell_3'])
+        writer.close()
+        reader = nsdf.NSDFReader(self.filename)
+        root = reader.get_modeltable()
+        dend = root.children['cell_0'].children['soma'].children['dend_0']
+        self.assertEqual(set(dend.attrs.keys()), set(['kind', 'length']))
+        cell = root.children['cell_2']
+        self.assertEqual(cell.attrs, {'kind': 'cell', 'diam': 0.0})
+        self.assertEqual(cell.children['soma'].attrs,
+                         {'kind': 'soma', 'diam': 20.0})
+        self.assertEqual(root.children['cell_3'].attrs, {})
+
             
 if __name__ == '__main__':
     unittest.main()
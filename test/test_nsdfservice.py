@@ -0,0 +1,132 @@
+# test_nsdfservice.py --- 
+# 
+# Filename: test_nsdfservice.py
+# Description: 
+# Author: 
+# Maintainer: 
+# Created: 
+# Version: 
+# Last-Updated: 
+#           By: 
+#     Update #: 0
+# URL: 
+# Keywords: 
+# Compatibility: 
+# 
+# 
+
+# Commentary: 
+# 
+# 
+# 
+# 
+
+# Change log:
+# 
+# 
+# 
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street, Fifth
+# Floor, Boston, MA 02110-1301, USA.
+# 
+# 
+
+# Code:
+"""Tests for the NSDFWriterService class."""
+
+import sys
+import time
+import numpy as np
+from numpy import testing as nptest
+import h5py as h5
+import unittest
+import os
+
+sys.path.append('..')
+import nsdf
+
+
+class TestNSDFWriterService(unittest.TestCase):
+    def setUp(self):
+        self.filepath = '{}.h5'.format(self.id())
+        self.sources = ['soma_{}'.format(ii) for ii in range(5)]
+        self.service = nsdf.NSDFWriterService(self.filepath, mode='w')
+        self.vm = self.service.add_uniform_stream('pop0', self.sources,
+                                                  'Vm', unit='mV',
+                                                  dt=0.1, tunit='ms',
+                                                  capacity=16)
+        self.ca = self.service.add_uniform_stream('pop0', self.sources,
+                                                  'Ca', unit='mM',
+                                                  dt=0.1, tunit='ms',
+                                                  capacity=16)
+
+    def tearDown(self):
+        if os.path.exists(self.filepath):
+            os.remove(self.filepath)
+
+    def test_push(self):
+        """Data pushed into the streams must be in the file after
+        close, including when the rings wrap around."""
+        self.service.start()
+        vm = np.random.uniform(-65, -55, size=(100, len(self.sources)))
+        ca = np.random.uniform(0, 1, size=(100, len(self.sources)))
+        for ii in range(len(vm)):
+            self.vm.push(vm[ii])
+        self.ca.push(ca)
+        self.service.close()
+        with h5.File(self.filepath, 'r') as fd:
+            source = fd['/map/uniform/pop0']
+            self.assertEqual(list(source), self.sources)
+            nptest.assert_allclose(fd['/data/uniform/pop0/Vm'], vm.T)
+            nptest.assert_allclose(fd['/data/uniform/pop0/Ca'], ca.T)
+            self.assertEqual(fd['/data/uniform/pop0/Vm'].attrs['unit'], 'mV')
+
+    def test_restart(self):
+        """A closed service can be started again and append to the
+        file."""
+        service = nsdf.NSDFWriterService(self.filepath, mode='a')
+        vm = service.add_uniform_stream('pop0', self.sources, 'Vm',
+                                        unit='mV', dt=0.1, tunit='ms',
+                                        capacity=16)
+        data = np.random.uniform(-65, -55, size=(40, len(self.sources)))
+        for block in (data[:20], data[20:]):
+            service.start()
+            # Let the service reach its polling loop before pushing
+            time.sleep(0.5)
+            self.assertTrue(service.is_alive())
+            vm.push(block)
+            service.close()
+            self.assertFalse(service.is_alive())
+        with h5.File(self.filepath, 'r') as fd:
+            nptest.assert_allclose(fd['/data/uniform/pop0/Vm'], data.T)
+
+    def test_push_wrong_size(self):
+        self.service.start()
+        self.assertRaises(ValueError, self.vm.push, [1.0, 2.0])
+        self.service.close()
+
+    def test_add_stream_after_start(self):
+        self.service.start()
+        self.assertRaises(ValueError, self.service.add_uniform_stream,
+                          'pop1', self.sources, 'Vm')
+        self.service.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# 
+# test_nsdfservice.py ends here
@@ -0,0 +1,380 @@
+# test_nsdftools.py --- 
+# 
+# Filename: test_nsdftools.py
+# Description: 
+# Author: 
+# Maintainer: 
+# Created: 
+# Version: 
+# Last-Updated: 
+#           By: 
+#     Update #: 0
+# URL: 
+# Keywords: 
+# Compatibility: 
+# 
+# 
+
+# Commentary: 
+# 
+# 
+# 
+# 
+
+# Change log:
+# 
+# 
+# 
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street, Fifth
+# Floor, Boston, MA 02110-1301, USA.
+# 
+# 
+
+# Code:
+"""Tests for the tools in nsdftools module."""
+
+import sys
+import numpy as np
+from numpy import testing as nptest
+import h5py as h5
+import unittest
+import os
+
+sys.path.append('..')
+import nsdf
+
+
+class TestAssembleShards(unittest.TestCase):
+    """Write the data from a population of sources split between
+    shards and check that the assembled file reads the same."""
+    def setUp(self):
+        self.nshards = 3
+        self.shardfiles = ['{}_{}.h5'.format(self.id(), ii)
+                           for ii in range(self.nshards)]
+        self.filepath = '{}.h5'.format(self.id())
+        self.sources = [['src_{}_{}'.format(ii, jj) for jj in range(ii + 2)]
+                        for ii in range(self.nshards)]
+
+    def tearDown(self):
+        for path in self.shardfiles + [self.filepath]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def write_shards(self, dialect, write):
+        """Call `write(writer, sources)` twice on each shard"""
+        for path, sources in zip(self.shardfiles, self.sources):
+            writer = nsdf.NSDFWriter(path, dialect=dialect, mode='w')
+            write(writer, sources)
+            write(writer, sources)
+            writer.close()
+        nsdf.assemble_shards(self.filepath, self.shardfiles)
+
+    def test_uniform(self):
+        expected = {}
+        def write(writer, sources):
+            try:
+                source_ds = writer.mapping[nsdf.UNIFORM]['pop']
+            except KeyError:
+                source_ds = writer.add_uniform_ds('pop', sources)
+            data = nsdf.UniformData('Vm', unit='mV', dt=0.1, tunit='ms')
+            for src in sources:
+                values = np.random.uniform(size=10)
+                data.put_data(src, values)
+                expected.setdefault(src, []).append(values)
+            writer.add_uniform_data(source_ds, data)
+        self.write_shards(nsdf.dialect.ONED, write)
+        reader = nsdf.NSDFReader(self.filepath)
+        data = reader.get_uniform_data('pop', 'Vm')
+        self.assertEqual(set(data.get_sources()), set(expected.keys()))
+        for src, values in expected.items():
+            nptest.assert_allclose(data.get_data(src),
+                                   np.concatenate(values))
+        with h5.File(self.filepath, 'r') as fd:
+            self.assertTrue(fd['/data/uniform/pop/Vm'].is_virtual)
+
+    def test_uniform_timemajor(self):
+        expected = {}
+        def write(writer, sources):
+            try:
+                source_ds = writer.mapping[nsdf.UNIFORM]['pop']
+            except KeyError:
+                source_ds = writer.add_uniform_ds('pop', sources)
+            data = nsdf.UniformData('Vm', unit='mV', dt=0.1, tunit='ms')
+            block = np.random.uniform(size=(len(sources), 10))
+            writer.add_uniform_block(source_ds, data, block,
+                                     timemajor=True)
+            for src, values in zip(sources, block):
+                expected.setdefault(src, []).append(values)
+        self.write_shards(nsdf.dialect.ONED, write)
+        reader = nsdf.NSDFReader(self.filepath)
+        data = reader.get_uniform_data('pop', 'Vm')
+        self.assertEqual(set(data.get_sources()), set(expected.keys()))
+        for src, values in expected.items():
+            nptest.assert_allclose(data.get_data(src),
+                                   np.concatenate(values))
+        with h5.File(self.filepath, 'r') as fd:
+            dataset = fd['/data/uniform/pop/Vm']
+            self.assertTrue(dataset.is_virtual)
+            self.assertEqual(dataset.attrs['layout'], nsdf.layout.TIMEMAJOR)
+            self.assertEqual(dataset.shape, (20, len(expected)))
+
+    def test_uniform_different_sampling(self):
+        for key, values in [('dt', [0.1, 0.5]), ('tstart', [0.0, 3.0])]:
+            shard = [0]
+            def write(writer, sources):
+                try:
+                    source_ds = writer.mapping[nsdf.UNIFORM]['pop']
+                except KeyError:
+                    source_ds = writer.add_uniform_ds('pop', sources)
+                    shard[0] += 1
+                props = {'dt': 0.1, 'tstart': 0.0}
+                props[key] = values[shard[0] % 2]
+                data = nsdf.UniformData('Vm', unit='mV', dt=props['dt'],
+                                        tunit='ms')
+                for src in sources:
+                    data.put_data(src, np.random.uniform(size=10))
+                writer.add_uniform_data(source_ds, data,
+                                        tstart=props['tstart'])
+            self.assertRaises(ValueError, self.write_shards,
+                              nsdf.dialect.ONED, write)
+
+    def test_model_links(self):
+        """The references between the model and the map datasets point
+        at the objects in the combined file."""
+        uids = sum(self.sources, [])
+        def write(writer, sources):
+            try:
+                source_ds = writer.mapping[nsdf.UNIFORM]['pop']
+            except KeyError:
+                root = nsdf.ModelComponent('net', uid='net')
+                cells = nsdf.ModelComponent('cells', uid='cells',
+                                            parent=root)
+                for uid in uids:
+                    nsdf.ModelComponent(uid, uid=uid, parent=cells)
+                writer.add_modeltree(root)
+                source_ds = writer.add_uniform_ds('pop', sources)
+            data = nsdf.UniformData('Vm', unit='mV', dt=0.1, tunit='ms')
+            for src in sources:
+                data.put_data(src, np.random.uniform(size=10))
+            writer.add_uniform_data(source_ds, data)
+        self.write_shards(nsdf.dialect.ONED, write)
+        with h5.File(self.filepath, 'r') as fd:
+            source_ds = fd['/map/uniform/pop']
+            model = [fd[ref] for ref in source_ds.attrs['model']]
+            self.assertEqual([obj.name for obj in model],
+                             ['/model/modeltree/net/cells'])
+            self.assertEqual(model[0].attrs['uid'], 'cells')
+            maps = [fd[ref] for ref in model[0].attrs['map']]
+            self.assertEqual([obj.name for obj in maps],
+                             ['/map/uniform/pop'])
+            self.assertEqual(list(maps[0][:]), uids)
+
+    def test_nonuniform_1d(self):
+        expected = {}
+        def write(writer, sources):
+            try:
+                source_ds = writer.mapping[nsdf.NONUNIFORM]['pop']['Vm']
+            except KeyError:
+                source_ds = writer.add_nonuniform_ds_1d('pop', 'Vm', sources)
+            data = nsdf.NonuniformData('Vm', unit='mV', tunit='ms')
+            for src in sources:
+                values = np.random.uniform(size=5)
+                times = np.cumsum(np.random.uniform(size=5))
+                data.put_data(src, (values, times))
+                expected.setdefault(src, []).append((values, times))
+            writer.add_nonuniform_1d(source_ds, data,
+                                     {src: src for src in sources})
+        self.write_shards(nsdf.dialect.ONED, write)
+        reader = nsdf.NSDFReader(self.filepath)
+        data = reader.get_nonuniform_data('pop', 'Vm')
+        self.assertEqual(set(data.get_sources()), set(expected.keys()))
+        for src, chunks in expected.items():
+            values, times = data.get_data(src)
+            nptest.assert_allclose(values,
+                                   np.concatenate([v for v, t in chunks]))
+            nptest.assert_allclose(times,
+                                   np.concatenate([t for v, t in chunks]))
+
+    def test_nonuniform_shared_ts(self):
+        expected = {}
+        def write(writer, sources):
+            times = np.cumsum(np.random.uniform(size=5))
+            for name in ['Vm', 'Im']:
+                try:
+                    source_ds = writer.mapping[nsdf.NONUNIFORM]['pop'][name]
+                except KeyError:
+                    source_ds = writer.add_nonuniform_ds_1d('pop', name,
+                                                            sources)
+                data = nsdf.NonuniformData(name, unit='mV', tunit='ms')
+                for src in sources:
+                    data.put_data(src, (np.random.uniform(size=5), times))
+                    expected.setdefault(src, []).append(times)
+                writer.add_nonuniform_1d(source_ds, data)
+        self.write_shards(nsdf.dialect.ONED, write)
+        with h5.File(self.shardfiles[0], 'r') as fd:
+            self.assertEqual(len(fd['/map/time']), 1)
+        with h5.File(self.filepath, 'r') as fd:
+            self.assertEqual(len(fd['/map/time']), self.nshards)
+        reader = nsdf.NSDFReader(self.filepath)
+        for name in ['Vm', 'Im']:
+            data = reader.get_nonuniform_data('pop', name)
+            for src, chunks in expected.items():
+                values, times = data.get_data(src)
+                nptest.assert_allclose(times,
+                                       np.concatenate(chunks[::2]))
+
+    def test_nonuniform_regular(self):
+        times = [np.cumsum(np.random.uniform(size=5)) + ii * 10
+                 for ii in range(2)]
+        def write(writer, sources, times=times):
+            try:
+                source_ds = writer.mapping[nsdf.NONUNIFORM]['pop']
+            except KeyError:
+                source_ds = writer.add_nonuniform_ds('pop', sources)
+                times = times[:1]
+            data = nsdf.NonuniformRegularData('Vm', unit='mV', tunit='ms')
+            data.set_times(times[-1])
+            for src in sources:
+                data.put_data(src, np.random.uniform(size=5))
+            writer.add_nonuniform_regular(source_ds, data)
+        self.write_shards(nsdf.dialect.NUREGULAR, write)
+        with h5.File(self.filepath, 'r') as fd:
+            nptest.assert_allclose(fd['/map/time/pop_Vm'],
+                                   np.concatenate(times))
+
+    def test_nonuniform_regular_different_ts(self):
+        def write(writer, sources):
+            try:
+                source_ds = writer.mapping[nsdf.NONUNIFORM]['pop']
+                offset = 10
+            except KeyError:
+                source_ds = writer.add_nonuniform_ds('pop', sources)
+                offset = 0
+            data = nsdf.NonuniformRegularData('Vm', unit='mV', tunit='ms')
+            data.set_times(np.cumsum(np.random.uniform(size=5)) + offset)
+            for src in sources:
+                data.put_data(src, np.random.uniform(size=5))
+            writer.add_nonuniform_regular(source_ds, data)
+        self.assertRaises(ValueError, self.write_shards,
+                          nsdf.dialect.NUREGULAR, write)
+
+    def test_nonuniform_nan(self):
+        expected = {}
+        def write(writer, sources):
+            try:
+                source_ds = writer.mapping[nsdf.NONUNIFORM]['pop']
+            except KeyError:
+                source_ds = writer.add_nonuniform_ds('pop', sources)
+            data = nsdf.NonuniformData('Vm', unit='mV', tunit='ms')
+            for src in sources:
+                size = np.random.randint(1, 10)
+                values = np.random.uniform(size=size)
+                times = np.cumsum(np.random.uniform(size=size))
+                data.put_data(src, (values, times))
+                expected.setdefault(src, []).append((values, times))
+            writer.add_nonuniform_nan(source_ds, data)
+        self.write_shards(nsdf.dialect.NANPADDED, write)
+        reader = nsdf.NSDFReader(self.filepath)
+        data = reader.get_nonuniform_data('pop', 'Vm')
+        for src, chunks in expected.items():
+            values, times = data.get_data(src)
+            nptest.assert_allclose(values,
+                                   np.concatenate([v for v, t in chunks]))
+            nptest.assert_allclose(times,
+                                   np.concatenate([t for v, t in chunks]))
+
+    def test_event_csr(self):
+        expected = {}
+        def write(writer, sources):
+            try:
+                source_ds = writer.mapping[nsdf.EVENT]['pop']
+            except KeyError:
+                source_ds = writer.add_event_ds('pop', sources)
+            data = nsdf.EventData('spike', unit='s')
+            for src in sources:
+                times = np.cumsum(np.random.uniform(
+                    size=np.random.randint(0, 10)))
+                data.put_data(src, times)
+                expected.setdefault(src, []).append(times)
+            writer.add_event_csr(source_ds, data)
+        self.write_shards(nsdf.dialect.CSR, write)
+        reader = nsdf.NSDFReader(self.filepath)
+        data = reader.get_event_data('pop', 'spike')
+        self.assertEqual(set(data.get_sources()), set(expected.keys()))
+        for src, chunks in expected.items():
+            nptest.assert_allclose(data.get_data(src),
+                                   np.concatenate(chunks))
+
+    def test_vlen(self):
+        def write(writer, sources):
+            try:
+                source_ds = writer.mapping[nsdf.EVENT]['pop']
+            except KeyError:
+                source_ds = writer.add_event_ds('pop', sources)
+            data = nsdf.EventData('spike', unit='s')
+            for src in sources:
+                data.put_data(src, np.cumsum(np.random.uniform(size=3)))
+            writer.add_event_vlen(source_ds, data)
+        self.assertRaises(NotImplementedError, self.write_shards,
+                          nsdf.dialect.VLEN, write)
+
+
+class TestConvertToDimensionScales(unittest.TestCase):
+    """Convert a file written with REFATTR linkage to dimension
+    scales."""
+    def setUp(self):
+        self.filepath = '{}.h5'.format(self.id())
+
+    def tearDown(self):
+        if os.path.exists(self.filepath):
+            os.remove(self.filepath)
+
+    def test_convert(self):
+        writer = nsdf.NSDFWriter(self.filepath, mode='w',
+                                 dialect=nsdf.dialect.VLEN,
+                                 linkage=nsdf.linkage.REFATTR)
+        source_ds = writer.add_nonuniform_ds('pop', ['a', 'b'])
+        data = nsdf.NonuniformData('Vm', unit='mV', tunit='ms')
+        expected = {}
+        for src in ['a', 'b']:
+            expected[src] = (np.random.uniform(size=5),
+                             np.cumsum(np.random.uniform(size=5)))
+            data.put_data(src, expected[src])
+        writer.add_nonuniform_vlen(source_ds, data)
+        writer.close()
+        nsdf.convert_to_dimension_scales(self.filepath)
+        with h5.File(self.filepath, 'r') as fd:
+            self.assertEqual(fd.attrs['linkage'], nsdf.linkage.DIMSCALE)
+            dataset = fd['/data/nonuniform/pop/Vm']
+            self.assertNotIn('dimension_scales', dataset.attrs)
+            self.assertEqual(dataset.dims[0]['source'],
+                             fd['/map/nonuniform/pop'])
+            self.assertEqual(dataset.dims[0]['time'].name,
+                             '/map/time/pop_Vm')
+        reader = nsdf.NSDFReader(self.filepath)
+        file_data = reader.get_nonuniform_data('pop', 'Vm')
+        for src, (values, times) in expected.items():
+            fvalues, ftimes = file_data.get_data(src)
+            nptest.assert_allclose(fvalues, values)
+            nptest.assert_allclose(ftimes, times)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# 
+# test_nsdftools.py ends here
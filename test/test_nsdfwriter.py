@@ -58,6 +58,7 @@ possibly files left from older tests which failed.
 """
 
 import sys
+import inspect
 from collections import defaultdict
 import numpy as np
 from numpy import testing as nptest
@@ -145,6 +146,337 @@ class TestNSDFWriterUniform(unittest.TestCase):
             for row, source in zip(data, data.dims[0]['source']):
                 nptest.assert_allclose(row[-self.dlen:], self.data_object.get_data(source))
         os.remove(self.filepath)
+
+    def test_population_handle(self):
+        """The population handle caches the source ids and can be used
+        like the source dataset."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='w')
+        ds = writer.add_uniform_ds(self.popname, self.granule_somata)
+        self.assertIsInstance(ds, nsdf.PopulationHandle)
+        self.assertIsInstance(ds, h5.Dataset)
+        self.assertEqual(ds.uids, self.granule_somata)
+        self.assertEqual(ds.index[self.granule_somata[2]], 2)
+        self.assertTrue(ds.match(self.granule_somata[::-1]))
+        self.assertFalse(ds.match(self.granule_somata[1:]))
+        writer.add_uniform_data(ds, self.data_object)
+        bad = nsdf.UniformData('Vm', unit='mV', dt=1e-4)
+        bad.put_data('nonexistent', np.zeros(self.dlen))
+        self.assertRaises(KeyError, writer.add_uniform_data, ds, bad)
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            data = fd['/data'][nsdf.UNIFORM][self.popname]['Vm']
+            for row, source in zip(data, data.dims[0]['source']):
+                nptest.assert_allclose(row, self.data_object.get_data(source))
+        os.remove(self.filepath)
+
+    def test_block_append(self):
+        """A 2D block in source order is appended as it is."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='a')
+        ds = writer.mapping['uniform'][self.popname]
+        block = np.random.uniform(-65, -55,
+                                  size=(len(self.granule_somata), self.dlen))
+        writer.add_uniform_block(ds, self.data_object, block)
+        self.data_object.put_block(block[::-1], self.granule_somata[::-1])
+        self.assertRaises(KeyError, writer.add_uniform_data, ds,
+                          self.data_object)
+        self.data_object.put_block(block[1:])
+        self.assertRaises(KeyError, writer.add_uniform_data, ds,
+                          self.data_object)
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            uniform_container = fd['/data'][nsdf.UNIFORM]
+            data = uniform_container[self.popname][self.data_object.name]
+            self.assertEqual(data.shape[1], 2 * self.dlen)
+            nptest.assert_allclose(data[:, self.dlen:], block)
+        os.remove(self.filepath)
+
+    def test_batch_append(self):
+        """Several variables of one population are written in one
+        call."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='a')
+        ds = writer.mapping['uniform'][self.popname]
+        nrows = len(self.granule_somata)
+        gk = nsdf.UniformData('Gk', unit='mS', dt=1e-4)
+        ik = nsdf.UniformData('Ik', unit='nA', dt=1e-4)
+        for uid in self.granule_somata:
+            self.data_object.put_data(uid, np.random.uniform(
+                -65, -55, size=self.dlen))
+        for uid in self.granule_somata[::-1]:
+            gk.put_data(uid, np.random.uniform(size=self.dlen))
+        ik_block = np.random.uniform(size=(nrows, self.dlen))
+        ik.put_block(ik_block)
+        datasets = writer.add_uniform_batch(ds, [self.data_object, gk, ik])
+        self.assertEqual([dataset.name.rpartition('/')[-1]
+                          for dataset in datasets], ['Vm', 'Gk', 'Ik'])
+        blocks = [np.ones((nrows, 3)), np.zeros((nrows, 3))]
+        writer.add_uniform_batch(ds, [gk, ik], blocks=blocks)
+        self.assertRaises(ValueError, writer.add_uniform_batch, ds,
+                          [gk, ik], blocks=blocks[:1])
+        self.assertRaises(KeyError, writer.add_uniform_batch, ds,
+                          [gk], blocks=[np.ones((nrows - 1, 3))])
+        bad = nsdf.UniformData('Gk', unit='mS', dt=1e-4)
+        bad.put_data('nonexistent', np.zeros(self.dlen))
+        self.assertRaises(KeyError, writer.add_uniform_batch, ds, [bad])
+        na = nsdf.UniformData('INa', unit='nA', dt=1e-4, tunit='s')
+        writer.add_uniform_block(ds, na, ik_block, timemajor=True)
+        writer.add_uniform_batch(ds, [na, gk], blocks=[ik_block, blocks[0]])
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            group = fd['/data'][nsdf.UNIFORM][self.popname]
+            vm = group[self.data_object.name]
+            self.assertEqual(vm.shape, (nrows, 2 * self.dlen))
+            for row, source in zip(vm, vm.dims[0]['source']):
+                nptest.assert_allclose(row[self.dlen:],
+                                       self.data_object.get_data(source))
+            self.assertEqual(group['Gk'].attrs['unit'], 'mS')
+            gk_data = group['Gk']
+            for row, source in zip(gk_data, gk_data.dims[0]['source']):
+                nptest.assert_allclose(row[:self.dlen], gk.get_data(source))
+            nptest.assert_allclose(group['Gk'][:, self.dlen:], 1.0)
+            self.assertEqual(group['Gk'].shape, (nrows, self.dlen + 6))
+            nptest.assert_allclose(group['INa'],
+                                   np.hstack((ik_block, ik_block)).T)
+            nptest.assert_allclose(group['Ik'][:, :self.dlen], ik_block)
+            nptest.assert_allclose(group['Ik'][:, self.dlen:], 0.0)
+        os.remove(self.filepath)
+
+    def test_chunks(self):
+        """Chunks of new datasets follow the access pattern, runtime and
+        per-variable overrides."""
+        nrows = len(self.granule_somata)
+        self.assertEqual(nsdf.plan_chunks((10, 5), np.float64, axis=1),
+                         (10, nsdf.CHUNK_BYTES // 8 // 10))
+        self.assertEqual(nsdf.plan_chunks((10, 5), np.float64, axis=1,
+                                          nsteps=100,
+                                          pattern=nsdf.access.TRACE),
+                         (10, 100))
+        self.assertEqual(nsdf.plan_chunks((100, 5), np.float64, axis=1,
+                                          nsteps=10**6,
+                                          pattern=nsdf.access.TRACE),
+                         (nsdf.TRACE_SOURCES,
+                          nsdf.CHUNK_BYTES // 8 // nsdf.TRACE_SOURCES))
+        self.assertEqual(nsdf.plan_chunks((10**6, 5), np.float32, axis=1,
+                                          nsteps=10**6),
+                         (nsdf.CHUNK_BYTES // 4 // nsdf.SNAPSHOT_STEPS,
+                          nsdf.SNAPSHOT_STEPS))
+        self.assertEqual(nsdf.plan_chunks((10**6, 5), np.float32, axis=1),
+                         (nsdf.CHUNK_BYTES // 4 // nsdf.SNAPSHOT_STEPS,
+                          nsdf.SNAPSHOT_STEPS))
+        self.assertEqual(nsdf.plan_chunks((100,), np.int32),
+                         (nsdf.CHUNK_BYTES // 4,))
+        self.assertEqual(nsdf.plan_chunks((100,), np.int32, nsteps=300),
+                         (300,))
+        self.assertEqual(nsdf.plan_chunks((0,), np.int32),
+                         (nsdf.CHUNK_BYTES // 4,))
+        self.assertRaises(ValueError, nsdf.plan_chunks, (10, 5),
+                          np.float64, pattern='random')
+        writer = nsdf.NSDFWriter(self.filepath, mode='a', runtime=1.0,
+                                 access=nsdf.access.TRACE)
+        ds = writer.mapping['uniform'][self.popname]
+        block = np.ones((nrows, self.dlen))
+        gk = nsdf.UniformData('Gk', unit='mS', dt=1e-3, tunit='s')
+        gk = writer.add_uniform_block(ds, gk, block)
+        self.assertEqual(gk.chunks, (min(nrows, nsdf.CHUNK_BYTES // 8000),
+                                     1000))
+        writer.set_chunks('Ik', (2, 3))
+        ik = nsdf.UniformData('Ik', unit='nA', dt=1e-3, tunit='s')
+        ik = writer.add_uniform_block(ds, ik, block)
+        self.assertEqual(ik.chunks, (2, 3))
+        writer.set_chunks('Ik', None)
+        writer.set_chunks('Ek', nsdf.access.SNAPSHOT)
+        ek = nsdf.UniformData('Ek', unit='mV', dt=1e-3, tunit='s')
+        ek = writer.add_uniform_block(ds, ek, block, fixed=True)
+        self.assertEqual(ek.chunks, (nrows, self.dlen))
+        writer.close()
+        writer = nsdf.NSDFWriter(self.filepath, mode='a', autochunk=False)
+        ds = writer.mapping['uniform'][self.popname]
+        ca = nsdf.UniformData('Ca', unit='mM', dt=1e-3, tunit='s')
+        ca = writer.add_uniform_block(ds, ca, block)
+        self.assertEqual(ca.chunks,
+                         h5.filters.guess_chunk(block.shape,
+                                                (nrows, None), 8))
+        writer.close()
+        os.remove(self.filepath)
+
+    def test_chunks_unknown_length(self):
+        """Without a runtime the chunks are filled along time, in a shape
+        that follows the access pattern."""
+        sources = ['s{}'.format(ii) for ii in range(1000)]
+        block = np.ones((len(sources), 1))
+        chunks = {}
+        for pattern in [nsdf.access.TRACE, nsdf.access.SNAPSHOT]:
+            writer = nsdf.NSDFWriter(self.filepath, mode='w',
+                                     access=pattern)
+            ds = writer.add_uniform_ds('many', sources)
+            data = nsdf.UniformData('Vm', unit='mV', dt=1e-3, tunit='s')
+            chunks[pattern] = writer.add_uniform_block(ds, data,
+                                                       block).chunks
+            writer.close()
+        self.assertEqual(chunks[nsdf.access.TRACE],
+                         (nsdf.TRACE_SOURCES,
+                          nsdf.CHUNK_BYTES // 8 // nsdf.TRACE_SOURCES))
+        self.assertEqual(chunks[nsdf.access.SNAPSHOT],
+                         (len(sources), nsdf.CHUNK_BYTES // 8 // 1000))
+        os.remove(self.filepath)
+
+    def test_preallocate(self):
+        """Preallocated datasets are written in place, grow when full and
+        are trimmed on close."""
+        nrows = len(self.granule_somata)
+        writer = nsdf.NSDFWriter(self.filepath, mode='a', nsamples=12)
+        ds = writer.mapping['uniform'][self.popname]
+        blocks = [np.random.uniform(size=(nrows, self.dlen))
+                  for ii in range(3)]
+        gk = nsdf.UniformData('Gk', unit='mS', dt=1e-3, tunit='s')
+        dataset = writer.add_uniform_block(ds, gk, blocks[0])
+        self.assertEqual(dataset.shape, (nrows, 12))
+        writer.add_uniform_block(ds, gk, blocks[1])
+        self.assertEqual(dataset.shape, (nrows, 12))
+        writer.add_uniform_block(ds, gk, blocks[2])
+        self.assertEqual(dataset.shape, (nrows, 24))
+        writer.maxprealloc = nrows * 8 * 7
+        ik = nsdf.UniformData('Ik', unit='nA', dt=1e-3, tunit='s')
+        dataset = writer.add_uniform_block(ds, ik, blocks[0])
+        self.assertEqual(dataset.shape, (nrows, 7))
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            group = fd['/data'][nsdf.UNIFORM][self.popname]
+            nptest.assert_allclose(group['Gk'], np.hstack(blocks))
+            nptest.assert_allclose(group['Ik'], blocks[0])
+        os.remove(self.filepath)
+
+    def test_timemajor(self):
+        """Data in TIMEMAJOR layout is stored transposed and appended
+        along rows."""
+        nrows = len(self.granule_somata)
+        writer = nsdf.NSDFWriter(self.filepath, mode='a', buffersize=64)
+        ds = writer.mapping['uniform'][self.popname]
+        blocks = [np.random.uniform(size=(nrows, self.dlen))
+                  for ii in range(3)]
+        gk = nsdf.UniformData('Gk', unit='mS', dt=1e-3, tunit='s')
+        dataset = writer.add_uniform_block(ds, gk, blocks[0],
+                                           timemajor=True)
+        self.assertEqual(dataset.attrs['layout'], nsdf.layout.TIMEMAJOR)
+        self.assertEqual(dataset.maxshape, (None, nrows))
+        writer.add_uniform_batch(ds, [gk], blocks=[blocks[1]])
+        writer.close()
+        writer = nsdf.NSDFWriter(self.filepath, mode='a', nsamples=100)
+        ds = writer.mapping['uniform'][self.popname]
+        writer.add_uniform_block(ds, gk, blocks[2])
+        ik = nsdf.UniformData('Ik', unit='nA', dt=1e-3, tunit='s')
+        writer.add_uniform_block(ds, ik, blocks[0], timemajor=True)
+        writer.add_uniform_block(ds, ik, blocks[1])
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            group = fd['/data'][nsdf.UNIFORM][self.popname]
+            self.assertEqual(group['Gk'].dims[1].label, 'source')
+            nptest.assert_allclose(group['Gk'], np.hstack(blocks).T)
+            nptest.assert_allclose(group['Ik'], np.hstack(blocks[:2]).T)
+        os.remove(self.filepath)
+
+    def test_catalog(self):
+        """The catalog is written after trimming the datasets and kept
+        up to date."""
+        nrows = len(self.granule_somata)
+        writer = nsdf.NSDFWriter(self.filepath, mode='a', nsamples=100,
+                                 catalog=True)
+        ds = writer.mapping['uniform'][self.popname]
+        gk = nsdf.UniformData('Gk', unit='mS', dt=1e-3, tunit='s')
+        writer.add_uniform_block(ds, gk, np.ones((nrows, 3)),
+                                 timemajor=True, tstart=0.5)
+        writer.close()
+        writer = nsdf.NSDFWriter(self.filepath, mode='a')
+        ds = writer.mapping['uniform'][self.popname]
+        ik = nsdf.UniformData('Ik', unit='nA', dt=1e-3, tunit='s')
+        writer.add_uniform_block(ds, ik, np.ones((nrows, 2)))
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            catalog = fd['/map/catalog'][:]
+        self.assertEqual(catalog.dtype, nsdf.CATALOGTYPE)
+        entries = dict((entry['variable'], entry) for entry in catalog)
+        self.assertEqual(sorted(entries), ['Gk', 'Ik', 'Vm'])
+        gk = entries['Gk']
+        self.assertEqual(gk['path'], '/data/uniform/{}/Gk'.format(
+            self.popname))
+        self.assertEqual((gk['sampling'], gk['population'], gk['unit']),
+                         (nsdf.UNIFORM, self.popname, 'mS'))
+        self.assertEqual(gk['layout'], nsdf.layout.TIMEMAJOR)
+        self.assertEqual(tuple(gk['shape']), (3, nrows))
+        self.assertEqual(gk['dtype'], np.dtype(np.float64).str)
+        self.assertEqual(gk['source'], '/map/uniform/{}'.format(
+            self.popname))
+        self.assertAlmostEqual(gk['tstart'], 0.5)
+        self.assertAlmostEqual(gk['dt'], 1e-3)
+        self.assertAlmostEqual(gk['t1'], 0.502)
+        self.assertEqual(tuple(entries['Ik']['shape']), (nrows, 2))
+        os.remove(self.filepath)
+
+    def test_buffered_append(self):
+        """Appends collected in the write buffer must all reach the file
+        on close."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='a', buffersize=256)
+        ds = writer.mapping['uniform'][self.popname]
+        expected = {uid: [] for uid in self.granule_somata}
+        for ii in range(7):
+            for uid in self.granule_somata:
+                data = np.random.uniform(-65, -55, size=self.dlen)
+                self.data_object.put_data(uid, data)
+                expected[uid].append(data)
+            writer.add_uniform_data(ds, self.data_object)
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            uniform_container = fd['/data'][nsdf.UNIFORM]
+            data = uniform_container[self.popname][self.data_object.name]
+            self.assertEqual(data.shape[1], 8 * self.dlen)
+            for row, source in zip(data, data.dims[0]['source']):
+                nptest.assert_allclose(row[self.dlen:],
+                                       np.concatenate(expected[source]))
+        os.remove(self.filepath)
+
+    def test_background_append(self):
+        """Data queued for the writer thread must not be affected by
+        later changes to the data object."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='a', background=True,
+                                 queuesize=2)
+        ds = writer.mapping['uniform'][self.popname]
+        expected = {uid: [] for uid in self.granule_somata}
+        for ii in range(5):
+            for uid in self.granule_somata:
+                data = np.random.uniform(-65, -55, size=self.dlen)
+                self.data_object.put_data(uid, data)
+                expected[uid].append(data)
+            self.assertIsNone(writer.add_uniform_data(ds, self.data_object))
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            uniform_container = fd['/data'][nsdf.UNIFORM]
+            data = uniform_container[self.popname][self.data_object.name]
+            for row, source in zip(data, data.dims[0]['source']):
+                nptest.assert_allclose(row[self.dlen:],
+                                       np.concatenate(expected[source]))
+        os.remove(self.filepath)
+
+    def test_background_error(self):
+        """An error in the writer thread must be raised in the caller."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='a', background=True)
+        ds = writer.mapping['uniform'][self.popname]
+        data_object = nsdf.UniformData('bad', unit='mV', field='Vm',
+                                       dt=1e-4, tunit='s')
+        data_object.put_data('nonexistent', np.zeros(self.dlen))
+        writer.add_uniform_data(ds, data_object)
+        self.assertRaises(KeyError, writer.flush)
+        writer.close()
+        os.remove(self.filepath)
+
+    def test_close_error(self):
+        """The file must be closed even if flushing it fails."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='a')
+        def flush():
+            raise IOError('flush failed')
+        writer.flush = flush
+        self.assertRaises(IOError, writer.close)
+        self.assertFalse(writer._fd)
+        writer.close()
+        os.remove(self.filepath)
         
     
 class TestNSDFWriterNonuniform1D(unittest.TestCase):
@@ -259,6 +591,126 @@ class TestNSDFWriterNonuniform1D(unittest.TestCase):
                 nptest.assert_allclose(self.data_object.get_data(srcuid)[1],
                                        ts[-self.dlen:])                
         os.remove(self.filepath)
+
+    def test_shared_ts(self):
+        """Sources sampled at the same times share one time scale."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='w',
+                                 dialect=nsdf.dialect.ONED)
+        sources = ['a', 'b', 'c']
+        ds = writer.add_nonuniform_ds_1d(self.popname, 'Im', sources)
+        times = np.cumsum(np.random.exponential(scale=0.01, size=20))
+        data_object = nsdf.NonuniformData('Im', unit='pA', tunit='ms')
+        for src in sources:
+            data_object.put_data(src, (np.random.rand(10), times[:10]))
+        data_object.put_data('c', (np.random.rand(10), times[:10] + 1))
+        writer.add_nonuniform_1d(ds, data_object)
+        self.assertEqual(len(writer.time_dim), 2)
+        for src in sources:
+            data_object.put_data(src, (np.random.rand(10), times[10:]))
+        ret = writer.add_nonuniform_1d(ds, data_object)
+        self.assertEqual(ret['a'][1], ret['b'][1])
+        self.assertEqual(len(writer.time_dim), 2)
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            group = fd['/data'][nsdf.NONUNIFORM][self.popname]['Im']
+            for name in ['a', 'b']:
+                nptest.assert_allclose(group[name].dims[0]['time'], times)
+            nptest.assert_allclose(group['c'].dims[0]['time'],
+                                   np.concatenate((times[:10] + 1,
+                                                   times[10:])))
+        os.remove(self.filepath)
+
+    def test_refattr(self):
+        """With REFATTR linkage the scales keep no back references."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='w',
+                                 dialect=nsdf.dialect.ONED,
+                                 linkage=nsdf.linkage.REFATTR)
+        sources = ['a', 'b']
+        ds = writer.add_nonuniform_ds_1d(self.popname, 'Im', sources)
+        times = np.cumsum(np.random.exponential(scale=0.01, size=10))
+        data_object = nsdf.NonuniformData('Im', unit='pA', tunit='ms')
+        for src in sources:
+            data_object.put_data(src, (np.random.rand(10), times))
+        writer.add_nonuniform_1d(ds, data_object)
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            self.assertEqual(fd.attrs['linkage'], nsdf.linkage.REFATTR)
+            group = fd['/data'][nsdf.NONUNIFORM][self.popname]['Im']
+            for name in sources:
+                dataset = group[name]
+                self.assertEqual(len(dataset.dims[0]), 0)
+                self.assertEqual(dataset.dims[0].label, 'time')
+                (label, axis, ref), = dataset.attrs['dimension_scales']
+                self.assertEqual((label, axis), ('time', 0))
+                nptest.assert_allclose(fd[ref], times)
+                self.assertNotIn('REFERENCE_LIST', fd[ref].attrs)
+        os.remove(self.filepath)
+
+    def test_refattr_append(self):
+        """Appending to datasets sharing a scale in a reopened REFATTR
+        file moves them to one new scale and leaves no unused scale."""
+        sources = ['a', 'b', 'c']
+        times = np.cumsum(np.random.exponential(scale=0.01, size=30))
+        writer = nsdf.NSDFWriter(self.filepath, mode='w',
+                                 dialect=nsdf.dialect.ONED,
+                                 linkage=nsdf.linkage.REFATTR)
+        ds = writer.add_nonuniform_ds_1d(self.popname, 'Im', sources)
+        data_object = nsdf.NonuniformData('Im', unit='pA', tunit='ms')
+        for src in sources:
+            data_object.put_data(src, (np.random.rand(10), times[:10]))
+        writer.add_nonuniform_1d(ds, data_object)
+        writer.close()
+        expected = {src: times[:10] for src in sources}
+        for start in [10, 20]:
+            writer = nsdf.NSDFWriter(self.filepath, mode='a',
+                                     dialect=nsdf.dialect.ONED,
+                                     linkage=nsdf.linkage.REFATTR)
+            ds = writer.mapping[nsdf.NONUNIFORM][self.popname]['Im']
+            data_object = nsdf.NonuniformData('Im', unit='pA', tunit='ms')
+            for src in sources:
+                tpoints = times[start: start + 10]
+                if (start == 20) and (src == 'c'):
+                    tpoints = tpoints + 1
+                data_object.put_data(src, (np.random.rand(10), tpoints))
+                expected[src] = np.concatenate((expected[src], tpoints))
+            writer.add_nonuniform_1d(ds, data_object)
+            writer.close()
+            with h5.File(self.filepath, 'r') as fd:
+                group = fd['/data'][nsdf.NONUNIFORM][self.popname]['Im']
+                scales = {}
+                for src in sources:
+                    ref = group[src].attrs['dimension_scales'][0]['scale']
+                    scales[src] = fd[ref].name
+                    nptest.assert_allclose(fd[ref], expected[src])
+                self.assertEqual(len(fd['/map/time']),
+                                 len(set(scales.values())))
+                self.assertEqual(scales['a'], scales['b'])
+        self.assertNotEqual(scales['a'], scales['c'])
+        os.remove(self.filepath)
+
+    def test_sourceindex(self):
+        """The source index is written sorted and kept up to date."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='w',
+                                 dialect=nsdf.dialect.ONED,
+                                 sourceindex=True)
+        writer.add_nonuniform_ds_1d(self.popname, 'Im', ['b', 'a'])
+        writer.add_uniform_ds('granule', ['c', 'a'])
+        writer.close()
+        writer = nsdf.NSDFWriter(self.filepath, mode='a',
+                                 dialect=nsdf.dialect.ONED)
+        writer.add_event_ds_1d('cells', 'spike', ['a'])
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            index = fd['/map/sourceindex'][:]
+            self.assertEqual(index.dtype, nsdf.SOURCEINDEXTYPE)
+            self.assertEqual(
+                [tuple(entry) for entry in index],
+                [('a', nsdf.UNIFORM, 'granule', 1),
+                 ('a', nsdf.NONUNIFORM, self.popname + '/Im', 1),
+                 ('a', nsdf.EVENT, 'cells/spike', 0),
+                 ('b', nsdf.NONUNIFORM, self.popname + '/Im', 0),
+                 ('c', nsdf.UNIFORM, 'granule', 0)])
+        os.remove(self.filepath)
         
                 
 class TestNSDFWriterNonuniformVlen(unittest.TestCase):
@@ -459,6 +911,55 @@ class TestNSDFWriterNonuniformRegular(unittest.TestCase):
             nptest.assert_allclose(self.data_object.get_times(), time_ds)
         os.remove(self.filepath)
         
+    def test_shared_ts(self):
+        """Variables with the same sampling times share a time scale
+        that grows with appends."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='w',
+                                 dialect=nsdf.dialect.NUREGULAR)
+        sources = ['a', 'b']
+        ds = writer.add_nonuniform_ds(self.popname, sources)
+        times = [np.cumsum(np.random.uniform(size=5)) + ii * 10
+                 for ii in range(5)]
+        other = times[2] + 0.5
+        def add(name, tpoints):
+            data_object = nsdf.NonuniformRegularData(name, unit='mV',
+                                                     tunit='ms')
+            data_object.set_times(tpoints)
+            for src in sources:
+                data_object.put_data(src, np.ones(len(tpoints)))
+            return writer.add_nonuniform_regular(ds, data_object)
+        vm = add('Vm', times[0])
+        im = add('Im', times[0])
+        gk = add('Gk', times[0])
+        self.assertEqual(im.dims[1]['time'], vm.dims[1]['time'])
+        self.assertEqual(gk.dims[1]['time'], vm.dims[1]['time'])
+        self.assertEqual(len(writer.time_dim), 1)
+        add('Vm', times[1])
+        add('Im', times[1])
+        self.assertEqual(im.dims[1]['time'], vm.dims[1]['time'])
+        self.assertEqual(len(writer.time_dim), 1)
+        add('Vm', times[2])
+        add('Im', other)
+        self.assertNotEqual(im.dims[1]['time'], vm.dims[1]['time'])
+        add('Vm', times[3])
+        writer.close()
+        writer = nsdf.NSDFWriter(self.filepath, mode='a')
+        ds = writer.mapping[nsdf.NONUNIFORM][self.popname]
+        vm = add('Vm', times[4])
+        add('Gk', times[1])
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            self.assertEqual(len(fd['/map/time']), 3)
+            group = fd['/data'][nsdf.NONUNIFORM][self.popname]
+            nptest.assert_allclose(group['Vm'].dims[1]['time'],
+                                   np.concatenate(times))
+            nptest.assert_allclose(group['Im'].dims[1]['time'],
+                                   np.concatenate(times[:2] + [other]))
+            nptest.assert_allclose(group['Gk'].dims[1]['time'],
+                                   np.concatenate(times[:2]))
+            self.assertEqual(group['Gk'].shape, (2, 10))
+        os.remove(self.filepath)
+
 
 class TestNSDFWriterNonuniformNan(unittest.TestCase):
     """Test case for writing nonuniformly sampled data in homogeneous 2D
@@ -547,6 +1048,53 @@ class TestNSDFWriterNonuniformNan(unittest.TestCase):
                 nptest.assert_allclose(time_ds[len(time):], np.nan)
         os.remove(self.filepath)
 
+    def test_row_lengths(self):
+        """Check that the number of valid entries in each row is stored."""
+        with h5.File(self.filepath, 'r') as fd:
+            dataset_name = '/data/{}/{}/{}'.format(nsdf.NONUNIFORM,
+                                                   self.popname,
+                                                   self.data_object.name)
+            dataset = fd[dataset_name]
+            lengths = fd[dataset.attrs['length']]
+            self.assertEqual(lengths.name, '/map/length/{}/{}_{}'.format(
+                nsdf.NONUNIFORM, self.popname, self.data_object.name))
+            for ii, uid in enumerate(dataset.dims[0]['source']):
+                self.assertEqual(lengths[ii],
+                                 len(self.data_object.get_data(uid)[0]))
+        os.remove(self.filepath)
+
+    def test_append_without_lengths(self):
+        """Appending to a file written without the row lengths should
+        find the end of the valid data by scanning for NaN."""
+        with h5.File(self.filepath, 'a') as fd:
+            dataset_name = '/data/{}/{}/{}'.format(nsdf.NONUNIFORM,
+                                                   self.popname,
+                                                   self.data_object.name)
+            del fd[dataset_name].attrs['length']
+            del fd['/map/length']
+        old_data = {uid: self.data_object.get_data(uid)
+                    for uid in self.sources}
+        writer = nsdf.NSDFWriter(self.filepath, mode='a',
+                                 dialect=nsdf.dialect.NANPADDED)
+        source_ds = writer.mapping[nsdf.NONUNIFORM][self.popname]
+        for uid in self.sources:
+            self.data_object.put_data(uid, (np.random.uniform(size=3),
+                                            np.random.uniform(size=3)))
+        writer.add_nonuniform_nan(source_ds, self.data_object)
+        writer.close()
+        reader = nsdf.NSDFReader(self.filepath)
+        file_data = reader.get_nonuniform_data(self.popname,
+                                               self.data_object.name)
+        for uid in self.sources:
+            new_data, new_time = self.data_object.get_data(uid)
+            data, time = file_data.get_data(uid)
+            nptest.assert_allclose(np.concatenate((old_data[uid][0],
+                                                   new_data)), data)
+            nptest.assert_allclose(np.concatenate((old_data[uid][1],
+                                                   new_time)), time)
+        del reader
+        os.remove(self.filepath)
+
     def test_append_data(self):
         """Try appending data to existing NaN-padded nonuniform dataset"""
         # start over for appending data
@@ -682,6 +1230,88 @@ class TestNSDFWriterEvent1D(unittest.TestCase):
                                        dataset[self.dlen[ii]:])
         os.remove(self.filepath)
 
+    def test_metadata_options(self):
+        """Datasets created from the shared creation property list in the
+        latest file format match the first one."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='w',
+                                 dialect=nsdf.dialect.ONED,
+                                 libver='latest', compression='gzip',
+                                 track_times=False)
+        ds = writer.add_event_ds_1d(self.popname, self.varname,
+                                    self.sources)
+        writer.add_event_1d(ds, self.data_object, self.src_name_dict)
+        chunks = set(h5.filters.guess_chunk((dlen,), (None,), 8)
+                     for dlen in self.dlen)
+        self.assertEqual(len(writer._dcpls), len(chunks))
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            data_grp = fd['/data'][nsdf.EVENT][self.popname][self.varname]
+            datasets = [data_grp[name] for name in data_grp]
+            for dataset in datasets:
+                self.assertEqual(dataset.chunks,
+                                 h5.filters.guess_chunk(dataset.shape,
+                                                        (None,), 8))
+                self.assertEqual(dataset.compression, 'gzip')
+                self.assertEqual(dataset.maxshape, (None,))
+                self.assertEqual(
+                    dataset.id.get_create_plist().get_obj_track_times(),
+                    False)
+                nptest.assert_allclose(
+                    self.data_object.get_data(dataset.attrs['source']),
+                    dataset)
+        os.remove(self.filepath)
+
+    def test_file_space_options(self):
+        """The metadata block size and paged file space strategy are set
+        if h5py supports them and rejected clearly otherwise."""
+        options = {'meta_block_size': 1 << 16, 'fs_strategy': 'page',
+                   'fs_page_size': 1 << 14}
+        supported = inspect.getargspec(h5.File.__init__).args
+        for key, value in options.items():
+            if os.path.exists(self.filepath):
+                os.remove(self.filepath)
+            if key not in supported:
+                with self.assertRaises(ValueError) as context:
+                    nsdf.NSDFWriter(self.filepath, mode='w', **{key: value})
+                self.assertIn(key, str(context.exception))
+                self.assertFalse(os.path.exists(self.filepath))
+                continue
+            writer = nsdf.NSDFWriter(self.filepath, mode='w',
+                                     **{key: value})
+            ds = writer.add_event_ds_1d(self.popname, self.varname,
+                                        self.sources)
+            writer.add_event_1d(ds, self.data_object, self.src_name_dict)
+            writer.close()
+            with h5.File(self.filepath, 'r') as fd:
+                self.assertIn(self.popname, fd['/data'][nsdf.EVENT])
+            os.remove(self.filepath)
+
+    def test_many_small_sources(self):
+        """The chunks of many small per-source datasets do not inflate
+        the file."""
+        nsources, nsamples = 300, 10
+        sources = ['c{}'.format(ii) for ii in range(nsources)]
+        writer = nsdf.NSDFWriter(self.filepath, mode='w',
+                                 dialect=nsdf.dialect.ONED)
+        event_ds = writer.add_event_ds_1d('cells', 'spike', sources)
+        events = nsdf.EventData('spike', unit='s', field='spike')
+        nonuniform_ds = writer.add_nonuniform_ds_1d('cells', 'Vm', sources)
+        vm = nsdf.NonuniformData('Vm', unit='mV', tunit='s')
+        for ii, source in enumerate(sources):
+            times = np.cumsum(np.random.rand(nsamples)) + ii
+            events.put_data(source, times)
+            vm.put_data(source, (np.random.rand(nsamples), times))
+        writer.add_event_1d(event_ds, events)
+        writer.add_nonuniform_1d(nonuniform_ds, vm)
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            dataset = fd['/data'][nsdf.EVENT]['cells']['spike'][sources[0]]
+            self.assertEqual(dataset.chunks, (nsamples,))
+        # 3 datasets per source, each well below 10 KiB with metadata
+        self.assertLess(os.path.getsize(self.filepath),
+                        3 * nsources * 10 * 1024)
+        os.remove(self.filepath)
+
 
 class TestNSDFWriterEventVlen(unittest.TestCase):
     """Test case for writing event data in 2D ragged arrays
@@ -757,6 +1387,31 @@ class TestNSDFWriterEventVlen(unittest.TestCase):
         os.remove(self.filepath)
 
 
+    def test_append_data(self):
+        """Append twice to existing event vlen dataset and check that the
+        staged data is merged in order on close."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='a',
+                                 dialect=nsdf.dialect.VLEN)
+        ds = writer.mapping[nsdf.EVENT][self.popname]
+        old_data = {uid: self.data_object.get_data(uid)
+                    for uid in self.sources}
+        appended = defaultdict(list)
+        for jj in range(2):
+            for uid in self.sources:
+                data = np.random.uniform(1, 2, size=np.random.randint(0, 10))
+                self.data_object.put_data(uid, data)
+                appended[uid].append(self.data_object.get_data(uid))
+            writer.add_event_vlen(ds, self.data_object)
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            src_ds = fd['map'][nsdf.EVENT][self.popname]
+            dataset = fd['/data'][nsdf.EVENT][self.popname][self.varname]
+            for ii, uid in enumerate(src_ds):
+                expected = np.concatenate([old_data[uid]] + appended[uid])
+                nptest.assert_allclose(expected, dataset[ii])
+        os.remove(self.filepath)
+
+
 class TestNSDFWriterEventNanPadded(unittest.TestCase):
     """Test the case of writing event data with NaN padding"""
     def setUp(self):
@@ -859,6 +1514,226 @@ class TestNSDFWriterEventNanPadded(unittest.TestCase):
         os.remove(self.filepath)
 
 
+class TestNSDFWriterNonuniformCSR(unittest.TestCase):
+    """Test case for writing nonuniformly sampled data in 1D arrays with an
+    index of offsets.
+
+    """
+    def setUp(self):
+        self.mdict = create_ob_model_tree()
+        self.filepath = '{}.h5'.format(self.id())
+        writer = nsdf.NSDFWriter(self.filepath, mode='w',
+                                 dialect=nsdf.dialect.CSR)
+        writer.title = self.id()
+        self.sources = [cell.children['mc_0'].uid for cell in
+                        self.mdict['mitral_cells']]
+        self.popname = 'pop1'
+        ds = writer.add_nonuniform_ds(self.popname, self.sources)
+        self.dlen = np.random.randint(0, 100, size=len(self.sources))
+        self.data_object = nsdf.NonuniformData('Vm', unit='mV',
+                                               tunit='ms')
+        for ii, uid in enumerate(self.sources):
+            data = np.random.uniform(-65, -55, size=self.dlen[ii])
+            time = np.cumsum(np.random.exponential(scale=0.01,
+                                                   size=self.dlen[ii]))
+            self.data_object.put_data(uid, (data, time))
+        writer.add_nonuniform_csr(ds, self.data_object)
+
+    def test_data(self):
+        """Check the data and offsets are correctly written."""
+        with h5.File(self.filepath, 'r') as fd:
+            dataset = fd['/data/{}/{}/{}'.format(nsdf.NONUNIFORM,
+                                                 self.popname,
+                                                 self.data_object.name)]
+            self.assertEqual(dataset.dtype, np.float64)
+            src_ds = fd[dataset.attrs['source']]
+            self.assertEqual(src_ds.name, '/map/{}/{}'.format(
+                nsdf.NONUNIFORM, self.popname))
+            offsets = fd[dataset.attrs['offset']]
+            self.assertEqual(offsets.shape, (1, len(self.sources) + 1))
+            time_ds = dataset.dims[0]['time']
+            self.assertEqual(time_ds.attrs['unit'], self.data_object.tunit)
+            self.assertEqual(time_ds.shape, dataset.shape)
+            for ii, uid in enumerate(src_ds):
+                data, time = self.data_object.get_data(uid)
+                start, end = offsets[0, ii], offsets[0, ii+1]
+                nptest.assert_allclose(data, dataset[start:end])
+                nptest.assert_allclose(time, time_ds[start:end])
+        os.remove(self.filepath)
+
+    def test_append_data(self):
+        """Try appending data to existing CSR nonuniform dataset"""
+        old_data = {uid: self.data_object.get_data(uid) for uid in
+                    self.sources}
+        writer = nsdf.NSDFWriter(self.filepath, mode='a',
+                                 dialect=nsdf.dialect.CSR)
+        source_ds = writer.mapping[nsdf.NONUNIFORM][self.popname]
+        for uid in self.sources:
+            size = np.random.randint(0, 10)
+            self.data_object.put_data(uid, (np.random.uniform(size=size),
+                                            np.random.uniform(size=size)))
+        writer.add_nonuniform_csr(source_ds, self.data_object)
+        writer.close()
+        reader = nsdf.NSDFReader(self.filepath)
+        file_data = reader.get_nonuniform_data(self.popname,
+                                               self.data_object.name)
+        for uid in self.sources:
+            new_data, new_time = self.data_object.get_data(uid)
+            data, time = file_data.get_data(uid)
+            nptest.assert_allclose(np.concatenate((old_data[uid][0],
+                                                   new_data)), data)
+            nptest.assert_allclose(np.concatenate((old_data[uid][1],
+                                                   new_time)), time)
+        del reader
+        os.remove(self.filepath)
+
+
+class TestNSDFWriterEventCSR(unittest.TestCase):
+    """Test case for writing event data in 1D arrays with an index of
+    offsets.
+
+    """
+    def setUp(self):
+        self.mdict = create_ob_model_tree()
+        self.filepath = '{}.h5'.format(self.id())
+        writer = nsdf.NSDFWriter(self.filepath, mode='w',
+                                 dialect=nsdf.dialect.CSR,
+                                 compression='gzip')
+        writer.title = self.id()
+        self.sources = [cell.uid for cell in self.mdict['mitral_cells']]
+        self.popname = 'pop1'
+        ds = writer.add_event_ds(self.popname, self.sources)
+        self.data_object = nsdf.EventData('spike', unit='s')
+        rate = 100.0
+        dlen = np.random.poisson(lam=rate, size=len(self.sources))
+        for ii, uid in enumerate(self.sources):
+            self.data_object.put_data(uid, np.cumsum(np.random.exponential(
+                scale=1.0/rate, size=dlen[ii])))
+        writer.add_event_csr(ds, self.data_object)
+
+    def test_data(self):
+        """Check the data is correctly written."""
+        with h5.File(self.filepath, 'r') as fd:
+            dataset = fd['/data/{}/{}/{}'.format(nsdf.EVENT,
+                                                 self.popname,
+                                                 self.data_object.name)]
+            self.assertEqual(dataset.compression, 'gzip')
+            self.assertEqual(dataset.attrs['unit'], self.data_object.unit)
+            src_ds = fd[dataset.attrs['source']]
+            offsets = fd[dataset.attrs['offset']]
+            for ii, uid in enumerate(src_ds):
+                nptest.assert_allclose(
+                    self.data_object.get_data(uid),
+                    dataset[offsets[0, ii]:offsets[0, ii+1]])
+        os.remove(self.filepath)
+
+    def test_append_data(self):
+        """Appending adds one block of data and one row of offsets."""
+        old_data = {uid: self.data_object.get_data(uid) for uid in
+                    self.sources}
+        writer = nsdf.NSDFWriter(self.filepath, mode='a',
+                                 dialect=nsdf.dialect.CSR)
+        source_ds = writer.mapping[nsdf.EVENT][self.popname]
+        for uid in self.sources:
+            self.data_object.put_data(uid, np.random.uniform(
+                size=np.random.randint(0, 10)))
+        writer.add_event_csr(source_ds, self.data_object)
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            dataset = fd['/data/{}/{}/{}'.format(nsdf.EVENT,
+                                                 self.popname,
+                                                 self.data_object.name)]
+            self.assertEqual(fd[dataset.attrs['offset']].shape,
+                             (2, len(self.sources) + 1))
+        reader = nsdf.NSDFReader(self.filepath)
+        file_data = reader.get_event_data(self.popname,
+                                          self.data_object.name)
+        for uid in self.sources:
+            nptest.assert_allclose(
+                np.concatenate((old_data[uid],
+                                self.data_object.get_data(uid))),
+                file_data.get_data(uid))
+        del reader
+        os.remove(self.filepath)
+
+
+class TestNSDFWriterEventRaster(unittest.TestCase):
+    """Test case for writing event data as a table of (time, source index)
+    sorted by time.
+
+    """
+    def setUp(self):
+        self.mdict = create_ob_model_tree()
+        self.filepath = '{}.h5'.format(self.id())
+        writer = nsdf.NSDFWriter(self.filepath, mode='w',
+                                 dialect=nsdf.dialect.ONED)
+        writer.title = self.id()
+        self.sources = [cell.uid for cell in self.mdict['mitral_cells']]
+        self.popname = 'pop1'
+        ds = writer.add_event_ds_1d(self.popname, 'spike', self.sources)
+        self.data_object = nsdf.EventData('spike', unit='s')
+        rate = 100.0
+        dlen = np.random.poisson(lam=rate, size=len(self.sources))
+        for ii, uid in enumerate(self.sources):
+            self.data_object.put_data(uid, np.cumsum(np.random.exponential(
+                scale=1.0/rate, size=dlen[ii])))
+        writer.add_event_raster(ds, self.data_object)
+
+    def test_data(self):
+        """Check the events are sorted by time and mapped to their
+        sources."""
+        with h5.File(self.filepath, 'r') as fd:
+            dataset = fd['/data/{}/{}/{}'.format(nsdf.EVENT,
+                                                 self.popname,
+                                                 self.data_object.name)]
+            self.assertEqual(dataset.attrs['layout'], nsdf.layout.RASTER)
+            table = dataset[:]
+            self.assertTrue(np.all(np.diff(table['time']) >= 0))
+            src_ds = fd[dataset.attrs['source']]
+            for ii, uid in enumerate(src_ds['source']):
+                nptest.assert_allclose(
+                    self.data_object.get_data(uid),
+                    table['time'][table['source'] == ii])
+        os.remove(self.filepath)
+
+    def test_append_data(self):
+        """Append later events and check that the table stays sorted."""
+        old_data = {uid: self.data_object.get_data(uid) for uid in
+                    self.sources}
+        tlast = max([data[-1] for data in old_data.values()
+                     if len(data) > 0])
+        writer = nsdf.NSDFWriter(self.filepath, mode='a')
+        source_ds = writer.mapping[nsdf.EVENT][self.popname]['spike']
+        for uid in self.sources:
+            self.data_object.put_data(uid, tlast + np.random.uniform(
+                size=np.random.randint(0, 10)))
+        writer.add_event_raster(source_ds, self.data_object)
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            dataset = fd['/data/{}/{}/{}'.format(nsdf.EVENT,
+                                                 self.popname,
+                                                 self.data_object.name)]
+            table = dataset[:]
+            self.assertTrue(np.all(np.diff(table['time']) >= 0))
+            for ii, uid in enumerate(self.sources):
+                expected = np.sort(np.concatenate(
+                    (old_data[uid], self.data_object.get_data(uid))))
+                nptest.assert_allclose(expected,
+                                       table['time'][table['source'] == ii])
+        os.remove(self.filepath)
+
+    def test_append_earlier_events(self):
+        """Appending events earlier than the written ones is an error."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='a')
+        source_ds = writer.mapping[nsdf.EVENT][self.popname]['spike']
+        for uid in self.sources:
+            self.data_object.put_data(uid, [-1.0])
+        self.assertRaises(ValueError, writer.add_event_raster,
+                          source_ds, self.data_object)
+        writer.close()
+        os.remove(self.filepath)
+
+
 class TestNSDFWriterModelTree(unittest.TestCase):
     """Test the structure of model tree saved in `/model/modeltree` of the
     NSDF file.
@@ -909,6 +1784,51 @@ class TestNSDFWriterModelTree(unittest.TestCase):
             self.mdict['model_tree'].visit(nodes_match, hdfroot)
         os.remove(self.filepath)
 
+    def test_add_subtree(self):
+        """Add a tree under an existing component."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='w')
+        writer.add_modeltree(self.mdict['model_tree'])
+        cell = nsdf.ModelComponent('granule_new', uid='gnew',
+                                   attrs={'ontology': 'granule cell'})
+        comps = [nsdf.ModelComponent('gc_{}'.format(ii),
+                                     uid='gnew_{}'.format(ii), parent=cell)
+                 for ii in range(3)]
+        writer.add_modeltree(cell, target='model/Granule')
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            grp = fd['/model/modeltree/model/Granule/granule_new']
+            self.assertEqual(grp.attrs['uid'], 'gnew')
+            self.assertEqual(grp.attrs['ontology'], 'granule cell')
+            for comp in comps:
+                self.assertEqual(grp[comp.name].attrs['uid'], comp.uid)
+            self.assertEqual(fd['/model/modeltree/model/Granule'].attrs['uid'],
+                             self.mdict['model_tree'].children['Granule'].uid)
+        os.remove(self.filepath)
+
+    def test_add_modeltable(self):
+        """Appending to model table offsets the parent indices."""
+        writer = nsdf.NSDFWriter(self.filepath, mode='w')
+        writer.add_modeltable(['a', 'b', 'c'], [-1, 0, 1],
+                              attrs={'diameter': [1.0, 2.0, 3.0]})
+        writer.add_modeltable(['d', 'e'], [-1, 0], uids=['d0', 'e0'],
+                              attrs={'label': ['x', 'y']})
+        self.assertRaises(ValueError, writer.add_modeltable, ['f'], [1])
+        writer.close()
+        with h5.File(self.filepath, 'r') as fd:
+            table = fd['/model/modeltable']
+            self.assertEqual(list(table['name']), ['a', 'b', 'c', 'd', 'e'])
+            self.assertEqual(list(table['uid']), ['a', 'b', 'c', 'd0', 'e0'])
+            nptest.assert_equal(table['parent'][:], [-1, 0, 1, -1, 3])
+            nptest.assert_allclose(table['attrs/diameter'][:3],
+                                   [1.0, 2.0, 3.0])
+            self.assertEqual(len(table['attrs/diameter']), 5)
+            self.assertEqual(list(table['attrs/label'][3:]), ['x', 'y'])
+            nptest.assert_equal(table['present/diameter'][:],
+                                [True, True, True, False, False])
+            nptest.assert_equal(table['present/label'][:],
+                                [False, False, False, True, True])
+        os.remove(self.filepath)
+
     def test_model_map_linking(self):
         """Check if each group in the model is linked to the source maps of
         which its children are members.